@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.api_v1.endpoints import auth, health, servers, clients, openvpn, users, dashboard, logs
+from app.api.api_v1.endpoints import auth, health, servers, clients, openvpn, users, dashboard, logs, jobs
 
 api_router = APIRouter()
 api_router.include_router(health.router, prefix="/health", tags=["health"])
@@ -11,3 +11,4 @@ api_router.include_router(openvpn.router, prefix="/openvpn", tags=["openvpn"])
 api_router.include_router(servers.router, prefix="/servers", tags=["servers"])
 api_router.include_router(clients.router, prefix="/clients", tags=["clients"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
@@ -1,20 +1,29 @@
+import csv
+import io
+import json
 import logging
+from collections import defaultdict
+from functools import partial
 from ipaddress import IPv4Network, IPv6Network, ip_address, ip_network
 from pathlib import Path
-from typing import Iterable
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
-from pydantic import BaseModel
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
 from app.api import deps
 from app.api.security import get_current_user
 from app.core.config import get_settings
-from app.schemas.client import Client, ClientCreate, ClientOnline, ClientPage, ClientUpdate
+from app.schemas.client import Client, ClientBase, ClientCreate, ClientOnline, ClientPage, ClientUpdate
+from app.schemas.job import Job
 from app.schemas.audit_log import AuditLogCreate
 from app.services import ccd as ccd_service
-from app.services import certs, management, openvpn
+from app.services import certs, client_status, jobs, management, management_async, openvpn, ovpn_archive, ovpn_cache, poller
+from app.utils.time import now_shanghai_naive
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -22,6 +31,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
+BULK_MAX_ITEMS = 5000
+
 
 class OVPNResponse(BaseModel):
     ovpn: str
@@ -59,41 +70,6 @@ def ensure_superuser(user=Depends(get_current_user)):
     return user
 
 
-def _safe_audit(db: Session, actor: str, action: str, target: str | None, result: str) -> None:
-    try:
-        crud.audit_log.create(
-            db,
-            AuditLogCreate(
-                actor=actor,
-                action=action,
-                target=target,
-                result=result,
-            ),
-        )
-    except Exception:
-        logger.exception("Failed to write audit log action=%s target=%s result=%s", action, target, result)
-
-
-def _sync_client_status_and_audit(db: Session, *, online_common_names: Iterable[str]) -> None:
-    online_set = set(online_common_names)
-    changed = False
-    clients = db.query(crud.client.model).all()
-    for client in clients:
-        desired_status = "online" if client.common_name in online_set else "offline"
-        if client.disabled:
-            desired_status = "disabled"
-        if client.status != desired_status:
-            prev_status = client.status
-            client.status = desired_status
-            changed = True
-            if desired_status == "online":
-                _safe_audit(db, actor="system", action="client_login", target=client.common_name, result="success")
-            elif prev_status == "online" and desired_status != "online":
-                _safe_audit(db, actor="system", action="client_logout", target=client.common_name, result="success")
-    if changed:
-        db.commit()
-
-
 def _get_server_endpoint(db: Session) -> tuple[str, int]:
     servers = crud.server.get_multi(db, limit=1)
     if servers:
@@ -102,11 +78,22 @@ def _get_server_endpoint(db: Session) -> tuple[str, int]:
     return "127.0.0.1", 1194
 
 
+def _public_endpoint(db: Session) -> tuple[str, int]:
+    """客户端配置中的远端地址：以 PUBLIC_IP/PUBLIC_PORT 覆盖服务器记录。"""
+    host, port = _get_server_endpoint(db)
+    if settings.public_ip:
+        host = settings.public_ip
+    if settings.public_port:
+        port = settings.public_port
+    return host, port
+
+
 def _cleanup_client_files(common_name: str) -> None:
     """Remove exported ovpn and CCD file for the client, ignoring missing files."""
     export_path = settings.openvpn_client_export_path / f"{common_name}.ovpn"
     ccd_path = Path(settings.ccd_path) / common_name
-    for path in (export_path, ccd_path):
+    ovpn_cache.discard(common_name)
+    for path in (export_path, export_path.with_name(export_path.name + ".etag"), ccd_path):
         try:
             path.unlink(missing_ok=True)
         except FileNotFoundError:
@@ -135,6 +122,22 @@ def _load_server_network() -> IPv4Network | IPv6Network | None:
     return None
 
 
+def _fixed_ip_error(fixed_ip: str, net: IPv4Network | IPv6Network | None) -> str | None:
+    """校验固定 IP 格式与网段（不查库），返回错误信息。"""
+    try:
+        ip = ip_address(fixed_ip)
+    except ValueError:
+        return "固定IP格式不合法"
+    if net:
+        if ip not in net or ip == net.network_address or ip == net.broadcast_address:
+            return "固定IP不在 server.conf 配置的网段内"
+        # 避免与服务端占用的首个地址冲突
+        server_ip = next(net.hosts(), None)
+        if server_ip and ip == server_ip:
+            return "固定IP不可与服务端地址重复"
+    return None
+
+
 def _validate_fields(
     db: Session,
     *,
@@ -162,41 +165,24 @@ def _validate_fields(
             raise HTTPException(status_code=400, detail="证书CN已存在")
 
     if fixed_ip:
-        try:
-            ip = ip_address(fixed_ip)
-        except ValueError as exc:  # noqa: BLE001
-            raise HTTPException(status_code=400, detail="固定IP格式不合法") from exc
-
-        net = _load_server_network()
-        if net:
-            if ip not in net or ip == net.network_address or ip == net.broadcast_address:
-                raise HTTPException(status_code=400, detail="固定IP不在 server.conf 配置的网段内")
-            # 避免与服务端占用的首个地址冲突
-            host_iter = net.hosts()
-            server_ip = next(host_iter, None)
-            if server_ip and ip == server_ip:
-                raise HTTPException(status_code=400, detail="固定IP不可与服务端地址重复")
+        message = _fixed_ip_error(fixed_ip, _load_server_network())
+        if message:
+            raise HTTPException(status_code=400, detail=message)
 
         existing_ip = db.query(crud.client.model).filter(crud.client.model.fixed_ip == fixed_ip).first()
         if existing_ip and existing_ip.id != current_client_id:
             raise HTTPException(status_code=400, detail="固定IP已被其他客户端使用")
 
 
-@router.get("/", response_model=ClientPage)
-def list_clients(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=200),
-    name: str | None = Query(default=None),
-    status: str | None = Query(default=None),
-    db: Session = Depends(deps.get_db),
+def _query_client_page(
+    db: Session,
+    *,
+    page: int,
+    page_size: int,
+    name: str | None,
+    status: str | None,
+    online: dict[str, ClientOnline | management.OnlineClient],
 ) -> ClientPage:
-    # 查询客户端列表（分页，仅需已登录），支持按名称与状态过滤，并融合在线状态
-    try:
-        online = {c.common_name: c for c in management.list_online()}
-        _sync_client_status_and_audit(db, online_common_names=online.keys())
-    except Exception:
-        online = {}
-
     query = db.query(crud.client.model)
     if name:
         query = query.filter(crud.client.model.name.ilike(f"%{name}%"))
@@ -219,6 +205,30 @@ def list_clients(
     return ClientPage(items=merged, total=total, page=page, page_size=page_size)
 
 
+@router.get("/", response_model=ClientPage)
+async def list_clients(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=200),
+    name: str | None = Query(default=None),
+    status: str | None = Query(default=None),
+    db: Session = Depends(deps.get_db),
+) -> ClientPage:
+    # 查询客户端列表（分页，仅需已登录），支持按名称与状态过滤，并融合在线状态
+    online = {}
+    # 后台轮询已把在线状态同步进 clients.status 时直接查库，否则实时查询 management
+    if not await run_in_threadpool(poller.is_fresh, db):
+        try:
+            online = {c.common_name: c for c in await management_async.list_online()}
+            await run_in_threadpool(
+                client_status.sync_client_status_and_audit, db, online_common_names=list(online.keys())
+            )
+        except Exception:
+            online = {}
+    return await run_in_threadpool(
+        _query_client_page, db, page=page, page_size=page_size, name=name, status=status, online=online
+    )
+
+
 @router.post("/", response_model=Client, status_code=status.HTTP_201_CREATED)
 def create_client(
     client_in: ClientCreateRequest, db: Session = Depends(deps.get_db), user=Depends(get_current_user)
@@ -233,45 +243,344 @@ def create_client(
         require_all=True,
     )
     payload = ClientCreate(**client_in.model_dump(exclude={"passphrase"}))
+    try:
+        return _provision_client(
+            db, payload, passphrase=client_in.passphrase, actor=getattr(user, "username", "unknown")
+        )
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=500, detail=f"Failed to generate certificate: {exc}") from exc
+
+
+def _provision_client(db: Session, payload: ClientCreate, *, passphrase: str | None, actor: str):
+    """写入客户端、CCD，签发证书并导出 .ovpn；证书生成失败时回滚删除。"""
     created = crud.client.create(db, payload)
-    if client_in.fixed_ip is not None or client_in.routes is not None:
+    if payload.fixed_ip is not None or payload.routes is not None:
         routes = []
-        if client_in.routes:
-            routes = [r.strip() for r in client_in.routes.split(",") if r.strip()]
-        ccd_service.write_ccd(created, fixed_ip=client_in.fixed_ip, routes=routes)
+        if payload.routes:
+            routes = [r.strip() for r in payload.routes.split(",") if r.strip()]
+        ccd_service.write_ccd(created, fixed_ip=payload.fixed_ip, routes=routes)
     try:
-        certs.build_client_cert(db, created, passphrase=client_in.passphrase)
-        host, port = _get_server_endpoint(db)
-        if settings.public_ip:
-            host = settings.public_ip
-        if settings.public_port:
-            port = settings.public_port
+        certs.build_client_cert(db, created, passphrase=passphrase)
+        host, port = _public_endpoint(db)
         # 生成并落盘 .ovpn（与下载逻辑一致），便于后续直接下载
         certs.export_ovpn(created, remote_host=host, remote_port=port)
-    except Exception as exc:  # noqa: BLE001
-        logger.exception("Failed to build cert during client create cn=%s", client_in.common_name)
+    except Exception:
+        logger.exception("Failed to build cert during client create cn=%s", payload.common_name)
         try:
             crud.client.remove(db, created.id)
             _cleanup_client_files(created.common_name)
         except Exception:
-            logger.exception("Cleanup failed after create rollback cn=%s", client_in.common_name)
-        raise HTTPException(status_code=500, detail=f"Failed to generate certificate: {exc}") from exc
+            logger.exception("Cleanup failed after create rollback cn=%s", payload.common_name)
+        raise
     try:
         crud.audit_log.create(
             db,
             AuditLogCreate(
-                actor=getattr(user, "username", "unknown"),
+                actor=actor,
                 action="create_client",
-                target=client_in.common_name,
+                target=payload.common_name,
                 result="success",
             ),
         )
     except Exception:
         # do not block client creation on audit failure
-        logger.exception("Failed to write audit log for client create cn=%s", client_in.common_name)
+        logger.exception("Failed to write audit log for client create cn=%s", payload.common_name)
     return created
 
 
+class BulkClientCreateRequest(BaseModel):
+    items: list[ClientBase] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+    passphrase: str | None = None
+
+
+def _parse_bulk_csv(text: str) -> list[dict]:
+    """CSV 表头：name,common_name,fixed_ip,routes；routes 内多条路由用逗号（需加引号）或分号分隔。"""
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    rows = []
+    for row in reader:
+        item = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+        if not any(item.values()):
+            continue
+        if item.get("routes"):
+            item["routes"] = ",".join(r.strip() for r in item["routes"].replace(";", ",").split(",") if r.strip())
+        rows.append({k: (v or None) for k, v in item.items()})
+    return rows
+
+
+async def _read_bulk_request(request: Request) -> BulkClientCreateRequest:
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="缺少上传文件 file")
+            text = (await upload.read()).decode("utf-8-sig")
+            passphrase = form.get("passphrase") or None
+            if (upload.filename or "").lower().endswith(".json"):
+                data = json.loads(text)
+                items = data.get("items", []) if isinstance(data, dict) else data
+            else:
+                items = _parse_bulk_csv(text)
+            return BulkClientCreateRequest(items=items, passphrase=passphrase)
+        if content_type.startswith("text/csv"):
+            text = (await request.body()).decode("utf-8-sig")
+            passphrase = request.query_params.get("passphrase")
+            return BulkClientCreateRequest(items=_parse_bulk_csv(text), passphrase=passphrase)
+        return BulkClientCreateRequest.model_validate(await request.json())
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False, include_context=False)) from exc
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=400, detail=f"无法解析请求内容: {exc}") from exc
+
+
+def _validate_bulk(db: Session, items: list[ClientBase]) -> dict[int, list[str]]:
+    """集合方式校验整批数据：批内重复与库中已存在各只查询一次（分块 IN）。"""
+    errors: dict[int, list[str]] = defaultdict(list)
+    net = _load_server_network()
+    seen: dict[str, dict[str, int]] = {"name": {}, "common_name": {}, "fixed_ip": {}}
+    for idx, item in enumerate(items):
+        if not item.fixed_ip:
+            errors[idx].append("固定IP为必填项")
+        elif message := _fixed_ip_error(item.fixed_ip, net):
+            errors[idx].append(message)
+        for field, label in (("name", "名称"), ("common_name", "证书CN"), ("fixed_ip", "固定IP")):
+            value = getattr(item, field)
+            if not value:
+                continue
+            if value in seen[field]:
+                errors[idx].append(f"{label}与第 {seen[field][value] + 1} 行重复")
+            else:
+                seen[field][value] = idx
+
+    model = crud.client.model
+    for field, label in (("name", "名称已存在"), ("common_name", "证书CN已存在"), ("fixed_ip", "固定IP已被其他客户端使用")):
+        column = getattr(model, field)
+        values = list(seen[field])
+        for i in range(0, len(values), 500):
+            for existing in db.scalars(select(column).where(column.in_(values[i : i + 500]))):
+                errors[seen[field][existing]].append(label)
+    return dict(errors)
+
+
+def _bulk_create_item(db: Session, target: str, payload: dict | None, *, passphrase: str | None, actor: str) -> str:
+    created = _provision_client(db, ClientCreate(**(payload or {})), passphrase=passphrase, actor=actor)
+    return f"client_id={created.id}"
+
+
+@router.post("/bulk", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def bulk_create_clients(
+    request: Request, db: Session = Depends(deps.get_db), user=Depends(get_current_user)
+) -> Job:
+    """
+    批量创建客户端：请求体为 JSON（{"items": [...], "passphrase": ...}）、text/csv，
+    或 multipart 上传 file（.csv/.json）。整批先校验，任一行不合法则返回 400 与逐行错误；
+    通过后创建作业并交给后台线程池执行，通过 /jobs/{id} 查询进度与逐条结果。
+    CA 口令只保存在内存中，不写入作业表。
+    """
+    bulk = await _read_bulk_request(request)
+    errors = await run_in_threadpool(_validate_bulk, db, bulk.items)
+    if errors:
+        raise HTTPException(
+            status_code=400,
+            detail=[
+                {"row": idx + 1, "common_name": bulk.items[idx].common_name, "errors": messages}
+                for idx, messages in sorted(errors.items())
+            ],
+        )
+    actor = getattr(user, "username", "unknown")
+    logger.info("Bulk creating %s clients by user=%s", len(bulk.items), actor)
+    job = await run_in_threadpool(
+        crud.job.create_with_items,
+        db,
+        kind="bulk_create_clients",
+        actor=actor,
+        items=[(item.common_name, item.model_dump()) for item in bulk.items],
+        owner=jobs.process_owner(),
+    )
+    jobs.submit(job.id, partial(_bulk_create_item, passphrase=bulk.passphrase, actor=actor))
+    return job
+
+
+class BulkRevokeRequest(BaseModel):
+    client_ids: list[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+    passphrase: str | None = None
+
+
+def _bulk_revoke_item(db: Session, target: str, payload: dict | None, *, passphrase: str | None, actor: str) -> str:
+    client = crud.client.get(db, (payload or {}).get("client_id"))
+    if not client:
+        raise RuntimeError("Client not found")
+    certs.revoke_without_crl(db, client, passphrase=passphrase)
+    try:
+        crud.audit_log.create(
+            db, AuditLogCreate(actor=actor, action="revoke_client_cert", target=target, result="success")
+        )
+    except Exception:
+        logger.exception("Failed to write audit log for revoke cn=%s", target)
+    return "revoked"
+
+
+def _bulk_revoke_complete(db: Session, succeeded: list[str], *, passphrase: str | None) -> str | None:
+    # 全部吊销完成后只生成/安装一次 CRL，并只重启一次 OpenVPN
+    if not succeeded:
+        return None
+    certs.regenerate_crl(passphrase=passphrase)
+    try:
+        openvpn.service_action("restart")
+    except Exception as exc:
+        logger.exception("OpenVPN restart failed after bulk revoke")
+        return f"CRL updated, restart failed: {exc}"
+    return f"CRL updated for {len(succeeded)} revoked certificates"
+
+
+@router.post(
+    "/bulk/revoke", response_model=Job, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(ensure_superuser)]
+)
+def bulk_revoke_client_certs(
+    payload: BulkRevokeRequest, db: Session = Depends(deps.get_db), user=Depends(get_current_user)
+) -> Job:
+    """批量吊销（超级管理员）：逐个吊销后统一刷新一次 CRL 并重启一次，进度通过 /jobs/{id} 查询。"""
+    ids = list(dict.fromkeys(payload.client_ids))
+    found = dict(
+        db.execute(select(crud.client.model.id, crud.client.model.common_name).where(crud.client.model.id.in_(ids)))
+        .tuples()
+        .all()
+    )
+    missing = [client_id for client_id in ids if client_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Client not found: {missing}")
+    actor = getattr(user, "username", "unknown")
+    logger.info("Bulk revoking %s client certs by user=%s", len(ids), actor)
+    job = crud.job.create_with_items(
+        db,
+        kind="bulk_revoke_clients",
+        actor=actor,
+        items=[(found[client_id], {"client_id": client_id}) for client_id in ids],
+        owner=jobs.process_owner(),
+    )
+    jobs.submit(
+        job.id,
+        partial(_bulk_revoke_item, passphrase=payload.passphrase, actor=actor),
+        on_complete=partial(_bulk_revoke_complete, passphrase=payload.passphrase),
+    )
+    return job
+
+
+class ProfileSelection(BaseModel):
+    client_ids: list[int] | None = None
+
+
+def _select_profile_clients(db: Session, client_ids: list[int] | None) -> list:
+    """按 ID 选取客户端；未指定时为全部未吊销（status != disabled）的客户端。"""
+    query = select(crud.client.model).order_by(crud.client.model.id)
+    if not client_ids:
+        return list(db.scalars(query.where(crud.client.model.status != "disabled")))
+    ids = list(dict.fromkeys(client_ids))
+    clients = list(db.scalars(query.where(crud.client.model.id.in_(ids))))
+    found = {c.id for c in clients}
+    missing = [client_id for client_id in ids if client_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Client not found: {missing}")
+    return clients
+
+
+def _stream_profiles(db: Session, client_ids: list[int] | None) -> StreamingResponse:
+    clients = _select_profile_clients(db, client_ids)
+    # 响应体在请求会话关闭后才生成，这里先取好远端地址；生成过程只用到已加载的 common_name
+    host, port = _public_endpoint(db)
+    logger.info("Streaming ovpn archive for %s clients", len(clients))
+    filename = f"ovpn-profiles-{now_shanghai_naive():%Y%m%d%H%M%S}.zip"
+    return StreamingResponse(
+        ovpn_archive.iter_profiles_zip(clients, host, port),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+
+@router.get("/export", dependencies=[Depends(ensure_superuser)], summary="Download .ovpn profiles as ZIP")
+def export_client_profiles(
+    client_ids: list[int] | None = Query(default=None, alias="client_id"),
+    db: Session = Depends(deps.get_db),
+) -> StreamingResponse:
+    """流式下载 ZIP（超级管理员）：?client_id=1&client_id=2 指定客户端，缺省为全部未吊销的客户端。"""
+    return _stream_profiles(db, client_ids)
+
+
+@router.post("/export", dependencies=[Depends(ensure_superuser)], summary="Download .ovpn profiles as ZIP")
+def export_client_profiles_post(
+    payload: ProfileSelection | None = Body(default=None), db: Session = Depends(deps.get_db)
+) -> StreamingResponse:
+    """同 GET /export，客户端 ID 较多时放在请求体中传递。"""
+    return _stream_profiles(db, payload.client_ids if payload else None)
+
+
+def _regenerate_profile_item(
+    db: Session, target: str, payload: dict | None, *, remote_host: str, remote_port: int
+) -> str:
+    client = crud.client.get_by_common_name(db, common_name=target)
+    if not client:
+        raise RuntimeError("Client not found")
+    export_path = settings.openvpn_client_export_path / f"{client.common_name}.ovpn"
+    previous = ovpn_cache.exported_etag(export_path)
+    # 只重新渲染配置文件，复用已有证书与私钥，不调用 EasyRSA
+    etag, _ = certs.export_ovpn_cached(client, remote_host, remote_port)
+    return "unchanged" if etag == previous else "regenerated"
+
+
+def _regenerate_profiles_start(db: Session, targets: list[str]) -> str | None:
+    # 分发条目前统一生成缺失的 tls-crypt-v2 客户端密钥，避免各条目逐个等待；
+    # 生成失败（含服务端密钥缺失）不中止作业，相应条目渲染时各自失败并记录原因
+    generated, errors = certs.ensure_tls_crypt_v2_client_keys(targets, workers=settings.job_workers)
+    by_error: dict[str, list[str]] = {}
+    for cn, error in errors.items():
+        by_error.setdefault(error, []).append(cn)
+    for error, cns in by_error.items():
+        logger.warning("tls-crypt-v2 key generation failed for %s client(s) (%s...): %s", len(cns), cns[0], error)
+    if not generated and not errors:
+        return None
+    return f"Generated {generated} tls-crypt-v2 client keys, {len(errors)} failed"
+
+
+@router.post(
+    "/profiles/regenerate",
+    response_model=Job,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(ensure_superuser)],
+)
+def regenerate_client_profiles(
+    payload: ProfileSelection | None = Body(default=None),
+    db: Session = Depends(deps.get_db),
+    user=Depends(get_current_user),
+) -> Job:
+    """
+    批量重新生成 .ovpn（超级管理员）：公网地址/端口或 TLS 模式变更后刷新已导出的配置。
+    缺省为全部已签发证书且未吊销的客户端，进度通过 /jobs/{id} 查询。
+    """
+    issued = settings.easyrsa_path / "pki" / "issued"
+    clients = [
+        c
+        for c in _select_profile_clients(db, payload.client_ids if payload else None)
+        if (issued / f"{c.common_name}.crt").exists()
+    ]
+    host, port = _public_endpoint(db)
+    actor = getattr(user, "username", "unknown")
+    logger.info("Regenerating %s ovpn profiles for %s:%s by user=%s", len(clients), host, port, actor)
+    job = crud.job.create_with_items(
+        db,
+        kind="regenerate_profiles",
+        actor=actor,
+        items=[(c.common_name, None) for c in clients],
+        owner=jobs.process_owner(),
+    )
+    jobs.submit(
+        job.id,
+        partial(_regenerate_profile_item, remote_host=host, remote_port=port),
+        on_start=_regenerate_profiles_start,
+    )
+    return job
+
+
 @router.get("/validate", response_model=ClientValidateResponse)
 def validate_client(
     name: str | None = Query(default=None),
@@ -385,11 +694,18 @@ def delete_client(
 
 
 @router.get("/online", response_model=list[ClientOnline])
-def list_online_clients(db: Session = Depends(deps.get_db), _=Depends(ensure_superuser)) -> list[ClientOnline]:
+async def list_online_clients(db: Session = Depends(deps.get_db), _=Depends(ensure_superuser)) -> list[ClientOnline]:
     # 查询在线客户端（需开启 management 接口）
-    online_clients = management.list_online()
+    published = await run_in_threadpool(poller.read_online, db)
+    if published is not None:
+        return published
+    online_clients = await management_async.list_online()
     try:
-        _sync_client_status_and_audit(db, online_common_names=[c.common_name for c in online_clients])
+        await run_in_threadpool(
+            client_status.sync_client_status_and_audit,
+            db,
+            online_common_names=[c.common_name for c in online_clients],
+        )
     except Exception:
         # status sync best-effort
         logger.exception("Failed to sync client status/audit from online list")
@@ -407,12 +723,7 @@ def generate_client_cert(
     passphrase = payload.passphrase if payload else None
     logger.info("Generating cert for client_id=%s cn=%s", client_id, client.common_name)
     certs.build_client_cert(db, client, passphrase=passphrase)
-    host, port = _get_server_endpoint(db)
-    # override remote host/port if public_* provided in settings
-    if settings.public_ip:
-        host = settings.public_ip
-    if settings.public_port:
-        port = settings.public_port
+    host, port = _public_endpoint(db)
     ovpn = certs.export_ovpn(client, remote_host=host, remote_port=port)
     logger.info("Exported ovpn for client_id=%s cn=%s", client_id, client.common_name)
     return OVPNResponse(ovpn=ovpn)
@@ -428,13 +739,37 @@ def check_exported_client_cert(client_id: int, db: Session = Depends(deps.get_db
     if export_path.exists():
         try:
             logger.info("Existing ovpn found for client_id=%s cn=%s", client_id, client.common_name)
-            return ExportedCheckResponse(exists=True, ovpn=export_path.read_text())
+            # 走渲染缓存：输入未变化时不重新读取/渲染，远端地址或 CA 变化时自动刷新
+            _, ovpn = certs.export_ovpn_cached(client, *_public_endpoint(db))
+            return ExportedCheckResponse(exists=True, ovpn=ovpn)
         except Exception:
             logger.exception("Failed to read existing ovpn for client_id=%s cn=%s", client_id, client.common_name)
             return ExportedCheckResponse(exists=True, ovpn=None)
     return ExportedCheckResponse(exists=False, ovpn=None)
 
 
+@router.get("/{client_id}/ovpn", dependencies=[Depends(ensure_superuser)], summary="Download .ovpn profile")
+def download_client_ovpn(
+    client_id: int,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(deps.get_db),
+) -> Response:
+    """下载 .ovpn（支持 ETag / If-None-Match，内容未变化时返回 304）。"""
+    client = crud.client.get(db, client_id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    try:
+        etag, ovpn = certs.export_ovpn_cached(client, *_public_endpoint(db))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    quoted = f'"{etag}"'
+    headers = {"ETag": quoted, "Cache-Control": "private, no-cache"}
+    if if_none_match and quoted in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{client.common_name}.ovpn"'
+    return Response(content=ovpn, media_type="application/x-openvpn-profile", headers=headers)
+
+
 @router.post("/{client_id}/revoke", dependencies=[Depends(ensure_superuser)])
 def revoke_client_cert(
     client_id: int, payload: PassphrasePayload | None = Body(default=None), db: Session = Depends(deps.get_db)
@@ -454,44 +789,37 @@ def revoke_client_cert(
     return {"detail": "revoked"}
 
 
+def _audit_disconnect(db: Session, user, common_name: str, result: str) -> None:
+    try:
+        crud.audit_log.create(
+            db,
+            AuditLogCreate(
+                actor=getattr(user, "username", "unknown"),
+                action="client_disconnect",
+                target=common_name,
+                result=result,
+            ),
+        )
+    except Exception:
+        logger.exception("Failed to write audit log for disconnect %s cn=%s", result, common_name)
+
+
 @router.post("/{client_id}/disconnect", dependencies=[Depends(ensure_superuser)])
-def disconnect_client(
+async def disconnect_client(
     client_id: int, db: Session = Depends(deps.get_db), user=Depends(get_current_user)
 ) -> dict[str, str]:
     # 通过 management 接口踢下线（超级管理员）
-    client = crud.client.get(db, client_id)
+    client = await run_in_threadpool(crud.client.get, db, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     try:
-        management.disconnect(client.common_name)
+        await management_async.disconnect(client.common_name)
         logger.info("Disconnected client via management cn=%s", client.common_name)
-        try:
-            crud.audit_log.create(
-                db,
-                AuditLogCreate(
-                    actor=getattr(user, "username", "unknown"),
-                    action="client_disconnect",
-                    target=client.common_name,
-                    result="success",
-                ),
-            )
-        except Exception:
-            logger.exception("Failed to write audit log for disconnect cn=%s", client.common_name)
     except Exception as exc:  # pragma: no cover - management errors
         logger.exception("Failed to disconnect client cn=%s", client.common_name)
-        try:
-            crud.audit_log.create(
-                db,
-                AuditLogCreate(
-                    actor=getattr(user, "username", "unknown"),
-                    action="client_disconnect",
-                    target=client.common_name,
-                    result="fail",
-                ),
-            )
-        except Exception:
-            logger.exception("Failed to write audit log for disconnect fail cn=%s", client.common_name)
+        await run_in_threadpool(_audit_disconnect, db, user, client.common_name, "fail")
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+    await run_in_threadpool(_audit_disconnect, db, user, client.common_name, "success")
     return {"detail": "disconnected"}
 
 
@@ -1,18 +1,22 @@
-from datetime import datetime
+import asyncio
+from typing import Awaitable, Callable, TypeVar
 
 import logging
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app import crud
-from app.api import deps
+from app.api.deps import get_db_context
 from app.api.security import get_current_user
-from app.services import management, openvpn as openvpn_service
+from app.core.config import get_settings
+from app.services import cert_stats, management_async, openvpn as openvpn_service
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 
@@ -25,55 +29,85 @@ def _status_from_output(output: str) -> str:
     return "unknown"
 
 
-@router.get("/metrics")
-def get_dashboard_metrics(db: Session = Depends(deps.get_db)) -> dict:
-    """汇总仪表盘需要的实时/统计数据。"""
-    logger.info("Dashboard metrics requested")
-    total_clients = db.query(crud.client.model).count()
-    try:
-        online_clients = len(management.list_online())
-    except Exception:
-        logger.exception("Failed to list online clients via management")
-        online_clients = 0
-
-    cert_model = crud.certificate.model
-    cert_total = db.query(func.count()).select_from(cert_model).scalar() or 0
-    valid_count = db.query(func.count()).select_from(cert_model).filter(cert_model.status == "valid").scalar() or 0
-    revoked_count = (
-        db.query(func.count()).select_from(cert_model).filter(cert_model.status == "revoked").scalar() or 0
-    )
-    # 如果未及时标记过期，按 not_after 兜底统计一次
-    expired_count = (
-        db.query(func.count()).select_from(cert_model).filter(cert_model.not_after < datetime.utcnow()).scalar() or 0
-    )
+def _in_session(query: Callable[[Session], T]) -> Callable[[], T]:
+    """并发查询时每个数据源使用独立的 Session（Session 不是线程安全的）。"""
 
-    openvpn_status = "unknown"
-    try:
-        output = openvpn_service.service_action("status")
-        openvpn_status = _status_from_output(output)
-    except Exception:
-        logger.exception("Failed to probe openvpn service status")
-        openvpn_status = "unknown"
+    def run() -> T:
+        with get_db_context() as db:
+            return query(db)
 
-    try:
-        status_details = management.status_details()
-    except Exception:
-        logger.exception("Failed to read management status details")
-        status_details = None
+    return run
+
+
+def _count_clients(db: Session) -> int:
+    return db.query(crud.client.model).count()
+
+
+def _recent_logs(db: Session) -> list[dict]:
+    return [
+        {
+            "actor": log.actor,
+            "action": log.action,
+            "target": log.target,
+            "result": log.result,
+            "created_at": log.created_at.isoformat(),
+        }
+        for log in crud.audit_log.get_recent(db, limit=10)
+    ]
+
+
+def _probe_openvpn_status() -> str:
+    return _status_from_output(openvpn_service.service_action("status"))
 
-    load_stats = None
-    try:
-        load_stats = management.load_stats()
-    except Exception:
-        logger.debug("load-stats not supported or failed", exc_info=True)
-        load_stats = None
 
-    state_events = []
+async def _source(name: str, awaitable: Awaitable[T], default: T, degraded: list[str]) -> T:
+    """在独立的超时预算内等待一个数据源；失败或超时只影响该数据源，返回默认值。"""
     try:
-        state_events = management.state_history(limit=10)
+        return await asyncio.wait_for(awaitable, settings.dashboard_source_timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Dashboard source %s timed out after %ss", name, settings.dashboard_source_timeout)
     except Exception:
-        logger.debug("state history not available", exc_info=True)
-        state_events = []
+        logger.warning("Dashboard source %s failed", name, exc_info=True)
+    degraded.append(name)
+    return default
+
+
+@router.get("/metrics")
+async def get_dashboard_metrics() -> dict:
+    """
+    汇总仪表盘需要的实时/统计数据。
+
+    各数据源（数据库计数、进程探测、management 查询、审计日志）并发获取，各自有超时预算
+    （DASHBOARD_SOURCE_TIMEOUT）；慢或失败的数据源只降级自己那一部分，并在 degraded 中列出。
+    线程中的数据源用 asyncio.to_thread 运行，超时后不再等待线程结束。
+    """
+    logger.info("Dashboard metrics requested")
+    degraded: list[str] = []
+    (
+        total_clients,
+        online,
+        certificates,
+        openvpn_status,
+        status_details,
+        load_stats,
+        state_events,
+        recent_logs,
+    ) = await asyncio.gather(
+        _source("total_clients", asyncio.to_thread(_in_session(_count_clients)), 0, degraded),
+        _source("online_clients", management_async.list_online(), [], degraded),
+        _source(
+            "certificates",
+            asyncio.to_thread(_in_session(cert_stats.get_certificate_stats)),
+            {"total": 0, "valid": 0, "revoked": 0, "expired": 0},
+            degraded,
+        ),
+        _source("openvpn_status", asyncio.to_thread(_probe_openvpn_status), "unknown", degraded),
+        _source("status_details", management_async.status_details(), None, degraded),
+        _source("load_stats", management_async.load_stats(), None, degraded),
+        _source("state_events", management_async.state_history(limit=10), [], degraded),
+        _source("recent_activity", asyncio.to_thread(_in_session(_recent_logs)), [], degraded),
+    )
+    online_clients = len(online)
 
     routing_table = []
     global_stats = {}
@@ -112,26 +146,10 @@ def get_dashboard_metrics(db: Session = Depends(deps.get_db)) -> dict:
         for e in state_events
     ]
 
-    recent_logs = [
-        {
-            "actor": log.actor,
-            "action": log.action,
-            "target": log.target,
-            "result": log.result,
-            "created_at": log.created_at.isoformat(),
-        }
-        for log in crud.audit_log.get_recent(db, limit=10)
-    ]
-
     return {
         "online_clients": online_clients,
         "total_clients": total_clients,
-        "certificates": {
-            "total": cert_total,
-            "valid": valid_count,
-            "revoked": revoked_count,
-            "expired": expired_count,
-        },
+        "certificates": certificates,
         "openvpn": {
             "status": openvpn_status,
             "title": status_details.title if status_details else None,
@@ -145,4 +163,5 @@ def get_dashboard_metrics(db: Session = Depends(deps.get_db)) -> dict:
         # 目前暂无告警系统，占位返回 0
         "alerts": {"count": 0},
         "recent_activity": recent_logs,
+        "degraded": degraded,
     }
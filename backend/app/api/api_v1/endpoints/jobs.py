@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.api import deps
+from app.api.security import get_current_user
+from app.schemas.job import Job, JobItemPage
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+
+@router.get("/{job_id}", response_model=Job, summary="Get batch job progress")
+def get_job(job_id: int, db: Session = Depends(deps.get_db)) -> Job:
+    job = crud.job.get(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/items", response_model=JobItemPage, summary="List per-item results of a batch job")
+def list_job_items(
+    job_id: int,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
+    status: str | None = Query(default=None, description="pending/succeeded/failed"),
+    db: Session = Depends(deps.get_db),
+) -> JobItemPage:
+    if not crud.job.get(db, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    items, total = crud.job.get_items(
+        db, job_id=job_id, status=status, skip=(page - 1) * page_size, limit=page_size
+    )
+    return JobItemPage(items=items, total=total, page=page, page_size=page_size)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 
 from app.api.security import get_current_user
-from app.services import openvpn
+from app.services import openvpn, pki_sync
 from app.services.importer import import_openvpn
 from app.api import deps
 
@@ -42,3 +42,17 @@ def import_from_host(user=Depends(get_current_user), db=Depends(deps.get_db)) ->
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
     return stats
+
+
+@router.post("/import/pki", summary="Incrementally sync certificates from Easy-RSA index.txt")
+def sync_pki_index(full: bool = False, user=Depends(get_current_user), db=Depends(deps.get_db)) -> dict:
+    # 按 index.txt 增量同步证书状态（超级管理员），full=true 时全量比对
+    if not user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+    try:
+        result = pki_sync.sync_from_index(db, full=full)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
@@ -4,8 +4,6 @@ from pathlib import Path
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError
 
 from app import crud
 from app.api import deps
@@ -14,7 +12,6 @@ from app.core.config import get_settings
 from app.schemas.server import Server, ServerCreate, ServerUpdate
 from app.services import openvpn as openvpn_service
 from app.services.importer import import_openvpn
-from app.db.session import engine
 
 settings = get_settings()
 
@@ -27,16 +24,7 @@ class ServerConfPayload(BaseModel):
 
 def ensure_server(db: Session) -> Server:
     """Single-server模式：如不存在则从本机配置导入/创建。"""
-    try:
-        servers = crud.server.get_multi(db, limit=1)
-    except OperationalError as exc:
-        if "vpnservers.vpn_ip" in str(exc):
-            with engine.connect() as conn:
-                conn.execute(text("ALTER TABLE vpnservers ADD COLUMN vpn_ip VARCHAR(50)"))
-                conn.commit()
-            servers = crud.server.get_multi(db, limit=1)
-        else:
-            raise
+    servers = crud.server.get_multi(db, limit=1)
     if servers:
         return servers[0]
     import_openvpn(db)
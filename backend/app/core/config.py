@@ -1,7 +1,7 @@
 from functools import lru_cache
 from pathlib import Path
 
-from pydantic import AnyHttpUrl
+from pydantic import AnyHttpUrl, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -15,7 +15,19 @@ class Settings(BaseSettings):
     log_file: Path | None = None
     log_max_bytes: int = 10 * 1024 * 1024
     log_backup_count: int = 5
+    database_url: str | None = None  # 未设置时使用 sqlite_path
     sqlite_path: Path = Path(__file__).resolve().parents[2] / "data" / "app.db"
+    sqlite_journal_mode: str = "WAL"  # 为空时不修改库现有的日志模式
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout: int = 5000  # ms
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -16000  # 负数表示 KiB
+    sqlite_maintenance_interval: float = 3600.0
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # 秒
     cors_origins: list[AnyHttpUrl] | list[str] = [
         "http://localhost:8010",
         "http://127.0.0.1:8010",
@@ -25,8 +37,38 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 60
     openvpn_service_name: str = "openvpn@server"
     openvpn_status_path: Path = Path("/var/log/openvpn/openvpn-status.log")
+    openvpn_pid_path: Path = Path("/run/openvpn/server.pid")
+    openvpn_process_cache_ttl: float = 2.0
     openvpn_management_host: str = "127.0.0.1"
     openvpn_management_port: int = 7505
+    openvpn_management_timeout: float = 3.0
+    openvpn_management_max_waiters: int = 32
+    openvpn_management_idle_timeout: float | None = None  # 未设置时按是否启用 relay 决定
+    openvpn_management_relay_path: Path = Path(__file__).resolve().parents[2] / "data" / "management.sock"
+    openvpn_status_cache_ttl: float = 2.0
+    management_poller_enabled: bool = False
+    management_poll_interval: float = 5.0
+    management_events_enabled: bool = False
+    management_bytecount_interval: int = 10
+    management_client_auth_enabled: bool = False
+    dashboard_source_timeout: float = 2.0
+    certificate_stats_cache_ttl: float = 30.0
+    import_workers: int = 0
+    pki_sync_interval: float = 0
+    key_pool_enabled: bool = False
+    key_pool_path: Path = Path(__file__).resolve().parents[2] / "data" / "key_pool"
+    key_pool_size: int = 50
+    key_pool_low_watermark: int = 20
+    key_pool_refill_interval: float = 30.0
+    key_pool_refill_workers: int = 2
+    key_pool_algorithm: str = ""
+    job_workers: int = 4
+    job_reaper_interval: float = 60.0
+    tls_verify_server_enabled: bool = False
+    tls_verify_socket_path: Path = Path(__file__).resolve().parents[2] / "data" / "tls_verify.sock"
+    admission_file_enabled: bool = False
+    admission_file_path: Path = Path(__file__).resolve().parents[2] / "data" / "admission.list"
+    admission_refresh_interval: float = 0.0
     openvpn_crl_path: Path = Path("/etc/openvpn/crl.pem")
     openvpn_client_export_path: Path = Path("/etc/openvpn/client-configs")
     ta_key_path: Path = Path("/etc/openvpn/server/ta.key")
@@ -41,6 +83,13 @@ class Settings(BaseSettings):
     openvpn_base_path: Path = Path("/etc/openvpn")
     easyrsa_path: Path = Path("/etc/openvpn/easy-rsa")
     ccd_path: Path = Path("/etc/openvpn/ccd")
+    @model_validator(mode="after")
+    def _check_client_auth(self) -> "Settings":
+        # >CLIENT:CONNECT 只能由事件连接应答；未开启事件监听时所有连接都会挂起到 hand-window 超时
+        if self.management_client_auth_enabled and not self.management_events_enabled:
+            raise ValueError("MANAGEMENT_CLIENT_AUTH_ENABLED requires MANAGEMENT_EVENTS_ENABLED")
+        return self
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -3,5 +3,8 @@ from app.crud.server import server
 from app.crud.user import user
 from app.crud.certificate import certificate
 from app.crud.audit_log import audit_log
+from app.crud.online_session import online_session
+from app.crud.runtime_state import runtime_state
+from app.crud.job import job
 
-__all__ = ["client", "server", "user", "certificate", "audit_log"]
+__all__ = ["client", "server", "user", "certificate", "audit_log", "online_session", "runtime_state", "job"]
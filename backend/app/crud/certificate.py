@@ -1,3 +1,6 @@
+from datetime import datetime
+
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
@@ -12,5 +15,23 @@ class CRUDCertificate(CRUDBase[Certificate, CertificateCreate, CertificateUpdate
     def get_by_serial(self, db: Session, *, serial_number: str) -> Certificate | None:
         return db.query(Certificate).filter(Certificate.serial_number == serial_number).first()
 
+    def get_stats(self, db: Session, *, now: datetime) -> dict[str, int]:
+        """一次 SUM(CASE ...) 扫描得到 total/valid/revoked/expired 计数。"""
+
+        def count_if(condition) -> object:
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+        row = db.execute(
+            select(
+                func.count(),
+                count_if(Certificate.status == "valid"),
+                count_if(Certificate.status == "revoked"),
+                # 如果未及时标记过期，按 not_after 兜底统计
+                count_if(Certificate.not_after < now),
+            ).select_from(Certificate)
+        ).one()
+        total, valid, revoked, expired = (int(v or 0) for v in row)
+        return {"total": total, "valid": valid, "revoked": revoked, "expired": expired}
+
 
 certificate = CRUDCertificate(Certificate)
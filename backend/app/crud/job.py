@@ -0,0 +1,100 @@
+import json
+from typing import Any, Iterable
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.job import Job, JobItem
+from app.utils.time import now_shanghai_naive
+
+
+class CRUDJob:
+    model = Job
+
+    def get(self, db: Session, id: int) -> Job | None:
+        return db.get(Job, id)
+
+    def create_with_items(
+        self,
+        db: Session,
+        *,
+        kind: str,
+        actor: str,
+        items: Iterable[tuple[str, dict[str, Any] | None]],
+        owner: str | None = None,
+    ) -> Job:
+        """创建作业及其条目（条目批量插入，同一事务提交）。"""
+        rows = [
+            {"target": target, "payload": json.dumps(payload, ensure_ascii=False) if payload is not None else None}
+            for target, payload in items
+        ]
+        job = Job(kind=kind, actor=actor, total=len(rows), owner=owner)
+        db.add(job)
+        db.flush()
+        if rows:
+            now = now_shanghai_naive()
+            db.execute(insert(JobItem), [{**row, "job_id": job.id, "updated_at": now} for row in rows])
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def get_items(
+        self, db: Session, *, job_id: int, status: str | None = None, skip: int = 0, limit: int = 100
+    ) -> tuple[list[JobItem], int]:
+        query = db.query(JobItem).filter(JobItem.job_id == job_id)
+        if status:
+            query = query.filter(JobItem.status == status)
+        return query.order_by(JobItem.id).offset(skip).limit(limit).all(), query.count()
+
+    def pending_items(self, db: Session, *, job_id: int) -> list[tuple[int, str]]:
+        """待处理条目的 (id, target)。"""
+        return list(
+            db.execute(
+                select(JobItem.id, JobItem.target)
+                .where(JobItem.job_id == job_id, JobItem.status == "pending")
+                .order_by(JobItem.id)
+            ).tuples()
+        )
+
+    def unfinished(self, db: Session) -> list[tuple[int, str | None]]:
+        """queued/running 作业的 (id, owner)。"""
+        return list(db.execute(select(Job.id, Job.owner).where(Job.status.in_(("queued", "running")))).tuples())
+
+    def fail_unfinished(self, db: Session, *, job_id: int, detail: str) -> None:
+        """作业中断：未处理的条目与作业本身标记为 failed（同一事务）。"""
+        now = now_shanghai_naive()
+        pending = db.execute(
+            update(JobItem)
+            .where(JobItem.job_id == job_id, JobItem.status == "pending")
+            .values(status="failed", detail=detail, updated_at=now)
+        ).rowcount
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status.in_(("queued", "running")))
+            .values(status="failed", failed=Job.failed + pending, detail=detail, updated_at=now, finished_at=now)
+        )
+        db.commit()
+
+    def set_status(self, db: Session, *, job_id: int, status: str, detail: str | None = None) -> None:
+        values: dict[str, Any] = {"status": status, "updated_at": now_shanghai_naive()}
+        if detail is not None:
+            values["detail"] = detail
+        if status in ("succeeded", "partial", "failed"):
+            values["finished_at"] = now_shanghai_naive()
+        db.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.commit()
+
+    def finish_item(self, db: Session, *, item_id: int, job_id: int, ok: bool, detail: str | None = None) -> None:
+        """记录单个条目结果，并在同一事务内原子递增作业计数。"""
+        now = now_shanghai_naive()
+        db.execute(
+            update(JobItem)
+            .where(JobItem.id == item_id)
+            .values(status="succeeded" if ok else "failed", detail=detail, updated_at=now)
+        )
+        counter = Job.done if ok else Job.failed
+        db.execute(update(Job).where(Job.id == job_id).values(**{counter.key: counter + 1, "updated_at": now}))
+        db.commit()
+
+
+job = CRUDJob()
@@ -0,0 +1,27 @@
+from typing import Iterable
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.online_session import OnlineSession
+from app.schemas.client import ClientOnline
+from app.utils.time import now_shanghai_naive
+
+
+class CRUDOnlineSession(CRUDBase[OnlineSession, ClientOnline, ClientOnline]):
+    def get_all(self, db: Session) -> list[OnlineSession]:
+        return db.query(OnlineSession).order_by(OnlineSession.common_name, OnlineSession.client_id).all()
+
+    def replace_all(self, db: Session, sessions: Iterable[ClientOnline], *, commit: bool = True) -> None:
+        """整体替换在线会话表（同一事务内先删后插）。"""
+        now = now_shanghai_naive()
+        rows = [{**s.model_dump(), "updated_at": now} for s in sessions]
+        db.execute(delete(OnlineSession))
+        if rows:
+            db.execute(insert(OnlineSession), rows)
+        if commit:
+            db.commit()
+
+
+online_session = CRUDOnlineSession(OnlineSession)
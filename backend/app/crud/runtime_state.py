@@ -0,0 +1,23 @@
+from sqlalchemy.orm import Session
+
+from app.models.runtime_state import RuntimeState
+
+
+class CRUDRuntimeState:
+    model = RuntimeState
+
+    def get_value(self, db: Session, *, key: str) -> str | None:
+        row = db.query(RuntimeState).filter(RuntimeState.key == key).first()
+        return row.value if row else None
+
+    def set_value(self, db: Session, *, key: str, value: str | None, commit: bool = True) -> None:
+        row = db.query(RuntimeState).filter(RuntimeState.key == key).first()
+        if row is None:
+            db.add(RuntimeState(key=key, value=value))
+        else:
+            row.value = value
+        if commit:
+            db.commit()
+
+
+runtime_state = CRUDRuntimeState()
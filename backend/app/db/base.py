@@ -4,3 +4,6 @@ from app.models.certificate import Certificate  # noqa
 from app.models.client import Client  # noqa
 from app.models.user import User  # noqa
 from app.models.vpn_server import VPNServer  # noqa
+from app.models.online_session import OnlineSession  # noqa
+from app.models.runtime_state import RuntimeState  # noqa
+from app.models.job import Job, JobItem  # noqa
@@ -0,0 +1,83 @@
+"""
+会话级写入跟踪：本进程内对某个模型的 ORM 写入（flush 或批量 insert/update/delete）在提交时执行回调。
+
+可用 columns 限定只关心的列：flush 时按属性历史判断，批量 UPDATE 按 SET 的列判断；
+insert/delete 改变了行集合，总是计入。
+on_commit 的回调在提交成功后执行，应只做轻量操作（如使缓存失效、唤醒线程）；
+before_commit 的回调在同一事务内执行，可写入其他表（如递增版本号），与这次修改一起提交或回滚。
+"""
+
+from typing import Callable, Iterable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session
+
+
+def _statement_columns(state: ORMExecuteState) -> set[str]:
+    """批量 UPDATE 中 SET 的列名（.values() 的参数与 executemany 的参数键）。"""
+    # column_keys=[]：不把未显式赋值的列算入 SET；WHERE 条件的绑定参数带 _1 等后缀，与列名不会相同
+    columns = set(state.statement.compile(column_keys=[]).params)
+    params = state.parameters
+    for row in params if isinstance(params, list) else [params or {}]:
+        columns.update(row)
+    return columns
+
+
+def _watch(model: type, key: str, columns: Iterable[str] | None) -> None:
+    """写入 model（限定 columns 时只计这些列的变化）后在 session.info[key] 上做标记。"""
+    watched = frozenset(columns) if columns is not None else None
+
+    def _changed(obj) -> bool:
+        if watched is None:
+            return True
+        attrs = inspect(obj).attrs
+        return any(attrs[name].history.has_changes() for name in watched)
+
+    @event.listens_for(Session, "after_flush")
+    def _track_flush(session: Session, flush_context) -> None:
+        if any(isinstance(obj, model) for obj in (*session.new, *session.deleted)) or any(
+            isinstance(obj, model) and _changed(obj) for obj in session.dirty
+        ):
+            session.info[key] = True
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _track_bulk(state: ORMExecuteState) -> None:
+        if state.is_select:
+            return
+        mapper = state.bind_mapper
+        if mapper is None or mapper.class_ is not model:
+            return
+        if watched is None or not state.is_update or watched & _statement_columns(state):
+            state.session.info[key] = True
+
+    @event.listens_for(Session, "after_rollback")
+    def _reset(session: Session) -> None:
+        session.info.pop(key, None)
+
+
+def _key(stage: str, model: type, callback: Callable) -> str:
+    return f"change_tracking.{stage}.{model.__name__}.{getattr(callback, '__qualname__', id(callback))}"
+
+
+def on_commit(model: type, callback: Callable[[], None], *, columns: Iterable[str] | None = None) -> None:
+    """注册回调：提交的事务中有对 model 的写入时，在提交成功后执行。"""
+    key = _key("after", model, callback)
+    _watch(model, key, columns)
+
+    @event.listens_for(Session, "after_commit")
+    def _notify(session: Session) -> None:
+        if session.info.pop(key, False):
+            callback()
+
+
+def before_commit(model: type, callback: Callable[[Session], None], *, columns: Iterable[str] | None = None) -> None:
+    """注册回调：事务中有对 model 的写入时，在提交前以该 session 执行（写入随同一事务提交）。"""
+    key = _key("before", model, callback)
+    _watch(model, key, columns)
+
+    @event.listens_for(Session, "before_commit")
+    def _notify(session: Session) -> None:
+        # before_commit 早于提交时的 flush，先 flush 才能看到尚未写出的修改
+        session.flush()
+        if session.info.pop(key, False):
+            callback(session)
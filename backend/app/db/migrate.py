@@ -0,0 +1,118 @@
+"""
+数据库迁移（Alembic），应用启动时执行 upgrade head，替代原先的 create_all 与手写 ALTER TABLE。
+
+- 新库：从基线版本开始执行全部迁移；
+- 旧库（由 create_all 建立、没有 alembic_version 表，只可能是 SQLite）：按基线版本的结构补齐缺失的表、列与索引，
+  标记为基线版本后再执行之后的迁移；基线结构通过在内存 SQLite 中执行基线迁移再反射得到，
+  不能直接用当前模型（否则之后迁移新增的列/索引会被提前建好，迁移时重复创建）；
+- 多个 worker / API 节点同时启动时串行执行：PostgreSQL 使用 advisory lock，SQLite 使用数据目录下的文件锁。
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+from app.core.config import get_settings
+from app.db import base
+from app.db.session import engine
+
+try:  # pragma: no cover - 非 POSIX 平台没有 fcntl
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+BASELINE_REVISION = "0001"
+
+_MIGRATIONS_PATH = Path(__file__).resolve().parent / "migrations"
+_ADVISORY_LOCK_KEY = 0x6F76706E  # "ovpn"
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    cfg = Config()
+    cfg.set_main_option("script_location", str(_MIGRATIONS_PATH))
+    if connection is not None:
+        cfg.attributes["connection"] = connection
+    return cfg
+
+
+@contextmanager
+def _migration_lock() -> Iterator[None]:
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(sa.text("SELECT pg_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(sa.text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+        return
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(Path(settings.sqlite_path).parent / "migrate.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def _baseline_metadata() -> sa.MetaData:
+    """在内存 SQLite 中执行到基线版本并反射出表结构。"""
+    scratch = sa.create_engine("sqlite://")
+    try:
+        with scratch.begin() as conn:
+            command.upgrade(alembic_config(conn), BASELINE_REVISION)
+            metadata = sa.MetaData()
+            metadata.reflect(conn)
+    finally:
+        scratch.dispose()
+    metadata.remove(metadata.tables["alembic_version"])
+    return metadata
+
+
+def _adopt_legacy(connection: Connection) -> None:
+    """把 create_all 建立的旧库补齐到基线结构（只增不删）。"""
+    inspector = inspect(connection)
+    existing = set(inspector.get_table_names())
+    ops = Operations(MigrationContext.configure(connection))
+    for table in _baseline_metadata().sorted_tables:
+        if table.name not in existing:
+            table.create(connection)
+            logger.info("Created missing table %s", table.name)
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                # 已有数据行无法满足 NOT NULL，补列一律允许为空
+                ops.add_column(table.name, sa.Column(column.name, column.type, nullable=True))
+                logger.info("Added missing column %s.%s", table.name, column.name)
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+
+
+def upgrade_database() -> None:
+    """将数据库升级到最新版本。"""
+    with _migration_lock(), engine.begin() as connection:
+        cfg = alembic_config(connection)
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and tables & set(base.Base.metadata.tables):
+            logger.info("Existing database without migration history, stamping as %s", BASELINE_REVISION)
+            _adopt_legacy(connection)
+            command.stamp(cfg, BASELINE_REVISION)
+        command.upgrade(cfg, "head")
@@ -0,0 +1,195 @@
+"""baseline schema
+
+初始表结构（替代原先启动时的 Base.metadata.create_all）。
+已有的旧库由 app/db/migrate.py 补齐缺失的表/列/索引后直接标记为本版本。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 02:46:53.569816
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "auditlog",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("actor", sa.String(length=100), nullable=False),
+        sa.Column("action", sa.String(length=200), nullable=False),
+        sa.Column("target", sa.String(length=200), nullable=True),
+        sa.Column("result", sa.String(length=50), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_auditlog_id", "auditlog", ["id"], unique=False)
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=50), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("actor", sa.String(length=100), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("done", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("detail", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_jobs_id", "jobs", ["id"], unique=False)
+    op.create_index("ix_jobs_kind", "jobs", ["kind"], unique=False)
+
+    op.create_table(
+        "online_sessions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("common_name", sa.String(length=100), nullable=False),
+        sa.Column("real_address", sa.String(length=100), nullable=False),
+        sa.Column("virtual_address", sa.String(length=50), nullable=False),
+        sa.Column("bytes_received", sa.BigInteger(), nullable=False),
+        sa.Column("bytes_sent", sa.BigInteger(), nullable=False),
+        sa.Column("connected_since", sa.String(length=50), nullable=False),
+        sa.Column("client_id", sa.String(length=20), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_online_sessions_common_name", "online_sessions", ["common_name"], unique=True)
+    op.create_index("ix_online_sessions_id", "online_sessions", ["id"], unique=False)
+
+    op.create_table(
+        "runtime_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("key", sa.String(length=100), nullable=False),
+        sa.Column("value", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_runtime_state_id", "runtime_state", ["id"], unique=False)
+    op.create_index("ix_runtime_state_key", "runtime_state", ["key"], unique=True)
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(length=50), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=True),
+        sa.Column("hashed_password", sa.String(length=255), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("is_superuser", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_id", "users", ["id"], unique=False)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "vpnservers",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("host", sa.String(length=255), nullable=False),
+        sa.Column("port", sa.Integer(), nullable=False),
+        sa.Column("protocol", sa.String(length=10), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("vpn_ip", sa.String(length=50), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_vpnservers_id", "vpnservers", ["id"], unique=False)
+    op.create_index("ix_vpnservers_name", "vpnservers", ["name"], unique=True)
+
+    op.create_table(
+        "certificates",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("serial_number", sa.String(length=128), nullable=False),
+        sa.Column("common_name", sa.String(length=100), nullable=False),
+        sa.Column("not_before", sa.DateTime(), nullable=False),
+        sa.Column("not_after", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=True),
+        sa.Column("vpn_server_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["vpn_server_id"], ["vpnservers.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_certificates_common_name", "certificates", ["common_name"], unique=False)
+    op.create_index("ix_certificates_id", "certificates", ["id"], unique=False)
+    op.create_index("ix_certificates_not_after", "certificates", ["not_after"], unique=False)
+    op.create_index("ix_certificates_serial_number", "certificates", ["serial_number"], unique=True)
+    op.create_index("ix_certificates_status", "certificates", ["status"], unique=False)
+
+    op.create_table(
+        "job_items",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("target", sa.String(length=200), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("detail", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_job_items_id", "job_items", ["id"], unique=False)
+    op.create_index("ix_job_items_job_id", "job_items", ["job_id"], unique=False)
+
+    op.create_table(
+        "clients",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("common_name", sa.String(length=100), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("fixed_ip", sa.String(length=50), nullable=True),
+        sa.Column("routes", sa.String(length=500), nullable=True),
+        sa.Column("disabled", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("certificate_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["certificate_id"], ["certificates.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_clients_common_name", "clients", ["common_name"], unique=True)
+    op.create_index("ix_clients_id", "clients", ["id"], unique=False)
+    op.create_index("ix_clients_name", "clients", ["name"], unique=True)
+    op.create_index("ix_clients_status", "clients", ["status"], unique=False)
+
+
+
+def downgrade() -> None:
+    op.drop_index("ix_clients_status", table_name="clients")
+    op.drop_index("ix_clients_name", table_name="clients")
+    op.drop_index("ix_clients_id", table_name="clients")
+    op.drop_index("ix_clients_common_name", table_name="clients")
+    op.drop_table("clients")
+    op.drop_index("ix_job_items_job_id", table_name="job_items")
+    op.drop_index("ix_job_items_id", table_name="job_items")
+    op.drop_table("job_items")
+    op.drop_index("ix_certificates_status", table_name="certificates")
+    op.drop_index("ix_certificates_serial_number", table_name="certificates")
+    op.drop_index("ix_certificates_not_after", table_name="certificates")
+    op.drop_index("ix_certificates_id", table_name="certificates")
+    op.drop_index("ix_certificates_common_name", table_name="certificates")
+    op.drop_table("certificates")
+    op.drop_index("ix_vpnservers_name", table_name="vpnservers")
+    op.drop_index("ix_vpnservers_id", table_name="vpnservers")
+    op.drop_table("vpnservers")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
+    op.drop_index("ix_runtime_state_key", table_name="runtime_state")
+    op.drop_index("ix_runtime_state_id", table_name="runtime_state")
+    op.drop_table("runtime_state")
+    op.drop_index("ix_online_sessions_id", table_name="online_sessions")
+    op.drop_index("ix_online_sessions_common_name", table_name="online_sessions")
+    op.drop_table("online_sessions")
+    op.drop_index("ix_jobs_kind", table_name="jobs")
+    op.drop_index("ix_jobs_id", table_name="jobs")
+    op.drop_table("jobs")
+    op.drop_index("ix_auditlog_id", table_name="auditlog")
+    op.drop_table("auditlog")
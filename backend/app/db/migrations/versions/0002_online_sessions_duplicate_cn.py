@@ -0,0 +1,27 @@
+"""online sessions allow duplicate cn
+
+开启 duplicate-cn 时 status 3 中同一 CN 会出现多次，common_name 不再唯一，会话按 client_id 区分。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 03:05:12.418223
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_online_sessions_common_name", table_name="online_sessions")
+    op.create_index("ix_online_sessions_common_name", "online_sessions", ["common_name"], unique=False)
+    op.create_index("ix_online_sessions_client_id", "online_sessions", ["client_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_online_sessions_client_id", table_name="online_sessions")
+    op.drop_index("ix_online_sessions_common_name", table_name="online_sessions")
+    op.create_index("ix_online_sessions_common_name", "online_sessions", ["common_name"], unique=True)
@@ -0,0 +1,27 @@
+"""ensure certificate stats indexes
+
+证书统计（SUM(CASE) 按 status / not_after 聚合）依赖这两个索引。基线已包含它们，
+这里用 IF NOT EXISTS 再保证一次：库若是通过命令行 `alembic stamp` 等方式标记版本、未经
+app/db/migrate.py 补齐，也能补上索引。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 03:12:40.731906
+"""
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_certificates_status", "certificates", ["status"], unique=False, if_not_exists=True)
+    op.create_index("ix_certificates_not_after", "certificates", ["not_after"], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    # 索引属于基线结构，降级时保留
+    pass
@@ -0,0 +1,26 @@
+"""job owner
+
+记录执行作业的进程（主机名:pid:启动时间），leader 据此把进程退出后遗留的作业标记为失败。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 03:31:08.264517
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.add_column(sa.Column("owner", sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("owner")
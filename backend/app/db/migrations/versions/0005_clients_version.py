@@ -0,0 +1,38 @@
+"""clients version
+
+在 runtime_state 中预置 clients.version：准入相关列或行集合变化的事务会在提交前递增它，
+tls-verify 快照据此判断是否需要重新加载，不受其他表提交的影响。预置该行后递增只需 UPDATE，
+多节点并发提交时不会因同时插入而冲突。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 05:02:17.418236
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.utils.time import now_shanghai_naive
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+_KEY = "clients.version"
+
+
+def upgrade() -> None:
+    runtime_state = sa.table(
+        "runtime_state",
+        sa.column("key", sa.String),
+        sa.column("value", sa.Text),
+        sa.column("updated_at", sa.DateTime),
+    )
+    conn = op.get_bind()
+    if conn.execute(sa.select(runtime_state.c.key).where(runtime_state.c.key == _KEY)).first() is None:
+        op.bulk_insert(runtime_state, [{"key": _KEY, "value": "0", "updated_at": now_shanghai_naive()}])
+
+
+def downgrade() -> None:
+    op.execute(sa.text("DELETE FROM runtime_state WHERE key = :key").bindparams(key=_KEY))
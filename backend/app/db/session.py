@@ -1,18 +1,39 @@
 from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import get_settings
+from app.db import tuning
 
 
 settings = get_settings()
+# 数据目录同时存放各类锁文件，使用其他数据库时也需要存在
 Path(settings.sqlite_path).parent.mkdir(parents=True, exist_ok=True)
 
-engine = create_engine(
-    f"sqlite:///{settings.sqlite_path}",
-    connect_args={"check_same_thread": False},
-    future=True,
-)
+url = make_url(settings.database_url or f"sqlite:///{settings.sqlite_path}")
+
+# 连接池按 worker 进程计算：每个 gunicorn worker 各自持有 pool_size + max_overflow 个连接
+if url.get_backend_name() == "sqlite":
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout / 1000},
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        future=True,
+    )
+    event.listen(engine, "connect", tuning.apply_pragmas)
+else:
+    engine = create_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle,
+        future=True,
+    )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
@@ -0,0 +1,79 @@
+"""
+SQLite 连接调优与定期维护。
+
+多个 gunicorn worker、后台任务以及 OpenVPN 侧的 tls_verify.py 共用同一个数据库文件：
+- WAL 模式下读写互不阻塞，写入只需追加 WAL；synchronous=NORMAL 在 WAL 下仍保证崩溃一致性；
+- busy_timeout 让并发写入排队等待而不是立即报 "database is locked"；
+- mmap / cache_size 减少热点页的系统调用与重复读取。
+这些 PRAGMA 在每个新连接上执行（journal_mode 为库级持久设置，其余为连接级）。
+SQLITE_JOURNAL_MODE 为空时不修改库现有的日志模式；与现有模式不同时才切换，并记录告警。
+
+tls_verify.py 的最后一级回退以 OpenVPN 降权后的用户（通常是 nobody）只读打开数据库。
+WAL 模式下只读连接需要能读取 -wal/-shm（SQLite 按库文件的权限创建它们），启动时检查并告警。
+
+WAL 文件只有在没有读者占用时才能完整回卷，后台任务定期执行 wal_checkpoint(TRUNCATE)
+控制其大小，并执行 PRAGMA optimize 按需刷新查询规划器统计信息。
+"""
+
+import logging
+import stat
+from pathlib import Path
+
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def apply_pragmas(dbapi_connection, connection_record) -> None:
+    """engine "connect" 事件：为新建的 SQLite 连接设置 PRAGMA。"""
+    cursor = dbapi_connection.cursor()
+    try:
+        if settings.sqlite_journal_mode:
+            current = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+            if current.lower() != settings.sqlite_journal_mode.lower():
+                changed = cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}").fetchone()[0]
+                logger.warning("SQLite journal mode changed from %s to %s", current, changed)
+        if settings.sqlite_synchronous:
+            cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def maintain(engine: Engine) -> None:
+    """回卷 WAL 并刷新统计信息；有长读事务时 checkpoint 只能部分完成，下次再试。"""
+    with engine.connect() as conn:
+        busy, wal_pages, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()
+        conn.exec_driver_sql("PRAGMA optimize")
+    if busy:
+        logger.info("SQLite WAL checkpoint incomplete: %s/%s pages", checkpointed, wal_pages)
+
+
+def check_readonly_access(engine: Engine) -> None:
+    """WAL 模式下检查库文件及 -wal/-shm 是否对其他用户可读（tls_verify.py 只读回退需要），不满足时告警。"""
+    path = Path(engine.url.database)
+    with engine.connect() as conn:
+        mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        if str(mode).lower() != "wal":
+            return
+        # 连接打开期间 -wal/-shm 一定存在
+        unreadable = [
+            str(p)
+            for p in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm"))
+            if p.exists() and not p.stat().st_mode & stat.S_IROTH
+        ]
+    if not path.parent.stat().st_mode & stat.S_IXOTH:
+        unreadable.append(str(path.parent))
+    if unreadable:
+        logger.warning(
+            "SQLite is in WAL mode but not readable by other users (%s); tls_verify.py cannot fall back to "
+            "querying the database as the OpenVPN user. Make them readable by that user, or enable "
+            "ADMISSION_FILE_ENABLED / TLS_VERIFY_SERVER_ENABLED.",
+            ", ".join(unreadable),
+        )
@@ -1,4 +1,5 @@
 import logging
+from functools import partial
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,8 +9,9 @@ from app.api.api_v1 import api_router
 from app.api.deps import get_db_context
 from app.core.config import get_settings
 from app.core.logging_config import setup_logging
-from app.db import base  # noqa: F401
+from app.db import migrate, tuning
 from app.db.session import engine
+from app.services import admission, background, events, jobs, key_pool, pki_sync, poller, tls_verifier
 
 
 settings = get_settings()
@@ -37,7 +39,10 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    base.Base.metadata.create_all(bind=engine)
+    # 建表与结构变更由 Alembic 迁移完成（app/db/migrations），多 worker / 多节点同时启动时串行执行
+    migrate.upgrade_database()
+    if engine.dialect.name == "sqlite":
+        tuning.check_readonly_access(engine)
 
     # seed default admin if not exists
     with get_db_context() as db:
@@ -56,8 +61,43 @@ def create_app() -> FastAPI:
                 ),
             )
 
+    # 启动时按当前 clients 表生成一次准入文件；未启用时删除旧文件
+    if settings.admission_file_enabled:
+        admission.publish()
+    else:
+        admission.remove()
+
     app.include_router(api_router, prefix=settings.api_v1_prefix)
 
+    if settings.management_poller_enabled:
+        background.register(
+            background.PeriodicTask("management-poller", settings.management_poll_interval, poller.poll_once)
+        )
+    if settings.management_events_enabled:
+        background.register(events.ManagementEventListener())
+    if settings.pki_sync_interval > 0:
+        background.register(background.PeriodicTask("pki-index-sync", settings.pki_sync_interval, pki_sync.sync_once))
+    if settings.key_pool_enabled:
+        background.register(
+            background.PeriodicTask("key-pool-refill", settings.key_pool_refill_interval, key_pool.refill)
+        )
+    if settings.job_reaper_interval > 0:
+        background.register(background.PeriodicTask("job-reaper", settings.job_reaper_interval, jobs.fail_orphaned))
+    if engine.dialect.name == "sqlite" and settings.sqlite_maintenance_interval > 0:
+        background.register(
+            background.PeriodicTask(
+                "sqlite-maintenance", settings.sqlite_maintenance_interval, partial(tuning.maintain, engine)
+            )
+        )
+    if settings.admission_file_enabled and settings.admission_refresh_interval > 0:
+        background.register(
+            background.PeriodicTask("admission-refresh", settings.admission_refresh_interval, admission.publish)
+        )
+    if settings.tls_verify_server_enabled:
+        background.register(tls_verifier.TlsVerifyServer(settings.tls_verify_socket_path))
+    app.add_event_handler("startup", background.start_background_tasks)
+    app.add_event_handler("shutdown", background.stop_background_tasks)
+
     if is_dev:
         logger = logging.getLogger(__name__)
         logger.info("Swagger UI: http://localhost:8000/docs  |  OpenAPI: %s/openapi.json", settings.api_v1_prefix)
@@ -13,8 +13,8 @@ class Certificate(Base):
     serial_number: Mapped[str] = mapped_column(String(128), unique=True, index=True)
     common_name: Mapped[str] = mapped_column(String(100), index=True)
     not_before: Mapped[datetime] = mapped_column(DateTime)
-    not_after: Mapped[datetime] = mapped_column(DateTime)
-    status: Mapped[str] = mapped_column(String(20), default="valid")  # valid/revoked/expired
+    not_after: Mapped[datetime] = mapped_column(DateTime, index=True)
+    status: Mapped[str] = mapped_column(String(20), default="valid", index=True)  # valid/revoked/expired
     revoked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     client = relationship("Client", back_populates="certificate", uselist=False)
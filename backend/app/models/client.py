@@ -1,11 +1,17 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, cast, update
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 
+from app.db import change_tracking
 from app.db.base_class import Base
+from app.models.runtime_state import RuntimeState
 from app.utils.time import now_shanghai_naive
 
+# 准入信息版本号：影响准入判定与下发配置的列或行集合变化时，随同一事务递增（见 tls_verifier）
+CLIENTS_VERSION_KEY = "clients.version"
+_POLICY_COLUMNS = ("common_name", "disabled", "fixed_ip", "routes")
+
 
 class Client(Base):
     __tablename__ = "clients"
@@ -13,7 +19,7 @@ class Client(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), unique=True, index=True)
     common_name: Mapped[str] = mapped_column(String(100), unique=True, index=True)
-    status: Mapped[str] = mapped_column(String(20), default="offline")  # online/offline/disabled
+    status: Mapped[str] = mapped_column(String(20), default="offline", index=True)  # online/offline/disabled
     fixed_ip: Mapped[str | None] = mapped_column(String(50), nullable=True)
     routes: Mapped[str | None] = mapped_column(String(500), nullable=True)  # comma-separated routes
     disabled: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -21,3 +27,18 @@ class Client(Base):
 
     certificate_id: Mapped[int | None] = mapped_column(ForeignKey("certificates.id"), nullable=True)
     certificate = relationship("Certificate", back_populates="client", uselist=False)
+
+
+def _bump_clients_version(session: Session) -> None:
+    result = session.execute(
+        update(RuntimeState)
+        .where(RuntimeState.key == CLIENTS_VERSION_KEY)
+        .values(value=cast(cast(RuntimeState.value, Integer) + 1, String)),
+        execution_options={"synchronize_session": False},
+    )
+    if not result.rowcount:
+        session.add(RuntimeState(key=CLIENTS_VERSION_KEY, value="1"))
+
+
+# 随模型注册：任何写 clients 的进程（包括命令行脚本）都会递增版本号
+change_tracking.before_commit(Client, _bump_clients_version, columns=_POLICY_COLUMNS)
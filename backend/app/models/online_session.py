@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+from app.utils.time import now_shanghai_naive
+
+
+class OnlineSession(Base):
+    """当前在线会话（由后台轮询/事件写入，供各 worker 共享读取）。
+
+    开启 duplicate-cn 时同一 CN 可有多条会话，以 management 的 client_id 区分。
+    """
+
+    __tablename__ = "online_sessions"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    common_name: Mapped[str] = mapped_column(String(100), index=True)
+    real_address: Mapped[str] = mapped_column(String(100), default="")
+    virtual_address: Mapped[str] = mapped_column(String(50), default="")
+    bytes_received: Mapped[int] = mapped_column(BigInteger, default=0)
+    bytes_sent: Mapped[int] = mapped_column(BigInteger, default=0)
+    connected_since: Mapped[str] = mapped_column(String(50), default="")
+    client_id: Mapped[str | None] = mapped_column(String(20), nullable=True, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=now_shanghai_naive)
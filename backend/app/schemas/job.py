@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: str
+    actor: str
+    total: int
+    done: int
+    failed: int
+    detail: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobItem(BaseModel):
+    id: int
+    target: str
+    status: str
+    detail: str | None = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class JobItemPage(BaseModel):
+    items: list[JobItem]
+    total: int
+    page: int
+    page_size: int
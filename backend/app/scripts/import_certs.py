@@ -5,6 +5,7 @@
 
 使用方法:
     docker exec ovpn-backend python -m app.scripts.import_certs
+    docker exec ovpn-backend python -m app.scripts.import_certs --incremental  # 仅按 index.txt 增量同步
 """
 
 import sys
@@ -14,10 +15,42 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
 from app.api.deps import get_db_context
+from app.core.config import get_settings
+from app.services import admission
 from app.services.importer import import_certificates_from_easyrsa, import_openvpn
+from app.services.pki_sync import sync_from_index
+
+
+def sync_index(db) -> None:
+    result = sync_from_index(db)
+    if "error" in result:
+        print(f"  ✗ 错误: {result['error']}")
+        return
+    print(f"  ✓ 模式: {result['mode']}，处理 {result['lines']} 行，耗时 {result['elapsed']} 秒")
+    print(f"  ✓ 新增: {result['created']} 个，更新: {result['updated']} 个")
+    for err in result.get("errors", [])[:10]:
+        print(f"    - {err}")
+
+
+def publish_admission() -> None:
+    # 提交钩子只唤醒后台线程，脚本随即退出会丢失这次生成，这里同步生成一次
+    if not get_settings().admission_file_enabled:
+        return
+    try:
+        changed = admission.publish()
+        print(f"  ✓ 准入文件{'已更新' if changed else '无变化'}")
+    except Exception as e:
+        print(f"  ✗ 准入文件生成失败: {str(e)}")
 
 
 def main():
+    if "--incremental" in sys.argv:
+        with get_db_context() as db:
+            print("按 Easy-RSA index.txt 增量同步证书...")
+            sync_index(db)
+        publish_admission()
+        return 0
+
     print("=" * 60)
     print("导入 OpenVPN 证书到数据库")
     print("=" * 60)
@@ -43,6 +76,8 @@ def main():
                 result2 = import_certificates_from_easyrsa(db)
                 print(f"  ✓ 创建: {result2.get('created', 0)} 个证书")
                 print(f"  ✓ 跳过: {result2.get('skipped', 0)} 个已存在")
+                if "elapsed" in result2:
+                    print(f"  ✓ 耗时: {result2['elapsed']} 秒 ({result2['per_second']} 个/秒)")
                 
                 if "error" in result2:
                     print(f"  ✗ 错误: {result2['error']}")
@@ -57,6 +92,15 @@ def main():
                 traceback.print_exc()
             print()
 
+            # 3. 按 index.txt 同步吊销/过期状态，并记录同步位置供后续增量同步
+            print("步骤 3: 按 Easy-RSA index.txt 同步证书状态...")
+            try:
+                sync_index(db)
+            except Exception as e:
+                print(f"  ✗ 错误: {str(e)}")
+            print()
+
+        publish_admission()
         print("=" * 60)
         print("导入完成!")
         print("=" * 60)
@@ -6,19 +6,35 @@ Usage (server.conf):
   script-security 3
   tls-verify /root/ovpnManager/backend/app/scripts/tls_verify.py
 
+The decision is taken from the first available source:
+  1. the admission file published by the backend (ADMISSION_FILE_ENABLED=true), via mmap + binary search;
+     a common name missing from the file (e.g. created on another node) falls through to the next source;
+  2. the backend verifier service over a Unix socket (TLS_VERIFY_SERVER_ENABLED=true);
+  3. a direct read-only query of the database (under WAL the OpenVPN user must be able to read the
+     -wal/-shm files; when the backend is stopped and they are gone, the file is read as immutable).
+Only os/mmap/socket/sys are imported on the fast paths.
+
 Environment override:
-  OVPNM_DB_PATH=/path/to/app.db   # optional, defaults to repo data/app.db
+  OVPNM_DB_PATH=/path/to/app.db                  # optional, defaults to repo data/app.db
+  OVPNM_ADMISSION_FILE=/path/to/admission.list   # optional, defaults to repo data/admission.list
+  OVPNM_VERIFY_SOCKET=/path/to/tls_verify.sock   # optional, defaults to repo data/tls_verify.sock
 """
 
 from __future__ import annotations
 
+import mmap
 import os
-import sqlite3
+import socket
 import sys
 from pathlib import Path
 
 
-DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "app.db"
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+DEFAULT_DB_PATH = DATA_DIR / "app.db"
+DEFAULT_SOCKET_PATH = DATA_DIR / "tls_verify.sock"
+DEFAULT_ADMISSION_FILE = DATA_DIR / "admission.list"
+ADMISSION_MAGIC = b"ovpnm-admission 1"
+SOCKET_TIMEOUT = 2.0
 
 
 def _load_db_path() -> Path:
@@ -28,31 +44,122 @@ def _load_db_path() -> Path:
     return DEFAULT_DB_PATH
 
 
-def main() -> int:
-    cn = os.environ.get("common_name")
-    if not cn:
-        sys.stderr.write("tls-verify: missing common_name env\n")
+def _search(mm: mmap.mmap, start: int, key: bytes) -> bytes | None:
+    """Binary search the sorted `<cn>\\t<flag>` lines in mm[start:] and return the flag."""
+    lo, hi = start, len(mm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        line_start = max(mm.rfind(b"\n", lo, mid) + 1, lo)
+        line_end = mm.find(b"\n", line_start)
+        if line_end == -1:
+            line_end = len(mm)
+        name, _, flag = mm[line_start:line_end].partition(b"\t")
+        if name == key:
+            return flag
+        if name < key:
+            lo = line_end + 1
+        else:
+            hi = line_start
+    return None
+
+
+def _lookup_admission_file(cn: str) -> int | None:
+    """Return the exit code decided by the published admission file, or None if it is unavailable or has no entry."""
+    path = os.environ.get("OVPNM_ADMISSION_FILE") or str(DEFAULT_ADMISSION_FILE)
+    try:
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b"\n")
+            if header_end == -1 or mm[:header_end] != ADMISSION_MAGIC:
+                return None
+            flag = _search(mm, header_end + 1, cn.encode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    if flag == b"A":
+        return 0
+    if flag == b"D":
+        sys.stderr.write(f"tls-verify: client {cn} is disabled\n")
         return 1
+    return None
 
-    db_path = _load_db_path()
-    if not db_path.exists():
-        sys.stderr.write(f"tls-verify: db not found at {db_path}\n")
+
+def _ask_daemon(cn: str) -> int | None:
+    """Return the exit code decided by the verifier service, or None to fall back to the database."""
+    path = os.environ.get("OVPNM_VERIFY_SOCKET") or str(DEFAULT_SOCKET_PATH)
+    if not os.path.exists(path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(SOCKET_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(cn.encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                reply = reader.readline().decode("utf-8", errors="replace").strip()
+    except OSError:
+        return None
+    if reply == "ALLOW":
+        return 0
+    if reply.startswith("DENY"):
+        sys.stderr.write(f"tls-verify: client {cn} rejected: {reply[5:]}\n")
         return 1
+    return None
+
+
+# Errors raised when a read-only user cannot create or map the -shm file of a WAL database:
+# SQLITE_CANTOPEN (and its extended codes), READONLY_CANTLOCK, READONLY_CANTINIT, READONLY_DIRECTORY.
+_SQLITE_CANTOPEN = 14
+_SHM_OPEN_CODES = frozenset({520, 1288, 1544})
+# Python < 3.11 has no sqlite_errorcode; match the corresponding messages instead
+_SHM_OPEN_MESSAGES = ("unable to open database file", "attempt to write a readonly database")
+
 
+def _is_shm_open_error(exc: Exception) -> bool:
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF == _SQLITE_CANTOPEN or code in _SHM_OPEN_CODES
+    return str(exc) in _SHM_OPEN_MESSAGES
+
+
+def _query_db(db_path: Path, cn: str, immutable: bool = False):
+    import sqlite3
+
+    uri = f"file:{db_path}?mode=ro" + ("&immutable=1" if immutable else "")
+    conn = sqlite3.connect(uri, uri=True)
     try:
-        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
-    except Exception as exc:  # pragma: no cover - defensive
-        sys.stderr.write(f"tls-verify: cannot open db: {exc}\n")
+        return conn.execute("SELECT disabled FROM clients WHERE common_name = ?", (cn,)).fetchone()
+    finally:
+        conn.close()
+
+
+def _check_db(cn: str) -> int:
+    import sqlite3
+
+    db_path = _load_db_path()
+    if not db_path.exists():
+        sys.stderr.write(f"tls-verify: db not found at {db_path}\n")
         return 1
 
     try:
-        cur = conn.execute("SELECT disabled FROM clients WHERE common_name = ?", (cn,))
-        row = cur.fetchone()
+        row = _query_db(db_path, cn)
+    except sqlite3.OperationalError as exc:
+        # In WAL mode a read-only connection needs the -shm/-wal files. When the backend is stopped they
+        # are removed and this user cannot create them; with no -wal file the main file is complete,
+        # so it can be read as immutable. Any other error (e.g. "database is locked" while a rollback
+        # journal write is in progress) or an existing but unreadable -wal, which may hold newer
+        # commits, fails closed.
+        if not _is_shm_open_error(exc):
+            sys.stderr.write(f"tls-verify: query failed: {exc}\n")
+            return 1
+        if os.path.exists(f"{db_path}-wal"):
+            sys.stderr.write(f"tls-verify: query failed: {exc} (check permissions of {db_path}-wal/-shm)\n")
+            return 1
+        try:
+            row = _query_db(db_path, cn, immutable=True)
+        except Exception as exc2:  # pragma: no cover - defensive
+            sys.stderr.write(f"tls-verify: query failed: {exc2}\n")
+            return 1
     except Exception as exc:  # pragma: no cover - defensive
         sys.stderr.write(f"tls-verify: query failed: {exc}\n")
         return 1
-    finally:
-        conn.close()
 
     if row is None:
         sys.stderr.write(f"tls-verify: unknown client {cn}\n")
@@ -66,5 +173,18 @@ def main() -> int:
     return 0
 
 
+def main() -> int:
+    cn = os.environ.get("common_name")
+    if not cn:
+        sys.stderr.write("tls-verify: missing common_name env\n")
+        return 1
+
+    for source in (_lookup_admission_file, _ask_daemon):
+        decided = source(cn)
+        if decided is not None:
+            return decided
+    return _check_db(cn)
+
+
 if __name__ == "__main__":
     sys.exit(main())
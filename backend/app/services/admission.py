@@ -0,0 +1,120 @@
+"""
+预编译的准入文件：供 tls_verify.py 以 mmap + 二分查找判定，不依赖数据库和常驻服务。
+
+格式：首行为 MAGIC，其后每行 `<common_name>\\t<A|D>`（A 允许、D 已禁用），按 UTF-8 字节序排序。
+tls_verify.py 查不到的 CN 继续询问校验服务或数据库，不直接拒绝。
+
+本进程内提交的事务改变了 clients 的行集合或 common_name/disabled 时，由后台线程重新生成：
+读取整张表、内容有变化时写临时文件再原子改名；请求线程只负责唤醒，不等待生成。
+跨 worker 用文件锁串行化“读取 + 替换”，保证最后落盘的是最新快照。
+文件按节点生成：多节点共享 PostgreSQL 时，其他节点的写入由 ADMISSION_REFRESH_INTERVAL 定期补齐。
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.db import change_tracking
+from app.db.session import engine
+from app.models.client import Client
+
+try:  # pragma: no cover - 非 POSIX 平台没有 fcntl
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ovpnm-admission 1"
+
+_wakeup = threading.Event()
+_publisher_lock = threading.Lock()
+_publisher: threading.Thread | None = None
+
+
+def render(rows: list[tuple[str, bool]]) -> bytes:
+    entries = sorted(
+        (cn.encode("utf-8"), b"D" if disabled else b"A")
+        for cn, disabled in rows
+        # 分隔符出现在 CN 中会破坏行格式；这类 CN 查不到，交由校验服务或数据库判定
+        if cn and "\t" not in cn and "\n" not in cn
+    )
+    return b"\n".join([MAGIC, *(cn + b"\t" + flag for cn, flag in entries)]) + b"\n"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        # OpenVPN 降权后执行 tls_verify.py，需要可读
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def publish() -> bool:
+    """按当前 clients 表生成准入文件，内容有变化时写入并返回 True。"""
+    path = Path(settings.admission_file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path.with_name(path.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        with engine.connect() as conn:
+            rows = conn.execute(select(Client.common_name, Client.disabled)).tuples().all()
+        data = render(rows)
+        # 与磁盘上的内容比较（可能由其他 worker 写入），未变化时不替换
+        try:
+            if path.read_bytes() == data:
+                return False
+        except FileNotFoundError:
+            pass
+        _write_atomic(path, data)
+        return True
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def _publish_loop() -> None:
+    while True:
+        _wakeup.wait()
+        # 先清除再生成：生成期间到达的提交会再次唤醒，由下一轮读取最新数据
+        _wakeup.clear()
+        try:
+            publish()
+        except Exception:
+            logger.exception("Failed to publish admission file")
+
+
+def request_publish() -> None:
+    """唤醒后台线程重新生成，不阻塞调用方；连续多次请求合并为一次生成。"""
+    global _publisher
+    _wakeup.set()
+    with _publisher_lock:
+        if _publisher is None or not _publisher.is_alive():
+            _publisher = threading.Thread(target=_publish_loop, name="admission-publish", daemon=True)
+            _publisher.start()
+
+
+def remove() -> None:
+    """关闭该功能时删除旧文件，避免 tls_verify.py 读到过期快照。"""
+    Path(settings.admission_file_path).unlink(missing_ok=True)
+
+
+def _on_clients_commit() -> None:
+    if settings.admission_file_enabled:
+        request_publish()
+
+
+change_tracking.on_commit(Client, _on_clients_commit, columns=("common_name", "disabled"))
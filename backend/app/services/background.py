@@ -0,0 +1,99 @@
+"""
+后台任务注册与启动。
+
+Gunicorn 多 worker 时每个进程都会执行 create_app，这里通过数据目录下的文件锁
+选出一个 leader 进程运行后台任务，其余 worker 只读取共享结果。
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Protocol
+
+from app.core.config import get_settings
+
+try:  # pragma: no cover - 非 POSIX 平台没有 fcntl
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_lock_fd: int | None = None
+_tasks: list["BackgroundTask"] = []
+
+
+class BackgroundTask(Protocol):
+    name: str
+
+    def start(self) -> None: ...
+
+    def stop(self) -> None: ...
+
+
+class PeriodicTask:
+    """以固定间隔在守护线程中执行的任务。"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None]) -> None:
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Background task %s failed", self.name)
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+
+def acquire_leader_lock() -> bool:
+    """尝试成为后台任务 leader（非阻塞文件锁，进程退出时自动释放）。"""
+    global _lock_fd
+    if _lock_fd is not None:
+        return True
+    if fcntl is None:
+        return True
+    lock_path = Path(settings.sqlite_path).parent / "background.lock"
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _lock_fd = fd
+    return True
+
+
+def register(task: BackgroundTask) -> None:
+    _tasks.append(task)
+
+
+def start_background_tasks() -> None:
+    if not _tasks:
+        return
+    if not acquire_leader_lock():
+        logger.info("Background tasks are running in another worker; skipping in pid=%s", os.getpid())
+        return
+    for task in _tasks:
+        logger.info("Starting background task %s", task.name)
+        task.start()
+
+
+def stop_background_tasks() -> None:
+    for task in _tasks:
+        task.stop()
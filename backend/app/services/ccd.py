@@ -1,3 +1,4 @@
+import shlex
 from ipaddress import ip_network
 from pathlib import Path
 from typing import Iterable
@@ -22,16 +23,60 @@ def _format_route(route: str) -> str:
     return f"# invalid route format: {route}"
 
 
-def write_ccd(client: Client, *, fixed_ip: str | None, routes: Iterable[str] | None = None) -> Path:
-    """Write CCD file for client with optional static IP and per-client routes."""
-    ccd_dir = Path(settings.ccd_path)
-    ccd_dir.mkdir(parents=True, exist_ok=True)
+def _route_cidr(network: str, netmask: str | None) -> str:
+    """'10.0.0.0 255.255.255.0' -> '10.0.0.0/24'；无法解析时原样保留。"""
+    try:
+        return str(ip_network(f"{network}/{netmask}" if netmask else network, strict=False))
+    except ValueError:
+        return f"{network} {netmask}" if netmask else network
+
+
+def parse_ccd(text: str) -> tuple[str | None, list[str]]:
+    """Parse CCD content into (fixed_ip, routes); routes come from iroute and push "route ..." lines."""
+    fixed_ip = None
+    routes: list[str] = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        try:
+            parts = shlex.split(line)
+        except ValueError:
+            parts = line.split()
+        directive = parts[0].lower()
+        if directive == "push" and len(parts) > 1:
+            parts = parts[1].split()
+            directive = "route" if parts and parts[0].lower() == "route" else ""
+        if directive == "ifconfig-push" and len(parts) >= 2:
+            fixed_ip = parts[1]
+        elif directive in ("iroute", "route") and len(parts) >= 2:
+            route = _route_cidr(parts[1], parts[2] if len(parts) > 2 else None)
+            if route not in routes:
+                routes.append(route)
+    return fixed_ip, routes
+
+
+def split_routes(routes: str | None) -> list[str]:
+    """clients.routes 以逗号分隔存储。"""
+    return [r.strip() for r in (routes or "").split(",") if r.strip()]
+
+
+def build_ccd_lines(fixed_ip: str | None, routes: Iterable[str] | None = None) -> list[str]:
+    """Per-client config lines (ifconfig-push / iroute), shared by CCD files and management client-auth."""
     lines: list[str] = []
     if fixed_ip:
         # default netmask assumes /24; adjust if you maintain different pool netmask
         lines.append(f"ifconfig-push {fixed_ip} 255.255.255.0")
     if routes:
         lines.extend(_format_route(r) for r in routes if r)
+    return lines
+
+
+def write_ccd(client: Client, *, fixed_ip: str | None, routes: Iterable[str] | None = None) -> Path:
+    """Write CCD file for client with optional static IP and per-client routes."""
+    ccd_dir = Path(settings.ccd_path)
+    ccd_dir.mkdir(parents=True, exist_ok=True)
+    lines = build_ccd_lines(fixed_ip, routes)
     path = ccd_dir / client.common_name
     path.write_text("\n".join(lines) + ("\n" if lines else ""))
     return path
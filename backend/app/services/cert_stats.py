@@ -0,0 +1,56 @@
+"""
+证书统计缓存：仪表盘的证书计数在证书表变更前直接复用。
+
+本进程内对 certificates 的 ORM 写入（flush 或批量 insert/update/delete）提交后使缓存失效；
+其他 worker 的写入以及按时间推移产生的过期，由 CERTIFICATE_STATS_CACHE_TTL 兜底。
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import get_settings
+from app.db import change_tracking
+from app.models.certificate import Certificate
+
+settings = get_settings()
+
+_lock = threading.Lock()
+_generation = 0
+_cached: tuple[float, dict[str, int]] | None = None
+
+
+def invalidate() -> None:
+    global _generation, _cached
+    with _lock:
+        _generation += 1
+        _cached = None
+
+
+def get_certificate_stats(db: Session) -> dict[str, int]:
+    """返回证书计数（total/valid/revoked/expired），命中缓存时不查库。"""
+    ttl = settings.certificate_stats_cache_ttl
+    with _lock:
+        cached = _cached
+        generation = _generation
+    if ttl > 0 and cached and time.monotonic() - cached[0] < ttl:
+        return dict(cached[1])
+
+    stats = crud.certificate.get_stats(db, now=datetime.utcnow())
+    if ttl > 0:
+        _store(generation, stats)
+    return dict(stats)
+
+
+def _store(generation: int, stats: dict[str, int]) -> None:
+    global _cached
+    with _lock:
+        # 查询期间发生过失效，则结果可能已过时，不写入缓存
+        if generation == _generation:
+            _cached = (time.monotonic(), stats)
+
+
+change_tracking.on_commit(Certificate, invalidate)
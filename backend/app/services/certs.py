@@ -1,9 +1,12 @@
 import os
-import shutil
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -11,10 +14,17 @@ from app import crud
 from app.core.config import get_settings
 from app.models.client import Client
 from app.schemas.certificate import CertificateCreate, CertificateUpdate
+from app.services import key_pool, ovpn_cache, x509
 
+try:  # pragma: no cover - 非 POSIX 平台没有 fcntl
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
 
 settings = get_settings()
 
+_easyrsa_thread_lock = threading.Lock()
+
 
 def _run(cmd: list[str], cwd: Path | None = None, env: dict[str, str] | None = None) -> str:
     """Run a command and raise with stderr if failed."""
@@ -28,22 +38,51 @@ def _run(cmd: list[str], cwd: Path | None = None, env: dict[str, str] | None = N
     return result.stdout
 
 
+@contextmanager
+def easyrsa_lock() -> Iterator[None]:
+    """
+    串行化修改 PKI 的 EasyRSA 操作（签发、吊销、生成 CRL）。
+
+    EasyRSA 对 index.txt/serial 的读写没有并发保护；进程内用线程锁，跨 worker 用数据目录下的文件锁。
+    """
+    with _easyrsa_thread_lock:
+        if fcntl is None:
+            yield
+            return
+        lock_path = Path(settings.sqlite_path).parent / "easyrsa.lock"
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
 def _parse_cert_info(cert_path: Path) -> Tuple[str, datetime, datetime]:
     """Return (serial, not_before, not_after) for given cert."""
-    out = _run(["openssl", "x509", "-in", str(cert_path), "-noout", "-serial", "-startdate", "-enddate"])
-    serial = ""
-    not_before = None
-    not_after = None
-    for line in out.splitlines():
-        if line.startswith("serial="):
-            serial = line.split("=", 1)[1].strip()
-        elif line.startswith("notBefore="):
-            not_before = datetime.strptime(line.split("=", 1)[1].strip(), "%b %d %H:%M:%S %Y %Z")
-        elif line.startswith("notAfter="):
-            not_after = datetime.strptime(line.split("=", 1)[1].strip(), "%b %d %H:%M:%S %Y %Z")
-    if not serial or not_before is None or not_after is None:
-        raise RuntimeError("Failed to parse certificate dates/serial")
-    return serial, not_before, not_after
+    info = x509.parse_certificate_file(cert_path)
+    return info.serial, info.not_before, info.not_after
+
+
+def _sign_pooled_key(common_name: str, env: dict[str, str] | None) -> bool:
+    """用预生成私钥为 common_name 生成 CSR 并由 CA 签发；池为空时返回 False。"""
+    pki = settings.easyrsa_path / "pki"
+    key_path = pki / "private" / f"{common_name}.key"
+    if not key_pool.claim(key_path):
+        return False
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            req_path = Path(tmp) / f"{common_name}.req"
+            key_pool.build_csr(key_path, common_name, req_path)
+            with easyrsa_lock():
+                _run(["./easyrsa", "--batch", "import-req", str(req_path), common_name], cwd=settings.easyrsa_path)
+                _run(["./easyrsa", "--batch", "sign-req", "client", common_name], cwd=settings.easyrsa_path, env=env)
+    except Exception:
+        key_path.unlink(missing_ok=True)
+        (pki / "reqs" / f"{common_name}.req").unlink(missing_ok=True)
+        raise
+    return True
 
 
 def build_client_cert(
@@ -61,13 +100,16 @@ def build_client_cert(
             req_path.unlink()
         if key_path.exists() and not cert_path.exists():
             key_path.unlink()
-        cmd = ["./easyrsa", "--batch", "build-client-full", client.common_name]
-        if passwordless:
-            cmd.append("nopass")
         env = None
         if passphrase:
             env = {"EASYRSA_PASSIN": f"pass:{passphrase}"}
-        _run(cmd, cwd=settings.easyrsa_path, env=env)
+        # 池中私钥无口令，仅用于 nopass 客户端
+        if not (settings.key_pool_enabled and passwordless and _sign_pooled_key(client.common_name, env)):
+            cmd = ["./easyrsa", "--batch", "build-client-full", client.common_name]
+            if passwordless:
+                cmd.append("nopass")
+            with easyrsa_lock():
+                _run(cmd, cwd=settings.easyrsa_path, env=env)
 
     if not cert_path.exists() or not key_path.exists():
         raise RuntimeError("Client certificate or key not found after generation")
@@ -102,16 +144,35 @@ def build_client_cert(
     return cert_path
 
 
-def revoke_client_cert(db: Session, client: Client, passphrase: str | None = None) -> None:
-    """Revoke client cert, generate CRL, update DB."""
-    env = {"EASYRSA_PASSIN": f"pass:{passphrase}"} if passphrase else None
-    _run(["./easyrsa", "--batch", "revoke", client.common_name], cwd=settings.easyrsa_path, env=env)
-    _run(["./easyrsa", "gen-crl"], cwd=settings.easyrsa_path, env=env)
+def _passin_env(passphrase: str | None) -> dict[str, str] | None:
+    return {"EASYRSA_PASSIN": f"pass:{passphrase}"} if passphrase else None
+
+
+def install_crl(crl_src: Path) -> None:
+    """原子替换 OpenVPN 使用的 CRL：先写同目录临时文件再 rename，OpenVPN 不会读到半个文件。"""
+    target = settings.openvpn_crl_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".crl-", suffix=".pem")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(crl_src.read_bytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def regenerate_crl(passphrase: str | None = None) -> None:
+    """重新生成 CRL 并安装。"""
+    with easyrsa_lock():
+        _run(["./easyrsa", "gen-crl"], cwd=settings.easyrsa_path, env=_passin_env(passphrase))
+        install_crl(settings.easyrsa_path / "pki" / "crl.pem")
 
-    crl_src = settings.easyrsa_path / "pki" / "crl.pem"
-    settings.openvpn_crl_path.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy(crl_src, settings.openvpn_crl_path)
 
+def _mark_revoked(db: Session, client: Client) -> None:
     db_cert = crud.certificate.get_by_cn(db, common_name=client.common_name)
     if db_cert:
         crud.certificate.update(
@@ -122,50 +183,121 @@ def revoke_client_cert(db: Session, client: Client, passphrase: str | None = Non
     crud.client.update(db, db_obj=client, obj_in={"status": "disabled"})
 
 
+def revoke_without_crl(db: Session, client: Client, passphrase: str | None = None) -> None:
+    """只在 PKI 中吊销并更新 DB，不刷新 CRL；批量吊销结束后统一调用 regenerate_crl。"""
+    env = _passin_env(passphrase)
+    with easyrsa_lock():
+        _run(["./easyrsa", "--batch", "revoke", client.common_name], cwd=settings.easyrsa_path, env=env)
+    _mark_revoked(db, client)
+
+
+def revoke_client_cert(db: Session, client: Client, passphrase: str | None = None) -> None:
+    """Revoke client cert, generate CRL, update DB."""
+    env = _passin_env(passphrase)
+    with easyrsa_lock():
+        _run(["./easyrsa", "--batch", "revoke", client.common_name], cwd=settings.easyrsa_path, env=env)
+        _run(["./easyrsa", "gen-crl"], cwd=settings.easyrsa_path, env=env)
+        install_crl(settings.easyrsa_path / "pki" / "crl.pem")
+    _mark_revoked(db, client)
+
+
 def _read_text(path: Path) -> str:
     return Path(path).read_text().strip()
 
 
-def export_ovpn(client: Client, remote_host: str, remote_port: int) -> str:
-    """Render inline .ovpn for the given client."""
+def _tls_key_path(tls_mode: str) -> Path:
+    if tls_mode == "tls-crypt-v2":
+        return settings.tls_crypt_v2_key_path
+    if tls_mode == "tls-crypt":
+        return settings.tls_crypt_key_path
+    return settings.ta_key_path
+
+
+def _genkey_tls_crypt_v2_client(server_key: Path, client_key: Path) -> None:
+    # 先写入临时文件再改名，并发渲染时不会读到写了一半的密钥
+    tmp_key = client_key.with_name(f".{client_key.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        try:
+            _run([
+                "/usr/sbin/openvpn", "--tls-crypt-v2", str(server_key),
+                "--genkey", "tls-crypt-v2-client", str(tmp_key)
+            ])
+        except FileNotFoundError:
+            # Fallback to PATH search
+            _run([
+                "openvpn", "--tls-crypt-v2", str(server_key),
+                "--genkey", "tls-crypt-v2-client", str(tmp_key)
+            ])
+        os.chmod(tmp_key, 0o600)
+        os.replace(tmp_key, client_key)
+    finally:
+        tmp_key.unlink(missing_ok=True)
+
+
+def _ensure_tls_crypt_v2_client_key(server_key: Path, client_key: Path) -> None:
+    if client_key.exists():
+        return
+    _genkey_tls_crypt_v2_client(server_key, client_key)
+
+
+def ensure_tls_crypt_v2_client_keys(common_names: list[str], workers: int = 4) -> tuple[int, dict[str, str]]:
+    """
+    tls-crypt-v2 模式下为缺少客户端密钥的 CN 并行生成密钥，返回 (生成数量, {cn: 错误})。
+    其他模式无需每客户端密钥，直接返回；服务端密钥缺失时记为每个待生成 CN 的错误，不抛出。
+    """
+    if settings.tls_auth_mode != "tls-crypt-v2" or not common_names:
+        return 0, {}
+    private = settings.easyrsa_path / "pki" / "private"
+    missing = [cn for cn in common_names if not (private / f"{cn}.tls-crypt-v2.key").exists()]
+    if not missing:
+        return 0, {}
+    server_key = _tls_key_path("tls-crypt-v2")
+    if not server_key.exists():
+        return 0, {cn: f"TLS key file missing: {server_key}" for cn in missing}
+    errors: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(missing))), thread_name_prefix="tls-crypt-v2") as pool:
+        futures = {
+            cn: pool.submit(_genkey_tls_crypt_v2_client, server_key, private / f"{cn}.tls-crypt-v2.key")
+            for cn in missing
+        }
+    for cn, future in futures.items():
+        if future.exception() is not None:
+            errors[cn] = str(future.exception())
+    return len(missing) - len(errors), errors
+
+
+def _profile_inputs(client: Client) -> tuple[str, list[Path]]:
+    """返回 TLS 模式与渲染所需的输入文件（ca, cert, key, tls key），缺失时报错。"""
     base = settings.easyrsa_path / "pki"
     cert_path = base / "issued" / f"{client.common_name}.crt"
     key_path = base / "private" / f"{client.common_name}.key"
     ca_path = settings.openvpn_base_path / "server" / "ca.crt"
-    
+
     # Determine TLS auth mode and key path
     tls_mode = settings.tls_auth_mode
-    if tls_mode == "tls-crypt-v2":
-        tls_key_path = settings.tls_crypt_v2_key_path
-    elif tls_mode == "tls-crypt":
-        tls_key_path = settings.tls_crypt_key_path
-    else:  # tls-auth
-        tls_key_path = settings.ta_key_path
+    tls_key_path = _tls_key_path(tls_mode)
 
     for path in [cert_path, key_path, ca_path]:
         if not path.exists():
             raise RuntimeError(f"Required file missing: {path}")
-    
+
     if not tls_key_path.exists():
         raise RuntimeError(f"TLS key file missing: {tls_key_path}")
 
-    # Build TLS section based on mode
     if tls_mode == "tls-crypt-v2":
         # For tls-crypt-v2, generate client-specific key
         client_tls_key_path = base / "private" / f"{client.common_name}.tls-crypt-v2.key"
-        if not client_tls_key_path.exists():
-            try:
-                _run([
-                    "/usr/sbin/openvpn", "--tls-crypt-v2", str(tls_key_path),
-                    "--genkey", "tls-crypt-v2-client", str(client_tls_key_path)
-                ])
-            except FileNotFoundError:
-                # Fallback to PATH search
-                _run([
-                    "openvpn", "--tls-crypt-v2", str(tls_key_path),
-                    "--genkey", "tls-crypt-v2-client", str(client_tls_key_path)
-                ])
-        tls_section = f"<tls-crypt-v2>\n{_read_text(client_tls_key_path)}\n</tls-crypt-v2>"
+        _ensure_tls_crypt_v2_client_key(tls_key_path, client_tls_key_path)
+        tls_key_path = client_tls_key_path
+    return tls_mode, [ca_path, cert_path, key_path, tls_key_path]
+
+
+def _render_ovpn(tls_mode: str, paths: list[Path], remote_host: str, remote_port: int) -> str:
+    ca_path, cert_path, key_path, tls_key_path = paths
+
+    # Build TLS section based on mode
+    if tls_mode == "tls-crypt-v2":
+        tls_section = f"<tls-crypt-v2>\n{_read_text(tls_key_path)}\n</tls-crypt-v2>"
         key_direction = ""
     elif tls_mode == "tls-crypt":
         tls_section = f"<tls-crypt>\n{_read_text(tls_key_path)}\n</tls-crypt>"
@@ -174,7 +306,7 @@ def export_ovpn(client: Client, remote_host: str, remote_port: int) -> str:
         tls_section = f"<tls-auth>\n{_read_text(tls_key_path)}\n</tls-auth>"
         key_direction = "key-direction 1\n"
 
-    template = f"""client
+    return f"""client
 dev tun
 proto tcp
 remote {remote_host} {remote_port}
@@ -198,7 +330,29 @@ auth SHA256
 </key>
 {tls_section}
 """
-    export_dir = settings.openvpn_client_export_path
-    export_dir.mkdir(parents=True, exist_ok=True)
-    (export_dir / f"{client.common_name}.ovpn").write_text(template)
-    return template
+
+
+def export_ovpn_cached(client: Client, remote_host: str, remote_port: int) -> tuple[str, str]:
+    """
+    Render inline .ovpn for the given client, returning (etag, content).
+
+    输入文件与远端地址都未变化时直接返回缓存（内存或已导出的文件），只有变化时才重新渲染并落盘。
+    """
+    tls_mode, paths = _profile_inputs(client)
+    etag = ovpn_cache.profile_etag(paths, tls_mode, remote_host, remote_port)
+    cached = ovpn_cache.get(client.common_name, etag)
+    if cached is not None:
+        return etag, cached
+
+    export_path = settings.openvpn_client_export_path / f"{client.common_name}.ovpn"
+    content = ovpn_cache.read_exported(export_path, etag)
+    if content is None:
+        content = _render_ovpn(tls_mode, paths, remote_host, remote_port)
+        ovpn_cache.write_exported(export_path, etag, content)
+    ovpn_cache.put(client.common_name, etag, content)
+    return etag, content
+
+
+def export_ovpn(client: Client, remote_host: str, remote_port: int) -> str:
+    """Render inline .ovpn for the given client."""
+    return export_ovpn_cached(client, remote_host, remote_port)[1]
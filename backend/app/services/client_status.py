@@ -0,0 +1,123 @@
+"""客户端在线状态同步与上下线审计。"""
+
+import logging
+from typing import Iterable, Iterator
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.constants import AUDIT_ACTION_CLIENT_LOGIN, AUDIT_ACTION_CLIENT_LOGOUT
+from app.schemas.audit_log import AuditLogCreate
+from app.utils.time import now_shanghai_naive
+
+logger = logging.getLogger(__name__)
+
+# SQLite 单条语句的绑定参数数量有限，IN 列表分批
+_IN_CHUNK = 500
+
+
+def _safe_audit(db: Session, actor: str, action: str, target: str | None, result: str) -> None:
+    try:
+        crud.audit_log.create(
+            db,
+            AuditLogCreate(
+                actor=actor,
+                action=action,
+                target=target,
+                result=result,
+            ),
+        )
+    except Exception:
+        logger.exception("Failed to write audit log action=%s target=%s result=%s", action, target, result)
+
+
+def _chunks(items: list[str], size: int = _IN_CHUNK) -> Iterator[list[str]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def sync_client_status_and_audit(db: Session, *, online_common_names: Iterable[str]) -> None:
+    """
+    按在线 CN 集合刷新 clients.status，并为上线/下线写审计日志。
+
+    以库中当前 status == "online" 的集合作为上一次快照，只处理集合差异：
+    新上线与新下线的客户端用 `UPDATE ... WHERE common_name IN (...)` 批量更新，审计日志一次性批量插入。
+    差异为空时不执行任何 UPDATE（避免触发准入文件等提交后的重建）。
+    """
+    model = crud.client.model
+    online_set = set(online_common_names)
+    prev_online = set(db.scalars(select(model.common_name).where(model.status == "online")))
+    went_online = sorted(online_set - prev_online)
+    went_offline = sorted(prev_online - online_set)
+
+    logins: list[str] = []
+    logouts: list[str] = []
+    for chunk in _chunks(went_online):
+        names = list(
+            db.scalars(select(model.common_name).where(model.common_name.in_(chunk), model.disabled.is_(False)))
+        )
+        if names:
+            db.execute(update(model).where(model.common_name.in_(names)).values(status="online"))
+            logins.extend(names)
+    for chunk in _chunks(went_offline):
+        db.execute(update(model).where(model.common_name.in_(chunk)).values(status="offline"))
+        logouts.extend(chunk)
+    # 被禁用的客户端始终显示为 disabled；在线期间被禁用的视为下线
+    to_disable = db.execute(
+        select(model.common_name, model.status).where(model.disabled.is_(True), model.status != "disabled")
+    ).all()
+    if to_disable:
+        logouts.extend(cn for cn, status in to_disable if status == "online")
+        db.execute(update(model).where(model.disabled.is_(True), model.status != "disabled").values(status="disabled"))
+    # 重新启用且不在线的客户端恢复为 offline（在线的已在上面标记为 online）
+    re_enabled = sorted(
+        set(db.scalars(select(model.common_name).where(model.disabled.is_(False), model.status == "disabled")))
+        - online_set
+    )
+    for chunk in _chunks(re_enabled):
+        db.execute(
+            update(model)
+            .where(model.common_name.in_(chunk), model.disabled.is_(False), model.status == "disabled")
+            .values(status="offline")
+        )
+
+    now = now_shanghai_naive()
+    audit_rows = [
+        {"actor": "system", "action": AUDIT_ACTION_CLIENT_LOGIN, "target": cn, "result": "success", "created_at": now}
+        for cn in logins
+    ] + [
+        {"actor": "system", "action": AUDIT_ACTION_CLIENT_LOGOUT, "target": cn, "result": "success", "created_at": now}
+        for cn in logouts
+    ]
+    if audit_rows:
+        db.execute(insert(crud.audit_log.model), audit_rows)
+    db.commit()
+
+
+def mark_online(db: Session, *, common_name: str) -> bool:
+    """单个客户端上线（事件驱动），状态确有变化时写审计并返回 True。"""
+    model = crud.client.model
+    result = db.execute(
+        update(model)
+        .where(model.common_name == common_name, model.disabled.is_(False), model.status != "online")
+        .values(status="online")
+    )
+    db.commit()
+    if result.rowcount:
+        _safe_audit(db, actor="system", action=AUDIT_ACTION_CLIENT_LOGIN, target=common_name, result="success")
+    return bool(result.rowcount)
+
+
+def mark_offline(db: Session, *, common_name: str) -> bool:
+    """单个客户端下线（事件驱动），状态确有变化时写审计并返回 True。"""
+    model = crud.client.model
+    result = db.execute(
+        update(model)
+        .where(model.common_name == common_name, model.disabled.is_(False), model.status == "online")
+        .values(status="offline")
+    )
+    db.commit()
+    if result.rowcount:
+        _safe_audit(db, actor="system", action=AUDIT_ACTION_CLIENT_LOGOUT, target=common_name, result="success")
+    return bool(result.rowcount)
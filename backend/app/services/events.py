@@ -0,0 +1,467 @@
+"""
+management 实时事件监听。
+
+leader worker 持有一条专用 management 连接：
+- 发送 `bytecount N`，消费 >CLIENT:ESTABLISHED / >CLIENT:DISCONNECT / >BYTECOUNT_CLI 等异步通知，
+  增量更新 clients.status、审计日志和 online_sessions 中的流量；
+- OpenVPN 同一时间只接受一个 management 客户端，因此这条连接同时作为多路复用器：
+  本机 relay（Unix socket）把其他 worker 的命令转发到这条连接上，应答按发送顺序分配回去。
+
+注意：>CLIENT:CONNECT / REAUTH 仅在 server.conf 开启 management-client-auth 时才会出现。
+开启 MANAGEMENT_CLIENT_AUTH_ENABLED 后由读线程直接按内存快照应答（client-auth / client-deny），
+并随 client-auth 下发固定 IP 与路由，连接路径上不再读取 CCD 文件或执行 tls-verify 脚本。
+"""
+
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy import bindparam, delete, insert
+
+from app.api.deps import get_db_context
+from app.core.config import get_settings
+from app.models.online_session import OnlineSession
+from app.services import ccd, client_status, management, poller, tls_verifier
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_RECONNECT_DELAY = 5.0
+
+
+class _Waiter:
+    """一条已发送命令的应答收集器。"""
+
+    def __init__(self, cmd: str) -> None:
+        self.frame = management.ResponseFrame(cmd)
+        self.lines: list[str] = []
+        self.done = threading.Event()
+        self.error: Exception | None = None
+
+
+class ManagementMux:
+    """
+    单条 management 连接上的命令多路复用。
+
+    一个读线程读取所有行：">" 开头的通知交给 on_notification，其余行按命令发送顺序
+    依次分配给等待中的命令，因此多个线程可以同时提交命令而不会错帧。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        timeout: float,
+        on_notification: Callable[[str], None],
+        on_connect: Callable[[], None] | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.on_notification = on_notification
+        self.on_connect = on_connect
+        self._sock: socket.socket | None = None
+        self._send_lock = threading.Lock()
+        self._pending: deque[_Waiter] = deque()
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def command(self, cmd: str, timeout: float | None = None) -> list[str]:
+        """提交命令并等待完整应答。"""
+        if not self._connected.wait(timeout or self.timeout):
+            raise ConnectionError("management connection not available")
+        waiter = _Waiter(cmd)
+        with self._send_lock:
+            sock = self._sock
+            if sock is None:
+                raise ConnectionError("management connection not available")
+            self._pending.append(waiter)
+            sock.sendall((cmd + "\n").encode())
+        if not waiter.done.wait(timeout or self.timeout):
+            # 应答迟早会到达并被读线程丢弃，连接上的帧序不受影响
+            raise socket.timeout(f"management command timed out: {cmd.split()[0]}")
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.lines
+
+    def send_nowait(self, cmd: str) -> None:
+        """提交命令但不等待应答（用于在读线程回调中下发命令）。"""
+        with self._send_lock:
+            sock = self._sock
+            if sock is None:
+                raise ConnectionError("management connection not available")
+            self._pending.append(_Waiter(cmd))
+            sock.sendall((cmd + "\n").encode())
+
+    def _dispatch(self, line: str) -> None:
+        if line.startswith(">"):
+            try:
+                self.on_notification(line)
+            except Exception:
+                logger.exception("Failed to handle management notification %r", line[:80])
+            return
+        if not self._pending:
+            return
+        waiter = self._pending[0]
+        keep, done = waiter.frame.feed(line)
+        if keep:
+            waiter.lines.append(line)
+        if done:
+            self._pending.popleft()
+            waiter.done.set()
+
+    def _fail_pending(self, exc: Exception) -> None:
+        with self._send_lock:
+            while self._pending:
+                waiter = self._pending.popleft()
+                waiter.error = exc
+                waiter.done.set()
+
+    def _serve_connection(self) -> None:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        # 读线程阻塞等待通知，停止时通过关闭 socket 打断
+        sock.settimeout(None)
+        reader = sock.makefile("rb")
+        try:
+            reader.readline()  # banner
+            with self._send_lock:
+                self._sock = sock
+            self._connected.set()
+            logger.info("Management event connection established %s:%s", self.host, self.port)
+            if self.on_connect is not None:
+                # on_connect 会提交命令，需要读线程继续运行才能拿到应答
+                threading.Thread(target=self._run_on_connect, name="management-on-connect", daemon=True).start()
+            for raw in reader:
+                self._dispatch(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        finally:
+            self._connected.clear()
+            with self._send_lock:
+                self._sock = None
+            self._fail_pending(ConnectionError("management connection closed"))
+            for res in (reader, sock):
+                try:
+                    res.close()
+                except OSError:
+                    pass
+
+    def _run_on_connect(self) -> None:
+        try:
+            assert self.on_connect is not None
+            self.on_connect()
+        except Exception:
+            logger.exception("Management on-connect hook failed")
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._serve_connection()
+            except OSError as exc:
+                if not self._stop.is_set():
+                    logger.warning("Management event connection lost: %s", exc)
+            self._stop.wait(_RECONNECT_DELAY)
+
+    def stop(self) -> None:
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class ManagementRelay:
+    """本机 Unix socket：以 management 协议格式把其他 worker 的命令转发给 ManagementMux。"""
+
+    def __init__(self, path: Path, mux: ManagementMux) -> None:
+        self.path = path
+        self.mux = mux
+        self._server: socket.socket | None = None
+
+    def start(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.path))
+        os.chmod(self.path, 0o600)
+        server.listen(64)
+        self._server = server
+        threading.Thread(target=self._accept_loop, name="management-relay", daemon=True).start()
+
+    def _accept_loop(self) -> None:
+        assert self._server is not None
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        try:
+            self._serve_commands(conn)
+        except OSError:
+            # worker 断开（空闲超时/进程退出）
+            pass
+        finally:
+            conn.close()
+
+    def _serve_commands(self, conn: socket.socket) -> None:
+        with conn.makefile("rb") as reader:
+            conn.sendall(b">INFO:ovpnmanager management relay\r\n")
+            for raw in reader:
+                cmd = raw.decode("utf-8", errors="replace").strip()
+                if not cmd:
+                    continue
+                try:
+                    lines = self.mux.command(cmd)
+                except Exception as exc:  # noqa: BLE001
+                    lines = [f"ERROR: relay: {exc}"]
+                    conn.sendall(("\r\n".join(lines) + "\r\n").encode())
+                    continue
+                frame = management.ResponseFrame(cmd)
+                if frame.multiline and not (len(lines) == 1 and lines[0].startswith("ERROR:")):
+                    lines = [*lines, "END"]
+                conn.sendall(("\r\n".join(lines) + "\r\n").encode())
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+@dataclass
+class _PendingEvent:
+    kind: str
+    cid: str
+    kid: str | None = None
+    env: dict[str, str] = field(default_factory=dict)
+
+
+class ClientEventHandler:
+    """解析 >CLIENT / >BYTECOUNT_CLI 通知并增量写库（在独立线程中执行，不阻塞读线程）。"""
+
+    def __init__(self, on_auth: Callable[[_PendingEvent], None] | None = None) -> None:
+        self.on_auth = on_auth
+        self._current: _PendingEvent | None = None
+        self._events: queue.Queue[_PendingEvent] = queue.Queue()
+        self._cid_to_cn: dict[str, str] = {}
+        self._bytecounts: dict[str, tuple[int, int]] = {}
+        self._bytecount_lock = threading.Lock()
+
+    def on_notification(self, line: str) -> None:
+        """读线程回调：只做解析与入队。"""
+        if line.startswith(">BYTECOUNT_CLI:"):
+            parts = line.split(":", 1)[1].split(",")
+            if len(parts) >= 3:
+                try:
+                    counts = (int(parts[1]), int(parts[2]))
+                except ValueError:
+                    return
+                with self._bytecount_lock:
+                    self._bytecounts[parts[0]] = counts
+            return
+        if not line.startswith(">CLIENT:"):
+            return
+        payload = line[len(">CLIENT:") :]
+        if payload.startswith("ENV,"):
+            if self._current is None:
+                return
+            item = payload[len("ENV,") :]
+            if item == "END":
+                event, self._current = self._current, None
+                if event.kind in ("CONNECT", "REAUTH") and self.on_auth is not None:
+                    # 握手在等待应答，直接在读线程中处理，不排在写库事件之后
+                    self.on_auth(event)
+                else:
+                    self._events.put(event)
+            elif "=" in item:
+                key, value = item.split("=", 1)
+                self._current.env[key] = value
+            return
+        parts = payload.split(",")
+        kind = parts[0]
+        if kind in {"CONNECT", "REAUTH", "ESTABLISHED", "DISCONNECT", "CR_RESPONSE"} and len(parts) >= 2:
+            # 以上通知后面都跟一段 >CLIENT:ENV，读到 ENV,END 再整体处理
+            self._current = _PendingEvent(kind=kind, cid=parts[1], kid=parts[2] if len(parts) > 2 else None)
+
+    def seed(self, online: list[management.OnlineClient]) -> None:
+        """用完整快照重建 CID → CN 映射（连接建立时调用）。"""
+        self._cid_to_cn = {c.client_id: c.common_name for c in online if c.client_id}
+
+    def next_event(self, timeout: float) -> _PendingEvent | None:
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def apply(self, event: _PendingEvent) -> None:
+        cn = event.env.get("common_name") or self._cid_to_cn.get(event.cid)
+        if not cn:
+            return
+        if event.kind == "ESTABLISHED":
+            self._cid_to_cn[event.cid] = cn
+            trusted_ip = event.env.get("trusted_ip", "")
+            trusted_port = event.env.get("trusted_port", "")
+            with get_db_context() as db:
+                # duplicate-cn 时同一 CN 可有多个会话，只替换本 CID 的记录
+                db.execute(delete(OnlineSession).where(OnlineSession.client_id == event.cid))
+                db.execute(
+                    insert(OnlineSession).values(
+                        common_name=cn,
+                        real_address=f"{trusted_ip}:{trusted_port}" if trusted_port else trusted_ip,
+                        virtual_address=event.env.get("ifconfig_pool_remote_ip", ""),
+                        bytes_received=0,
+                        bytes_sent=0,
+                        connected_since=event.env.get("time_ascii", ""),
+                        client_id=event.cid,
+                    )
+                )
+                db.commit()
+                client_status.mark_online(db, common_name=cn)
+            logger.info("Client established cn=%s cid=%s", cn, event.cid)
+        elif event.kind == "DISCONNECT":
+            self._cid_to_cn.pop(event.cid, None)
+            with self._bytecount_lock:
+                self._bytecounts.pop(event.cid, None)
+            with get_db_context() as db:
+                # 同一 CN 可能已用新的 CID 重连，只删除本次断开的会话
+                db.execute(
+                    delete(OnlineSession).where(OnlineSession.common_name == cn, OnlineSession.client_id == event.cid)
+                )
+                db.commit()
+                remaining = db.query(OnlineSession).filter(OnlineSession.common_name == cn).count()
+                if not remaining:
+                    client_status.mark_offline(db, common_name=cn)
+            logger.info("Client disconnected cn=%s cid=%s", cn, event.cid)
+
+    def flush_bytecounts(self) -> None:
+        """把累积的 BYTECOUNT_CLI 一次性写入 online_sessions。"""
+        with self._bytecount_lock:
+            pending, self._bytecounts = self._bytecounts, {}
+        if not pending:
+            return
+        table = OnlineSession.__table__
+        stmt = (
+            table.update()
+            .where(table.c.client_id == bindparam("b_cid"))
+            .values(bytes_received=bindparam("b_rx"), bytes_sent=bindparam("b_tx"))
+        )
+        rows = [{"b_cid": cid, "b_rx": rx, "b_tx": tx} for cid, (rx, tx) in pending.items()]
+        with get_db_context() as db:
+            db.execute(stmt, rows)
+
+
+class ClientAuthorizer:
+    """management-client-auth：按 clients 快照允许/拒绝连接，并下发固定 IP 与路由。"""
+
+    def __init__(self, mux: ManagementMux, cache: tls_verifier.AdmissionCache = tls_verifier.admission) -> None:
+        self.mux = mux
+        self.cache = cache
+
+    def __call__(self, event: _PendingEvent) -> None:
+        kid = event.kid or "0"
+        try:
+            self._decide(event, kid)
+        except Exception:
+            # 任何异常都必须应答，否则 OpenVPN 会一直挂起该连接直到超时
+            logger.exception("Client auth failed cid=%s", event.cid)
+            self.mux.send_nowait(f'client-deny {event.cid} {kid} "internal error"')
+
+    def _decide(self, event: _PendingEvent, kid: str) -> None:
+        cn = event.env.get("common_name", "")
+        if not self.cache.ready:
+            # 不在 mux 读线程上等待初次加载，否则会阻塞其他通知与命令应答
+            self.mux.send_nowait(f'client-deny {event.cid} {kid} "internal error"')
+            logger.warning("Client denied cn=%s cid=%s: client snapshot not loaded yet", cn, event.cid)
+            return
+        policy = self.cache.get(cn) if cn else None
+        if policy is None or policy.disabled:
+            reason = "unknown client" if policy is None else "client is disabled"
+            self.mux.send_nowait(f'client-deny {event.cid} {kid} "{reason}"')
+            logger.info("Client denied cn=%s cid=%s: %s", cn, event.cid, reason)
+            return
+        if event.kind == "REAUTH":
+            # 重协商不会应用新的推送配置
+            self.mux.send_nowait(f"client-auth-nt {event.cid} {kid}")
+            return
+        lines = ccd.build_ccd_lines(policy.fixed_ip, ccd.split_routes(policy.routes))
+        self.mux.send_nowait("\n".join([f"client-auth {event.cid} {kid}", *lines, "END"]))
+
+
+class ManagementEventListener:
+    """后台任务：维护专用连接、relay 与事件处理线程。"""
+
+    name = "management-events"
+
+    def __init__(self) -> None:
+        self.handler = ClientEventHandler()
+        self.mux = ManagementMux(
+            settings.openvpn_management_host,
+            settings.openvpn_management_port,
+            timeout=settings.openvpn_management_timeout,
+            on_notification=self.handler.on_notification,
+            on_connect=self._on_connect,
+        )
+        self.relay = ManagementRelay(Path(settings.openvpn_management_relay_path), self.mux)
+        self.authorizer = ClientAuthorizer(self.mux) if settings.management_client_auth_enabled else None
+        self.handler.on_auth = self.authorizer
+        self._stop = threading.Event()
+
+    def _on_connect(self) -> None:
+        self.mux.command(f"bytecount {settings.management_bytecount_interval}")
+        # 连接断开期间可能错过事件，用一次完整快照对齐
+        snapshot = management.parse_status(self.mux.command("status 3"))
+        self.handler.seed(snapshot.clients)
+        poller.publish_online(snapshot.clients)
+
+    def _process_events(self) -> None:
+        interval = settings.management_bytecount_interval
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            event = self.handler.next_event(timeout=1.0)
+            if event is not None:
+                try:
+                    self.handler.apply(event)
+                except Exception:
+                    logger.exception("Failed to apply management event %s cid=%s", event.kind, event.cid)
+            if time.monotonic() - last_flush >= interval:
+                last_flush = time.monotonic()
+                try:
+                    self.handler.flush_bytecounts()
+                    if self.mux.connected:
+                        poller.touch()
+                except Exception:
+                    logger.exception("Failed to flush management byte counters")
+
+    def start(self) -> None:
+        if self.authorizer is not None:
+            # 快照在后台线程中加载与刷新，mux 读线程上的判定只查内存
+            self.authorizer.cache.start()
+        self.relay.start()
+        threading.Thread(target=self.mux.run_forever, name="management-events-reader", daemon=True).start()
+        threading.Thread(target=self._process_events, name="management-events-worker", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.mux.stop()
+        self.relay.stop()
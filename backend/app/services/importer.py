@@ -1,18 +1,29 @@
+import hashlib
+import json
+import multiprocessing
+import os
 import re
-import subprocess
-from datetime import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 from pathlib import Path
 
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
 from app import crud
 from app.core.config import get_settings
-from app.schemas.certificate import CertificateCreate
-from app.schemas.client import ClientCreate, ClientUpdate
 from app.schemas.server import ServerCreate, ServerUpdate
+from app.services import ccd as ccd_service, x509
+from app.utils.time import now_shanghai_naive
 
 settings = get_settings()
 
+CCD_STATE_KEY = "ccd.files"
+
+_POOL_MIN_FILES = 64
+_INSERT_CHUNK = 500
+
 
 def _parse_server_conf(conf_path: Path) -> dict:
     data: dict[str, str] = {}
@@ -28,7 +39,7 @@ def _parse_server_conf(conf_path: Path) -> dict:
     return data
 
 
-def import_openvpn(db: Session, *, server_name: str = "local") -> dict[str, int]:
+def import_openvpn(db: Session, *, server_name: str = "local", full: bool = False) -> dict[str, int]:
     created = 0
     updated = 0
 
@@ -60,52 +71,174 @@ def import_openvpn(db: Session, *, server_name: str = "local") -> dict[str, int]
         created += 1
 
     # CCD clients
+    ccd_stats = import_ccd(db, full=full)
+    created += ccd_stats["created"]
+    updated += ccd_stats["updated"]
+
+    return {"created": created, "updated": updated, "unchanged": ccd_stats["unchanged"]}
+
+
+def _load_ccd_state(db: Session) -> dict[str, list]:
+    raw = crud.runtime_state.get_value(db, key=CCD_STATE_KEY)
+    try:
+        return json.loads(raw) if raw else {}
+    except ValueError:
+        return {}
+
+
+def _parse_ccd_content(content: bytes) -> tuple[str | None, str | None]:
+    fixed_ip, routes = ccd_service.parse_ccd(content.decode("utf-8", errors="replace"))
+    return fixed_ip, ",".join(routes) if routes else None
+
+
+def import_ccd(db: Session, *, full: bool = False) -> dict[str, int]:
+    """
+    增量导入 CCD 目录。
+
+    每个文件记录 [mtime_ns, size, sha256]（保存在 runtime_state）：mtime/大小未变直接跳过，
+    内容摘要未变只刷新记录；其余文件解析 ifconfig-push / iroute / push route，
+    与库中值比对后在一个事务内批量写入。未变化的文件若对应客户端已不在库中（被删除），
+    同样视为变化重新导入。full=True 时忽略已记录的状态。
+    """
     ccd_dir = Path(settings.ccd_path)
-    if ccd_dir.exists():
-        ip_re = re.compile(r"ifconfig-push\s+(\S+)\s+(\S+)", re.I)
-        for ccd_file in ccd_dir.iterdir():
-            if not ccd_file.is_file():
+    stats = {"created": 0, "updated": 0, "unchanged": 0}
+    if not ccd_dir.exists():
+        return stats
+
+    previous = {} if full else _load_ccd_state(db)
+    state: dict[str, list] = {}
+    parsed: dict[str, tuple[str | None, str | None]] = {}
+    skipped: dict[str, str] = {}
+    with os.scandir(ccd_dir) as it:
+        for entry in it:
+            if not entry.is_file():
                 continue
-            cn = ccd_file.name
-            fixed_ip = None
-            routes = []
-            for line in ccd_file.read_text().splitlines():
-                if m := ip_re.search(line):
-                    fixed_ip = m.group(1)
-            # future: parse per-client routes
-            db_client = crud.client.get_by_common_name(db, common_name=cn)
-            if db_client:
-                crud.client.update(
-                    db,
-                    db_obj=db_client,
-                    obj_in=ClientUpdate(fixed_ip=fixed_ip, routes=",".join(routes) if routes else None),
-                )
-                updated += 1
+            st = entry.stat()
+            known = previous.get(entry.name)
+            if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+                state[entry.name] = known
+                skipped[entry.name] = entry.path
+                continue
+            content = Path(entry.path).read_bytes()
+            digest = hashlib.sha256(content).hexdigest()
+            state[entry.name] = [st.st_mtime_ns, st.st_size, digest]
+            if known and known[2] == digest:
+                skipped[entry.name] = entry.path
+                continue
+            parsed[entry.name] = _parse_ccd_content(content)
+
+    client_model = crud.client.model
+    skipped_cns = list(skipped)
+    present: set[str] = set()
+    for i in range(0, len(skipped_cns), _INSERT_CHUNK):
+        chunk = skipped_cns[i : i + _INSERT_CHUNK]
+        present.update(db.scalars(select(client_model.common_name).where(client_model.common_name.in_(chunk))))
+    for cn, path in skipped.items():
+        if cn in present:
+            stats["unchanged"] += 1
+        else:
+            # 客户端记录已被删除，文件虽未变化也需重新导入
+            parsed[cn] = _parse_ccd_content(Path(path).read_bytes())
+
+    existing: dict[str, tuple] = {}
+    names: set[str] = set()
+    cns = list(parsed)
+    for i in range(0, len(cns), _INSERT_CHUNK):
+        chunk = cns[i : i + _INSERT_CHUNK]
+        for row in db.execute(
+            select(client_model.id, client_model.common_name, client_model.fixed_ip, client_model.routes).where(
+                client_model.common_name.in_(chunk)
+            )
+        ):
+            existing[row.common_name] = row
+        names.update(db.scalars(select(client_model.name).where(client_model.name.in_(chunk))))
+
+    updates: list[dict] = []
+    new_clients: list[dict] = []
+    for cn, (fixed_ip, routes) in parsed.items():
+        row = existing.get(cn)
+        if row is not None:
+            if (row.fixed_ip, row.routes) == (fixed_ip, routes):
+                stats["unchanged"] += 1
             else:
-                crud.client.create(
-                    db,
-                    ClientCreate(
-                        name=cn,
-                        common_name=cn,
-                        fixed_ip=fixed_ip,
-                        routes=",".join(routes) if routes else None,
-                        status="offline",
-                        disabled=False,
-                    ),
-                )
-                created += 1
+                updates.append({"id": row.id, "fixed_ip": fixed_ip, "routes": routes})
+        elif cn in names:
+            # 名称已被其他客户端占用，跳过；下次导入仍会重试
+            state.pop(cn, None)
+        else:
+            new_clients.append(
+                {
+                    "name": cn,
+                    "common_name": cn,
+                    "fixed_ip": fixed_ip,
+                    "routes": routes,
+                    "status": "offline",
+                    "disabled": False,
+                    "created_at": now_shanghai_naive(),
+                }
+            )
+
+    try:
+        for chunk in _chunks(updates, _INSERT_CHUNK):
+            db.execute(update(client_model), chunk)
+        for chunk in _chunks(new_clients, _INSERT_CHUNK):
+            db.execute(insert(client_model), chunk)
+        if state != previous:
+            crud.runtime_state.set_value(
+                db, key=CCD_STATE_KEY, value=json.dumps(state, separators=(",", ":")), commit=False
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    stats["created"] = len(new_clients)
+    stats["updated"] = len(updates)
+    return stats
+
+
+def _parse_cert_file(path: str) -> tuple[str, dict | None, str | None]:
+    """进程池任务：解析单个证书文件，返回 (cn, info, error)。"""
+    cert_path = Path(path)
+    try:
+        info = x509.parse_certificate_file(cert_path)
+    except Exception as exc:
+        return cert_path.stem, None, str(exc) or "无法读取证书"
+    return (
+        cert_path.stem,
+        {"serial_number": info.serial, "not_before": info.not_before, "not_after": info.not_after},
+        None,
+    )
+
 
-    return {"created": created, "updated": updated}
+def _parse_cert_files(paths: list[Path]) -> Iterator[tuple[str, dict | None, str | None]]:
+    # 文件少时进程池的启动开销得不偿失
+    if len(paths) < _POOL_MIN_FILES:
+        yield from map(_parse_cert_file, map(str, paths))
+        return
+    workers = settings.import_workers or os.cpu_count() or 1
+    # 服务进程中有 management 读线程、作业协调、准入文件发布等线程，fork 时若它们正持有锁，
+    # 子进程可能死锁；spawn 启动全新解释器，_parse_cert_file 为模块级函数，可直接传递
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunksize = max(1, min(256, len(paths) // (workers * 4)))
+        yield from pool.map(_parse_cert_file, map(str, paths), chunksize=chunksize)
+
+
+def _chunks(rows: list[dict], size: int) -> Iterator[list[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
 
 
 def import_certificates_from_easyrsa(db: Session) -> dict[str, int]:
     """
     从 Easy-RSA PKI 目录导入所有已颁发的证书到数据库
     适配 angristan 脚本: /etc/openvpn/server/easy-rsa/pki/issued/
+
+    已有 CN/序列号/客户端一次性预加载；证书在进程池中解析；证书与客户端在同一事务内分块批量插入。
+    返回中包含耗时与吞吐（elapsed、per_second）以及逐文件错误（errors）。
     """
-    created = 0
-    skipped = 0
-    errors = []
+    started = time.perf_counter()
+    errors: list[str] = []
 
     easyrsa_pki = Path(settings.easyrsa_path) / "pki"
     issued_dir = easyrsa_pki / "issued"
@@ -117,105 +250,86 @@ def import_certificates_from_easyrsa(db: Session) -> dict[str, int]:
             "error": f"Easy-RSA PKI 目录不存在: {issued_dir}",
         }
 
-    # 遍历所有 .crt 文件
+    cert_model = crud.certificate.model
+    client_model = crud.client.model
+    existing_cns = set(db.scalars(select(cert_model.common_name)))
+    serials = set(db.scalars(select(cert_model.serial_number)))
+    clients = {
+        cn: (client_id, cert_id)
+        for client_id, cn, cert_id in db.execute(
+            select(client_model.id, client_model.common_name, client_model.certificate_id)
+        )
+    }
+    client_names = set(db.scalars(select(client_model.name)))
+
+    # 文件名即为 Common Name；跳过服务器证书与已导入的证书
+    pending: list[Path] = []
+    skipped = 0
     for cert_file in issued_dir.glob("*.crt"):
-        cn = cert_file.stem  # 文件名即为 Common Name
-        
-        # 跳过服务器证书
-        if cn in ["server", "Server"]:
+        cn = cert_file.stem
+        if cn in ("server", "Server"):
             continue
+        if cn in existing_cns:
+            skipped += 1
+            continue
+        pending.append(cert_file)
 
-        try:
-            # 检查是否已存在
-            existing_cert = crud.certificate.get_by_cn(db, common_name=cn)
-            if existing_cert:
-                skipped += 1
-                continue
+    cert_rows: list[dict] = []
+    for cn, info, error in _parse_cert_files(pending):
+        if error:
+            errors.append(f"{cn}: {error}")
+            continue
+        if info["serial_number"] in serials:
+            errors.append(f"{cn}: 序列号 {info['serial_number']} 已存在")
+            continue
+        serials.add(info["serial_number"])
+        cert_rows.append({"common_name": cn, "status": "valid", **info})
 
-            # 读取证书信息
-            cert_info = _get_cert_info(cert_file)
-            if not cert_info:
-                errors.append(f"无法读取证书: {cn}")
-                continue
+    try:
+        cert_ids: dict[str, int] = {}
+        for chunk in _chunks(cert_rows, _INSERT_CHUNK):
+            result = db.execute(insert(cert_model).returning(cert_model.id, cert_model.common_name), chunk)
+            cert_ids.update((cn, cert_id) for cert_id, cn in result)
 
-            # 创建证书记录
-            cert_create = CertificateCreate(
-                common_name=cn,
-                serial_number=cert_info.get("serial", ""),
-                not_before=cert_info.get("not_before"),
-                not_after=cert_info.get("not_after"),
-                status="valid",
-            )
-            crud.certificate.create(db, cert_create)
-
-            # 检查或创建对应的客户端记录
-            existing_client = crud.client.get_by_common_name(db, common_name=cn)
-            if not existing_client:
-                crud.client.create(
-                    db,
-                    ClientCreate(
-                        name=cn,
-                        common_name=cn,
-                        status="offline",
-                        disabled=False,
-                    ),
+        # 检查或创建对应的客户端记录，并关联证书
+        client_rows: list[dict] = []
+        links: list[dict] = []
+        for cn, cert_id in cert_ids.items():
+            if cn in clients:
+                client_id, linked = clients[cn]
+                if linked is None:
+                    links.append({"id": client_id, "certificate_id": cert_id})
+            elif cn in client_names:
+                errors.append(f"{cn}: 客户端名称已被占用，未创建客户端")
+            else:
+                client_names.add(cn)
+                client_rows.append(
+                    {
+                        "name": cn,
+                        "common_name": cn,
+                        "status": "offline",
+                        "disabled": False,
+                        "certificate_id": cert_id,
+                        "created_at": now_shanghai_naive(),
+                    }
                 )
+        for chunk in _chunks(client_rows, _INSERT_CHUNK):
+            db.execute(insert(client_model), chunk)
+        for chunk in _chunks(links, _INSERT_CHUNK):
+            db.execute(update(client_model), chunk)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
 
-            created += 1
-
-        except Exception as e:
-            errors.append(f"{cn}: {str(e)}")
-            continue
-
+    elapsed = time.perf_counter() - started
     result = {
-        "created": created,
+        "created": len(cert_ids),
         "skipped": skipped,
+        "elapsed": round(elapsed, 3),
+        "per_second": round(len(pending) / elapsed, 1) if elapsed > 0 else 0,
     }
     if errors:
         result["errors"] = errors
 
     return result
-
-
-def _get_cert_info(cert_path: Path) -> dict | None:
-    """使用 openssl 读取证书信息"""
-    try:
-        # 获取序列号
-        serial_result = subprocess.run(
-            ["openssl", "x509", "-in", str(cert_path), "-noout", "-serial"],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        serial = serial_result.stdout.strip().split("=")[-1]
-
-        # 获取起始日期
-        startdate_result = subprocess.run(
-            ["openssl", "x509", "-in", str(cert_path), "-noout", "-startdate"],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        startdate_str = startdate_result.stdout.strip().split("=", 1)[-1]
-        
-        # 获取过期日期
-        enddate_result = subprocess.run(
-            ["openssl", "x509", "-in", str(cert_path), "-noout", "-enddate"],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        enddate_str = enddate_result.stdout.strip().split("=", 1)[-1]
-
-        # 解析日期 (格式: Jan  3 06:30:45 2026 GMT)
-        issued_at = datetime.strptime(startdate_str, "%b %d %H:%M:%S %Y %Z")
-        expires_at = datetime.strptime(enddate_str, "%b %d %H:%M:%S %Y %Z")
-
-        return {
-            "serial": serial,
-            "not_before": issued_at,
-            "not_after": expires_at,
-        }
-    except Exception:
-        return None
-
@@ -0,0 +1,157 @@
+"""
+批量作业执行。
+
+作业与条目写入 jobs/job_items 表，进度与结果由数据库共享，任意 worker 都能查询。
+条目在进程内的有界线程池中执行（JOB_WORKERS），所有作业共用，避免批量请求占满 API worker；
+每个作业由一个协调线程分发条目、等待完成，再执行可选的收尾动作（如统一刷新 CRL）。
+
+作业只在创建它的进程内执行，进程退出（重启、崩溃）后不会续跑：jobs.owner 记录所属进程，
+leader 定期（JOB_REAPER_INTERVAL）把所属进程已不存在的未完成作业及其剩余条目标记为 failed。
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.api.deps import get_db_context
+from app.core.config import get_settings
+from app.models.job import JobItem
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# handler(db, target, payload) -> 结果说明；抛异常视为该条目失败
+ItemHandler = Callable[[Session, str, dict[str, Any] | None], str | None]
+# on_complete(db, succeeded_targets) -> 作业说明；抛异常则作业标记为 failed
+CompleteHandler = Callable[[Session, list[str]], str | None]
+# on_start(db, pending_targets) -> 作业说明；在分发条目前执行一次，用于批量预处理
+StartHandler = Callable[[Session, list[str]], str | None]
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _process_start(pid: int) -> str:
+    """进程启动时间（/proc/<pid>/stat 第 22 列），与 pid 一起区分被复用的 pid。"""
+    try:
+        stat = open(f"/proc/{pid}/stat", "rb").read()
+    except OSError:
+        return ""
+    # 第 2 列 comm 可能含空格，从最后一个 ")" 之后开始数
+    fields = stat[stat.rfind(b")") + 2 :].split()
+    return fields[19].decode() if len(fields) > 19 else ""
+
+
+def process_owner() -> str:
+    """当前进程的作业所有者标识，创建作业时写入 jobs.owner。"""
+    pid = os.getpid()
+    return f"{socket.gethostname()}:{pid}:{_process_start(pid)}"
+
+
+def _owner_gone(owner: str | None) -> bool:
+    if not owner:
+        # 升级前创建的作业没有记录所属进程，升级时所有进程都已重启
+        return True
+    host, _, rest = owner.partition(":")
+    if host != socket.gethostname():
+        # 其他节点的作业由该节点的 leader 处理
+        return False
+    pid, _, started = rest.partition(":")
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (PermissionError, ValueError):
+        return False
+    return _process_start(int(pid)) != started
+
+
+def fail_orphaned() -> None:
+    """后台任务：所属进程已退出的 queued/running 作业标记为 failed。"""
+    with get_db_context() as db:
+        for job_id, owner in crud.job.unfinished(db):
+            if _owner_gone(owner):
+                logger.warning("Job %s interrupted: owner %s no longer running", job_id, owner)
+                crud.job.fail_unfinished(db, job_id=job_id, detail="interrupted: worker process exited")
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, settings.job_workers), thread_name_prefix="job")
+        return _executor
+
+
+def _run_item(job_id: int, item_id: int, handler: ItemHandler) -> str | None:
+    """执行单个条目，返回成功条目的 target。"""
+    with get_db_context() as db:
+        item = db.get(JobItem, item_id)
+        if item is None:
+            return None
+        target = item.target
+        payload = json.loads(item.payload) if item.payload else None
+        try:
+            detail = handler(db, target, payload)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Job %s item %s failed", job_id, target)
+            db.rollback()
+            crud.job.finish_item(db, item_id=item_id, job_id=job_id, ok=False, detail=str(exc) or type(exc).__name__)
+            return None
+        crud.job.finish_item(db, item_id=item_id, job_id=job_id, ok=True, detail=detail)
+        return target
+
+
+def _coordinate(
+    job_id: int, handler: ItemHandler, on_complete: CompleteHandler | None, on_start: StartHandler | None
+) -> None:
+    try:
+        with get_db_context() as db:
+            crud.job.set_status(db, job_id=job_id, status="running")
+            pending = crud.job.pending_items(db, job_id=job_id)
+            if on_start is not None:
+                detail = on_start(db, [target for _, target in pending])
+                if detail:
+                    crud.job.set_status(db, job_id=job_id, status="running", detail=detail)
+        item_ids = [item_id for item_id, _ in pending]
+        executor = _get_executor()
+        futures = [executor.submit(_run_item, job_id, item_id, handler) for item_id in item_ids]
+        wait(futures)
+        succeeded = [f.result() for f in futures if f.exception() is None and f.result() is not None]
+
+        detail = None
+        with get_db_context() as db:
+            if on_complete is not None:
+                detail = on_complete(db, succeeded)
+            job = crud.job.get(db, job_id)
+            if job.failed == 0:
+                status = "succeeded"
+            elif job.done == 0:
+                status = "failed"
+            else:
+                status = "partial"
+            crud.job.set_status(db, job_id=job_id, status=status, detail=detail)
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("Job %s failed", job_id)
+        with get_db_context() as db:
+            crud.job.set_status(db, job_id=job_id, status="failed", detail=str(exc))
+
+
+def submit(
+    job_id: int,
+    handler: ItemHandler,
+    *,
+    on_complete: CompleteHandler | None = None,
+    on_start: StartHandler | None = None,
+) -> None:
+    """在后台执行作业中所有待处理条目。"""
+    threading.Thread(
+        target=_coordinate, args=(job_id, handler, on_complete, on_start), name=f"job-{job_id}", daemon=True
+    ).start()
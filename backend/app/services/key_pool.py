@@ -0,0 +1,155 @@
+"""
+预生成客户端私钥池。
+
+build-client-full 的耗时主要在生成私钥上。这里由后台任务预先生成无口令私钥放入池目录，
+创建客户端时取出一把，现场生成带 CN 的 CSR（只需签名，毫秒级），再用
+easyrsa import-req / sign-req 由 CA 签发。CSR 的 subject 必须包含客户端 CN，
+因此池里只存私钥，不预先生成 CSR。
+
+取用通过 os.rename 原子完成，多个 worker 并发取用不会拿到同一把私钥。
+密钥算法默认与 Easy-RSA vars（EASYRSA_ALGO/EASYRSA_CURVE/EASYRSA_KEY_SIZE）保持一致。
+"""
+
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_KEY_SUFFIX = ".key"
+
+
+def _pool_dir() -> Path:
+    path = Path(settings.key_pool_path)
+    path.mkdir(parents=True, exist_ok=True)
+    os.chmod(path, 0o700)
+    return path
+
+
+def _easyrsa_vars() -> dict[str, str]:
+    values: dict[str, str] = {}
+    for vars_path in (settings.easyrsa_path / "vars", settings.easyrsa_path / "pki" / "vars"):
+        if not vars_path.exists():
+            continue
+        for line in vars_path.read_text().splitlines():
+            if m := re.match(r"^\s*set_var\s+(\w+)\s+\"?([^\"\s]+)\"?", line):
+                values.setdefault(m.group(1), m.group(2))
+    return values
+
+
+def key_algorithm() -> str:
+    """返回 'rsa:<bits>' 或 'ec:<curve>'；未配置时按 Easy-RSA vars 推断。"""
+    if settings.key_pool_algorithm:
+        return settings.key_pool_algorithm
+    values = _easyrsa_vars()
+    if values.get("EASYRSA_ALGO") == "ec":
+        return f"ec:{values.get('EASYRSA_CURVE', 'secp384r1')}"
+    if values.get("EASYRSA_ALGO") == "ed":
+        return f"ed:{values.get('EASYRSA_CURVE', 'ed25519')}"
+    return f"rsa:{values.get('EASYRSA_KEY_SIZE', '2048')}"
+
+
+def _genpkey_args(algorithm: str) -> list[str]:
+    kind, _, param = algorithm.partition(":")
+    if kind == "ec":
+        return ["-algorithm", "EC", "-pkeyopt", f"ec_paramgen_curve:{param}"]
+    if kind == "ed":
+        return ["-algorithm", param.upper()]
+    return ["-algorithm", "RSA", "-pkeyopt", f"rsa_keygen_bits:{param or 2048}"]
+
+
+def available() -> int:
+    pool = Path(settings.key_pool_path)
+    if not pool.exists():
+        return 0
+    return sum(1 for p in pool.iterdir() if p.suffix == _KEY_SUFFIX)
+
+
+def _generate_one(pool: Path, algorithm: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=pool, suffix=".tmp")
+    os.close(fd)
+    try:
+        result = subprocess.run(
+            ["openssl", "genpkey", *_genpkey_args(algorithm), "-out", tmp],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "openssl genpkey failed")
+        os.chmod(tmp, 0o600)
+        # 写完后再改名，取用方只会看到完整的私钥文件
+        os.rename(tmp, pool / f"{uuid.uuid4().hex}{_KEY_SUFFIX}")
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def refill() -> int:
+    """低于低水位时补充到目标数量，返回新生成的数量。"""
+    count = available()
+    if count >= settings.key_pool_low_watermark:
+        return 0
+    missing = settings.key_pool_size - count
+    if missing <= 0:
+        return 0
+    pool = _pool_dir()
+    algorithm = key_algorithm()
+    workers = max(1, min(settings.key_pool_refill_workers, missing))
+    logger.info("Refilling key pool: %s -> %s (%s)", count, settings.key_pool_size, algorithm)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="key-pool") as executor:
+        futures = [executor.submit(_generate_one, pool, algorithm) for _ in range(missing)]
+    generated = 0
+    for future in futures:
+        try:
+            future.result()
+            generated += 1
+        except Exception:
+            logger.exception("Failed to pre-generate client key")
+    return generated
+
+
+def claim(target: Path) -> bool:
+    """取出一把预生成私钥移动到 target（同一文件系统内原子改名）；池为空时返回 False。"""
+    pool = Path(settings.key_pool_path)
+    if not pool.exists():
+        return False
+    for candidate in sorted(pool.iterdir()):
+        if candidate.suffix != _KEY_SUFFIX:
+            continue
+        try:
+            os.rename(candidate, target)
+        except FileNotFoundError:
+            # 已被其他 worker 取走
+            continue
+        except OSError:
+            # 跨文件系统时无法原子改名：先在池内改名占有，再复制
+            claimed = candidate.with_suffix(".claimed")
+            try:
+                os.rename(candidate, claimed)
+            except FileNotFoundError:
+                continue
+            target.write_bytes(claimed.read_bytes())
+            os.chmod(target, 0o600)
+            claimed.unlink()
+        return True
+    return False
+
+
+def build_csr(key_path: Path, common_name: str, req_path: Path) -> None:
+    """用已有私钥生成 CN 为 common_name 的 CSR（不涉及密钥生成）。"""
+    subject = "/CN=" + re.sub(r"([\\/=+])", r"\\\1", common_name)
+    result = subprocess.run(
+        ["openssl", "req", "-new", "-key", str(key_path), "-subj", subject, "-out", str(req_path)],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "openssl req failed")
@@ -1,8 +1,13 @@
 """OpenVPN management 接口相关工具函数（含中文注释）。"""
 
+import asyncio
+import os
 import socket
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
 
 from app.core.config import get_settings
 
@@ -41,6 +46,27 @@ class StatusDetails:
     routing_table: list[RoutingEntry]
 
 
+@dataclass
+class StatusSnapshot:
+    """`status 3` 单次解析结果：在线客户端、路由表、全局指标、标题与时间。"""
+    clients: list[OnlineClient]
+    routing_table: list[RoutingEntry]
+    title: str | None
+    time_unix: int | None
+    time_str: str | None
+    global_stats: dict[str, int | str]
+    fetched_at: float
+
+    def details(self) -> StatusDetails:
+        return StatusDetails(
+            title=self.title,
+            time_unix=self.time_unix,
+            time_str=self.time_str,
+            global_stats=self.global_stats,
+            routing_table=self.routing_table,
+        )
+
+
 @dataclass
 class LoadStats:
     """load-stats 汇总：在线数、流量、运行时长。"""
@@ -61,61 +87,357 @@ class StateEvent:
     real_address: str | None
 
 
-def _send_command(cmd: str) -> list[str]:
-    """向 management 接口发送命令并返回行列表。"""
-    with socket.create_connection((settings.openvpn_management_host, settings.openvpn_management_port), timeout=3) as sock:
-        sock.recv(4096)  # banner
-        sock.sendall((cmd + "\n").encode())
-        data = b""
+class ManagementBusyError(RuntimeError):
+    """等待 management 长连接的请求过多。"""
+
+
+# 输出多行、以单独一行 "END" 结束的命令；其余命令只返回一行 SUCCESS:/ERROR:
+_MULTILINE_COMMANDS = frozenset({"status", "help", "version"})
+# 这些命令带 on/off 参数时是单行应答，不带参数/带数字或 all 时输出历史记录
+_HISTORY_COMMANDS = frozenset({"state", "log", "echo"})
+
+
+def _is_multiline(cmd: str) -> bool:
+    parts = cmd.split()
+    if not parts:
+        return False
+    verb = parts[0].lower()
+    if verb in _MULTILINE_COMMANDS:
+        return True
+    if verb in _HISTORY_COMMANDS:
+        return len(parts) == 1 or parts[1] == "all" or parts[1].isdigit()
+    return False
+
+
+class ResponseFrame:
+    """按命令类型判断一条应答的边界。"""
+
+    def __init__(self, cmd: str) -> None:
+        self.multiline = _is_multiline(cmd)
+        self._first = True
+
+    def feed(self, line: str) -> tuple[bool, bool]:
+        """返回 (该行是否属于应答内容, 本帧是否结束)。"""
+        if self.multiline:
+            if line == "END":
+                return False, True
+            if self._first and line.startswith("ERROR:"):
+                return True, True
+            self._first = False
+            return True, False
+        if line.startswith(("SUCCESS:", "ERROR:")):
+            return True, True
+        return True, False
+
+
+class ManagementSession:
+    """
+    management 长连接（每个 worker 进程一个）。
+
+    - 所有命令在同一 socket 上串行执行，OpenVPN 的 management 端口本身是单线程的；
+    - 等待队列有上限，超出时直接抛出 ManagementBusyError，避免请求无限堆积；
+    - 连接异常时关闭 socket，下一条命令自动重连（仅重试一次）；
+    - 按行分帧读取：多行命令读到单独的 "END" 行为止，单行命令读到 SUCCESS:/ERROR: 为止，
+      以 ">" 开头的异步通知行直接丢弃；
+    - OpenVPN 同一时间只接受一个 management 客户端，空闲超过 idle_timeout 即断开，
+      避免一个 worker 长期占用端口（idle_timeout 为 0 时每条命令后立即断开）；启用事件监听时优先连接本机的 relay socket；
+    - management_async 的 asyncio 客户端也经由同一个会话：共用锁、等待上限与空闲断开，
+      同一时刻本进程最多只有一条连接（同步 socket 或 asyncio 流，切换时关闭另一种）。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        timeout: float,
+        max_waiters: int,
+        idle_timeout: float = 0,
+        relay_path: Path | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.relay_path = relay_path
+        self._sock: socket.socket | None = None
+        self._reader: BinaryIO | None = None
+        self._pid: int | None = None
+        self._idle_timer: threading.Timer | None = None
+        # asyncio 客户端的连接：(事件循环, reader, writer)
+        self._async_conn: tuple[asyncio.AbstractEventLoop, asyncio.StreamReader, asyncio.StreamWriter] | None = None
+        self._lock = threading.Lock()
+        # 正在执行的 1 个 + 排队的 max_waiters 个
+        self._slots = threading.BoundedSemaphore(max_waiters + 1)
+
+    def _open_socket(self) -> socket.socket:
+        if self.relay_path is not None and self.relay_path.exists():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(str(self.relay_path))
+                return sock
+            except OSError:
+                # relay 未运行（leader 已退出），直接连 OpenVPN
+                sock.close()
+        return socket.create_connection((self.host, self.port), timeout=self.timeout)
+
+    def _connect(self) -> BinaryIO:
+        self._close_async()
+        sock = self._open_socket()
+        reader = sock.makefile("rb")
+        reader.readline()  # banner: >INFO:OpenVPN Management Interface ...
+        self._sock = sock
+        self._reader = reader
+        self._pid = os.getpid()
+        return reader
+
+    def _idle_close(self) -> None:
+        if self._lock.acquire(blocking=False):
+            try:
+                self.close()
+            finally:
+                self._lock.release()
+
+    def _cancel_idle_close(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _schedule_idle_close(self) -> None:
+        if self.idle_timeout <= 0:
+            return
+        timer = threading.Timer(self.idle_timeout, self._idle_close)
+        timer.daemon = True
+        self._idle_timer = timer
+        timer.start()
+
+    def close(self) -> None:
+        for res in (self._reader, self._sock):
+            if res is None:
+                continue
+            try:
+                res.close()
+            except OSError:
+                pass
+        self._reader = None
+        self._sock = None
+        self._close_async()
+
+    def _close_async(self) -> None:
+        conn, self._async_conn = self._async_conn, None
+        if conn is None:
+            return
+        loop, _, writer = conn
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            writer.close()
+        elif not loop.is_closed():
+            # 空闲定时器等其他线程关闭时，交给连接所属的事件循环执行
+            loop.call_soon_threadsafe(writer.close)
+
+    # 以下供 management_async 使用，语义与 iter_command 中的加锁/释放一致
+
+    def reserve_slot(self) -> bool:
+        """占用一个等待名额；名额用尽时返回 False（调用方应抛出 ManagementBusyError）。"""
+        return self._slots.acquire(blocking=False)
+
+    def release_slot(self) -> None:
+        self._slots.release()
+
+    def try_acquire(self) -> bool:
+        """不阻塞地取得会话锁，成功时取消空闲断开。"""
+        if not self._lock.acquire(blocking=False):
+            return False
+        self._cancel_idle_close()
+        return True
+
+    def release(self, *, keep: bool) -> None:
+        """释放会话锁；keep=False 表示本帧未读完，丢弃连接。"""
+        if not keep or self.idle_timeout <= 0:
+            self.close()
+        elif self._sock is not None or self._async_conn is not None:
+            self._schedule_idle_close()
+        self._lock.release()
+
+    def async_connection(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter] | None:
+        """当前事件循环上可用的 asyncio 连接（须持有会话锁）。"""
+        conn = self._async_conn
+        if conn is None:
+            return None
+        loop, reader, writer = conn
+        if loop is not asyncio.get_running_loop() or writer.is_closing():
+            self._close_async()
+            return None
+        return reader, writer
+
+    def attach_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """登记新建的 asyncio 连接，同时关闭同步 socket（须持有会话锁）。"""
+        self.close()
+        self._async_conn = (asyncio.get_running_loop(), reader, writer)
+
+    def _readline(self, reader: BinaryIO) -> str:
+        raw = reader.readline()
+        if not raw:
+            raise ConnectionError("management connection closed")
+        return raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    def _iter_execute(self, cmd: str) -> Iterator[tuple[str, bool]]:
+        """发送命令并逐行产出 (行, 是否为本帧最后一行)。"""
+        reader = self._reader
+        # fork 后继承的 socket 不能与父进程共用
+        if reader is None or self._pid != os.getpid():
+            reader = self._connect()
+        assert self._sock is not None
+        self._sock.sendall((cmd + "\n").encode())
+        frame = ResponseFrame(cmd)
         while True:
-            chunk = sock.recv(4096)
-            if not chunk:
-                break
-            data += chunk
-            if b"END" in chunk or b"SUCCESS" in chunk or b"ERROR" in chunk:
-                # management interface typically ends status output with "END"
-                break
-        return data.decode().splitlines()
+            line = self._readline(reader)
+            if line.startswith(">"):
+                # 实时通知（>LOG、>BYTECOUNT 等），与当前命令无关
+                continue
+            keep, done = frame.feed(line)
+            if keep:
+                yield line, done
+            if done:
+                return
+
+    def iter_command(self, cmd: str) -> Iterator[str]:
+        """串行执行一条命令并流式产出应答行；连接失效且尚未产出任何行时重连重试一次。"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ManagementBusyError("management interface busy")
+        try:
+            if not self._lock.acquire(timeout=self.timeout):
+                raise ManagementBusyError("management interface busy")
+            self._cancel_idle_close()
+            complete = False
+            try:
+                for attempt in range(2):
+                    started = False
+                    try:
+                        for line, last in self._iter_execute(cmd):
+                            started = True
+                            complete = last
+                            yield line
+                        complete = True
+                        return
+                    except socket.timeout:
+                        raise
+                    except OSError:
+                        # 连接可能已被 OpenVPN 关闭（重启/超时），未读到数据时重连一次
+                        self.close()
+                        if started or attempt:
+                            raise
+            finally:
+                # 调用方提前退出或读取异常时本帧剩余数据无法再对齐，直接丢弃连接
+                self.release(keep=complete)
+        finally:
+            self._slots.release()
+
+    def command(self, cmd: str) -> list[str]:
+        """执行一条命令并返回完整的应答行列表。"""
+        return list(self.iter_command(cmd))
+
+
+def _idle_timeout() -> float:
+    if settings.openvpn_management_idle_timeout is not None:
+        return settings.openvpn_management_idle_timeout
+    # 未设置时：经 relay 共享 leader 的连接，短暂保持以复用；直连 OpenVPN 时每条命令后立即断开，
+    # 不让某个 worker 占住 OpenVPN 唯一的 management 客户端名额
+    return 1.0 if settings.management_events_enabled else 0.0
+
+
+_session = ManagementSession(
+    settings.openvpn_management_host,
+    settings.openvpn_management_port,
+    timeout=settings.openvpn_management_timeout,
+    max_waiters=settings.openvpn_management_max_waiters,
+    idle_timeout=_idle_timeout(),
+    relay_path=settings.openvpn_management_relay_path if settings.management_events_enabled else None,
+)
+
+
+def session() -> ManagementSession:
+    """本进程的 management 会话（management_async 与同步接口共用）。"""
+    return _session
+
+
+def send_command(cmd: str) -> list[str]:
+    """向 management 接口发送命令并返回行列表（复用本进程的长连接）。"""
+    return _session.command(cmd)
+
+
+def _iter_command(cmd: str) -> Iterator[str]:
+    """向 management 接口发送命令，边接收边产出应答行。"""
+    return _session.iter_command(cmd)
 
 
-def _parse_client_lines(lines: list[str]) -> list[OnlineClient]:
+def _split(line: str) -> list[str]:
+    # Support both comma and tab separated formats
+    return line.split("\t") if "\t" in line else line.split(",")
+
+
+def _parse_client_line(line: str) -> OnlineClient | None:
+    """解析单行 CLIENT_LIST（management 或 status 文件）。"""
+    if not line.startswith("CLIENT_LIST"):
+        return None
+    parts = _split(line)
+    if len(parts) < 3:
+        return None
+    cn = parts[1]
+    real_addr = parts[2] if len(parts) > 2 else ""
+    virt_addr = parts[3] if len(parts) > 3 else ""
+    try:
+        b_recv = int(parts[5]) if len(parts) > 5 and parts[5] else 0
+    except ValueError:
+        b_recv = 0
+    try:
+        b_sent = int(parts[6]) if len(parts) > 6 and parts[6] else 0
+    except ValueError:
+        b_sent = 0
+    connected_since = parts[7] if len(parts) > 7 else ""
+    client_id = parts[10] if len(parts) > 10 else None
+    return OnlineClient(
+        common_name=cn,
+        real_address=real_addr,
+        virtual_address=virt_addr,
+        bytes_received=b_recv,
+        bytes_sent=b_sent,
+        connected_since=connected_since,
+        client_id=client_id,
+    )
+
+
+def _parse_routing_line(line: str) -> RoutingEntry | None:
+    """解析单行 ROUTING_TABLE。"""
+    if not line.startswith("ROUTING_TABLE"):
+        return None
+    parts = _split(line)
+    # ROUTING_TABLE,10.8.0.2,client/1.2.3.4:5678,1700000000,client1
+    if len(parts) < 5:
+        return None
+    return RoutingEntry(
+        virtual_address=parts[1],
+        real_address=parts[2],
+        last_ref=parts[3],
+        common_name=parts[4],
+    )
+
+
+def _parse_client_lines(lines: Iterable[str]) -> list[OnlineClient]:
     """解析 CLIENT_LIST 行（management 或 status 文件）。"""
     clients: list[OnlineClient] = []
     for line in lines:
-        if not line.startswith("CLIENT_LIST"):
-            continue
-        # Support both comma and tab separated formats
-        parts = line.split("\t") if "\t" in line else line.split(",")
-        if len(parts) < 3:
-            continue
-        cn = parts[1]
-        real_addr = parts[2] if len(parts) > 2 else ""
-        virt_addr = parts[3] if len(parts) > 3 else ""
-        try:
-            b_recv = int(parts[5]) if len(parts) > 5 and parts[5] else 0
-        except ValueError:
-            b_recv = 0
-        try:
-            b_sent = int(parts[6]) if len(parts) > 6 and parts[6] else 0
-        except ValueError:
-            b_sent = 0
-        connected_since = parts[7] if len(parts) > 7 else ""
-        client_id = parts[10] if len(parts) > 10 else None
-        clients.append(
-            OnlineClient(
-                common_name=cn,
-                real_address=real_addr,
-                virtual_address=virt_addr,
-                bytes_received=b_recv,
-                bytes_sent=b_sent,
-                connected_since=connected_since,
-                client_id=client_id,
-            )
-        )
+        client = _parse_client_line(line)
+        if client is not None:
+            clients.append(client)
     return clients
 
 
-def _parse_status_file(path: Path) -> list[OnlineClient]:
+def parse_status_file(path: Path) -> list[OnlineClient]:
     """兜底：无法访问 management 时解析 status 文件。"""
     if not path.exists():
         return []
@@ -126,41 +448,24 @@ def _parse_status_file(path: Path) -> list[OnlineClient]:
     return _parse_client_lines(lines)
 
 
-def list_online() -> list[OnlineClient]:
-    """获取在线客户端，优先 management，失败则读 status 文件。"""
-    try:
-        lines = _send_command("status 3")
-        clients = _parse_client_lines(lines)
-        if clients:
-            return clients
-    except Exception:
-        # fall back to status file below
-        pass
-    return _parse_status_file(settings.openvpn_status_path)
-
-
-def disconnect(common_name: str) -> str:
-    """按证书 CN 踢下线客户端。"""
-    lines = _send_command(f"kill {common_name}")
-    if any("SUCCESS" in line for line in lines):
-        return "disconnected"
-    raise RuntimeError("Disconnect failed: " + ";".join(lines))
-
-
-def _split(line: str) -> list[str]:
-    return line.split("\t") if "\t" in line else line.split(",")
-
-
-def status_details() -> StatusDetails:
-    """解析 `status 3` 获取标题、时间、全局指标与路由表。"""
-    lines = _send_command("status 3")
+def parse_status(lines: Iterable[str]) -> StatusSnapshot:
+    """一次遍历解析 `status 3` 的全部内容。"""
+    clients: list[OnlineClient] = []
+    routing_table: list[RoutingEntry] = []
     title = None
     time_unix: int | None = None
     time_str: str | None = None
     global_stats: dict[str, int | str] = {}
-    routing_table: list[RoutingEntry] = []
     for line in lines:
-        if line.startswith("TITLE"):
+        if line.startswith("CLIENT_LIST"):
+            client = _parse_client_line(line)
+            if client is not None:
+                clients.append(client)
+        elif line.startswith("ROUTING_TABLE"):
+            entry = _parse_routing_line(line)
+            if entry is not None:
+                routing_table.append(entry)
+        elif line.startswith("TITLE"):
             parts = _split(line)
             if len(parts) >= 2:
                 title = ",".join(parts[1:]).strip()
@@ -181,33 +486,97 @@ def status_details() -> StatusDetails:
                     global_stats[key] = int(raw)
                 except ValueError:
                     global_stats[key] = raw
-        elif line.startswith("ROUTING_TABLE"):
-            parts = _split(line)
-            # ROUTING_TABLE,10.8.0.2,client/1.2.3.4:5678,1700000000,client1
-            if len(parts) >= 5:
-                routing_table.append(
-                    RoutingEntry(
-                        virtual_address=parts[1],
-                        real_address=parts[2],
-                        last_ref=parts[3],
-                        common_name=parts[4],
-                    )
-                )
-    return StatusDetails(
+    return StatusSnapshot(
+        clients=clients,
+        routing_table=routing_table,
         title=title,
         time_unix=time_unix,
         time_str=time_str,
         global_stats=global_stats,
-        routing_table=routing_table,
+        fetched_at=time.monotonic(),
     )
 
 
+_snapshot: StatusSnapshot | None = None
+_snapshot_lock = threading.Lock()
+
+
+def cached_status_snapshot(max_age: float | None = None) -> StatusSnapshot | None:
+    """返回未过期的缓存快照（不发起请求）。"""
+    ttl = settings.openvpn_status_cache_ttl if max_age is None else max_age
+    snap = _snapshot
+    if snap is not None and time.monotonic() - snap.fetched_at <= ttl:
+        return snap
+    return None
+
+
+def store_status_snapshot(snap: StatusSnapshot) -> None:
+    """写入快照缓存（异步客户端拉取后共享给同步调用方）。"""
+    global _snapshot
+    _snapshot = snap
+
+
+def get_status_snapshot(max_age: float | None = None) -> StatusSnapshot:
+    """
+    获取 `status 3` 快照，在 TTL（OPENVPN_STATUS_CACHE_TTL）内复用本进程缓存。
+    并发请求同时过期时只有一个去拉取，其余等待并复用同一结果。
+    """
+    global _snapshot
+    with _snapshot_lock:
+        snap = cached_status_snapshot(max_age)
+        if snap is not None:
+            return snap
+        snap = parse_status(_iter_command("status 3"))
+        _snapshot = snap
+        return snap
+
+
+def invalidate_status_snapshot() -> None:
+    """丢弃缓存的快照（例如踢下线之后）。"""
+    global _snapshot
+    _snapshot = None
+
+
+def list_online() -> list[OnlineClient]:
+    """获取在线客户端，优先 management，失败则读 status 文件。"""
+    try:
+        clients = get_status_snapshot().clients
+        if clients:
+            return clients
+    except Exception:
+        # fall back to status file below
+        pass
+    return parse_status_file(settings.openvpn_status_path)
+
+
+def check_disconnect(lines: list[str]) -> str:
+    """校验 `kill` 命令应答。"""
+    if any("SUCCESS" in line for line in lines):
+        invalidate_status_snapshot()
+        return "disconnected"
+    raise RuntimeError("Disconnect failed: " + ";".join(lines))
+
+
+def disconnect(common_name: str) -> str:
+    """按证书 CN 踢下线客户端。"""
+    return check_disconnect(send_command(f"kill {common_name}"))
+
+
+def status_details() -> StatusDetails:
+    """解析 `status 3` 获取标题、时间、全局指标与路由表。"""
+    return get_status_snapshot().details()
+
+
 def load_stats() -> LoadStats:
     """
     使用 `load-stats`（若可用）获取在线数、流量、运行时长。
     格式示例：SUCCESS: nclients=1,bytesin=100,bytesout=200,uptime=3600
     """
-    lines = _send_command("load-stats")
+    return parse_load_stats(send_command("load-stats"))
+
+
+def parse_load_stats(lines: list[str]) -> LoadStats:
+    """解析 `load-stats` 应答。"""
     for line in lines:
         if "SUCCESS" not in line:
             continue
@@ -231,7 +600,11 @@ def load_stats() -> LoadStats:
 
 def state_history(limit: int = 10) -> list[StateEvent]:
     """返回最近的连接状态事件（默认 10 条）。"""
-    lines = _send_command("state")
+    return parse_state(send_command("state"), limit=limit)
+
+
+def parse_state(lines: list[str], *, limit: int = 10) -> list[StateEvent]:
+    """解析 `state` 历史记录。"""
     events: list[StateEvent] = []
     for line in lines:
         if not line or line.startswith(("END", "SUCCESS", ">")):
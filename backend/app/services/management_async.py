@@ -0,0 +1,164 @@
+"""
+OpenVPN management 接口的 asyncio 实现（供 async 接口使用，等待应答时不占用线程池）。
+
+连接、锁、等待上限与空闲断开都由 management 中本进程唯一的 ManagementSession 管理：
+OpenVPN 同一时间只接受一个 management 客户端，这里不另开竞争连接。
+会话锁是线程锁，这里以退避轮询的方式获取，不阻塞事件循环，也不占用线程。
+"""
+
+import asyncio
+
+from app.core.config import get_settings
+from app.services import management
+from app.services.management import (
+    LoadStats,
+    ManagementBusyError,
+    ManagementSession,
+    OnlineClient,
+    ResponseFrame,
+    StateEvent,
+    StatusDetails,
+    StatusSnapshot,
+)
+
+settings = get_settings()
+
+# 等待会话锁时的轮询间隔（秒），指数退避
+_POLL_MIN = 0.001
+_POLL_MAX = 0.02
+
+
+async def _acquire(session: ManagementSession) -> None:
+    if not session.reserve_slot():
+        raise ManagementBusyError("management interface busy")
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + session.timeout
+        delay = _POLL_MIN
+        while not session.try_acquire():
+            if loop.time() >= deadline:
+                raise ManagementBusyError("management interface busy")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _POLL_MAX)
+    except BaseException:
+        session.release_slot()
+        raise
+
+
+async def _open(session: ManagementSession) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if session.relay_path is not None and session.relay_path.exists():
+        try:
+            return await asyncio.wait_for(asyncio.open_unix_connection(str(session.relay_path)), session.timeout)
+        except OSError:
+            # relay 未运行（leader 已退出），直接连 OpenVPN
+            pass
+    return await asyncio.wait_for(asyncio.open_connection(session.host, session.port), session.timeout)
+
+
+async def _readline(session: ManagementSession, reader: asyncio.StreamReader) -> str:
+    raw = await asyncio.wait_for(reader.readline(), session.timeout)
+    if not raw:
+        raise ConnectionError("management connection closed")
+    return raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+async def _execute(session: ManagementSession, cmd: str) -> list[str]:
+    conn = session.async_connection()
+    if conn is None:
+        reader, writer = await _open(session)
+        session.attach_async(reader, writer)
+        await _readline(session, reader)  # banner
+    else:
+        reader, writer = conn
+    writer.write((cmd + "\n").encode())
+    await writer.drain()
+    frame = ResponseFrame(cmd)
+    lines: list[str] = []
+    while True:
+        line = await _readline(session, reader)
+        if line.startswith(">"):
+            continue
+        keep, done = frame.feed(line)
+        if keep:
+            lines.append(line)
+        if done:
+            return lines
+
+
+async def command(cmd: str, session: ManagementSession | None = None) -> list[str]:
+    """串行执行一条命令；连接失效时重连重试一次。"""
+    session = session or management.session()
+    await _acquire(session)
+    complete = False
+    try:
+        for attempt in range(2):
+            try:
+                lines = await _execute(session, cmd)
+            except TimeoutError:
+                raise
+            except OSError:
+                # 连接可能已被 OpenVPN 关闭，重连一次
+                session.close()
+                if attempt:
+                    raise
+                continue
+            complete = True
+            return lines
+        raise ConnectionError("management connection failed")
+    finally:
+        # 超时、取消等情况下本帧剩余数据无法再对齐，丢弃连接
+        session.release(keep=complete)
+        session.release_slot()
+
+
+_snapshot_lock: asyncio.Lock | None = None
+
+
+async def get_status_snapshot(max_age: float | None = None) -> StatusSnapshot:
+    """异步获取 `status 3` 快照，与同步接口共用同一份进程内缓存。"""
+    global _snapshot_lock
+    snap = management.cached_status_snapshot(max_age)
+    if snap is not None:
+        return snap
+    if _snapshot_lock is None:
+        _snapshot_lock = asyncio.Lock()
+    async with _snapshot_lock:
+        # 等锁期间可能已被其他请求刷新
+        snap = management.cached_status_snapshot(max_age)
+        if snap is not None:
+            return snap
+        snap = management.parse_status(await command("status 3"))
+        management.store_status_snapshot(snap)
+        return snap
+
+
+async def list_online() -> list[OnlineClient]:
+    """获取在线客户端，优先 management，失败则读 status 文件。"""
+    try:
+        clients = (await get_status_snapshot()).clients
+        if clients:
+            return clients
+    except Exception:
+        # fall back to status file below
+        pass
+    return await asyncio.to_thread(management.parse_status_file, settings.openvpn_status_path)
+
+
+async def status_details() -> StatusDetails:
+    """解析 `status 3` 获取标题、时间、全局指标与路由表。"""
+    return (await get_status_snapshot()).details()
+
+
+async def load_stats() -> LoadStats:
+    """使用 `load-stats` 获取在线数、流量、运行时长。"""
+    return management.parse_load_stats(await command("load-stats"))
+
+
+async def state_history(limit: int = 10) -> list[StateEvent]:
+    """返回最近的连接状态事件（默认 10 条）。"""
+    return management.parse_state(await command("state"), limit=limit)
+
+
+async def disconnect(common_name: str) -> str:
+    """按证书 CN 踢下线客户端。"""
+    return management.check_disconnect(await command(f"kill {common_name}"))
@@ -1,4 +1,8 @@
+import os
+import re
 import subprocess
+import threading
+import time
 from typing import Literal
 from pathlib import Path
 
@@ -9,18 +13,93 @@ settings = get_settings()
 ServiceAction = Literal["status", "start", "stop", "restart"]
 
 
-def _check_process_running() -> bool:
-    """检查 OpenVPN 进程是否在运行"""
+_PROC = Path("/proc")
+_PROCESS_PATTERN = re.compile(r"openvpn.*server")
+
+_probe_lock = threading.Lock()
+_probe_cache: tuple[float, bool] | None = None
+_last_pid: int | None = None
+
+
+def _cmdline(pid: int) -> str | None:
     try:
-        # 检查进程
-        result = subprocess.run(
-            ["pgrep", "-f", "openvpn.*server"],
-            capture_output=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except Exception:
+        raw = (_PROC / str(pid) / "cmdline").read_bytes()
+    except OSError:
+        return None
+    return raw.replace(b"\0", b" ").decode(errors="replace").strip()
+
+
+def _pid_matches(pid: int | None) -> bool:
+    """pid 对应的进程仍存活且命令行匹配（避免 pid 复用误判）。"""
+    if not pid:
         return False
+    cmdline = _cmdline(pid)
+    return bool(cmdline) and _PROCESS_PATTERN.search(cmdline) is not None
+
+
+def _read_pid_file() -> int | None:
+    try:
+        return int(settings.openvpn_pid_path.read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _scan_proc() -> int | None:
+    """扫描一次 /proc，等价于 pgrep -f openvpn.*server。"""
+    own = os.getpid()
+    for entry in _PROC.iterdir():
+        if not entry.name.isdigit() or int(entry.name) == own:
+            continue
+        if _pid_matches(int(entry.name)):
+            return int(entry.name)
+    return None
+
+
+def _probe_process() -> bool:
+    global _last_pid
+    if not _PROC.is_dir():
+        # 非 Linux 环境没有 /proc，退回 pgrep
+        try:
+            result = subprocess.run(["pgrep", "-f", "openvpn.*server"], capture_output=True, timeout=5)
+            return result.returncode == 0
+        except Exception:
+            return False
+
+    for pid in (_read_pid_file(), _last_pid):
+        if _pid_matches(pid):
+            _last_pid = pid
+            return True
+    _last_pid = _scan_proc()
+    return _last_pid is not None
+
+
+def _check_process_running() -> bool:
+    """
+    检查 OpenVPN 进程是否在运行。
+
+    依次尝试 pid 文件、上次命中的 pid、扫描 /proc，不再每次 fork pgrep；
+    结果缓存 OPENVPN_PROCESS_CACHE_TTL 秒。
+    """
+    global _probe_cache
+    ttl = settings.openvpn_process_cache_ttl
+    with _probe_lock:
+        now = time.monotonic()
+        if ttl > 0 and _probe_cache and now - _probe_cache[0] < ttl:
+            return _probe_cache[1]
+        try:
+            running = _probe_process()
+        except Exception:
+            running = False
+        _probe_cache = (now, running)
+        return running
+
+
+def invalidate_process_cache() -> None:
+    """服务被启停后丢弃缓存的探测结果，下次状态查询重新探测。"""
+    global _probe_cache, _last_pid
+    with _probe_lock:
+        _probe_cache = None
+        _last_pid = None
 
 
 def _check_management_socket() -> bool:
@@ -50,6 +129,8 @@ def service_action(action: ServiceAction) -> str:
         else:
             return "Active: inactive (dead)\nOpenVPN process not found"
     
+    # 进程状态即将或可能已经变化，不再沿用缓存
+    invalidate_process_cache()
     # start/stop/restart 操作在容器中无法执行
     # 返回提示信息
     return f"Container mode: Cannot perform '{action}' action. Please use host system to manage OpenVPN service: systemctl {action} {settings.openvpn_service_name}"
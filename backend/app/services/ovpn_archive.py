@@ -0,0 +1,65 @@
+"""
+流式打包多个客户端的 .ovpn 为 ZIP。
+
+每个配置通过 certs.export_ovpn_cached 获取（未变化时复用已导出文件，CA/远端地址变化时重新渲染），
+写入 ZIP 后立即把已压缩的字节交给调用方，内存中只保留当前这一份配置。
+输出流不可 seek，zipfile 会为每个条目写数据描述符，常见解压工具均支持。
+"""
+
+import logging
+from datetime import datetime
+from typing import Iterable, Iterator
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from app.models.client import Client
+from app.services import certs
+
+logger = logging.getLogger(__name__)
+
+ERRORS_ENTRY = "errors.txt"
+
+
+class _ChunkSink:
+    """只支持 write 的输出对象；没有 tell/seek，zipfile 会按流式模式写入。"""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_profiles_zip(clients: Iterable[Client], remote_host: str, remote_port: int) -> Iterator[bytes]:
+    """
+    逐个生成 ZIP 数据块。无法导出的客户端（如尚未签发证书）跳过，
+    原因汇总写入压缩包末尾的 errors.txt。
+    """
+    sink = _ChunkSink()
+    errors: list[str] = []
+    timestamp = datetime.now().timetuple()[:6]
+    with ZipFile(sink, mode="w", compression=ZIP_DEFLATED) as archive:
+        for client in clients:
+            try:
+                _, content = certs.export_ovpn_cached(client, remote_host, remote_port)
+            except Exception as exc:
+                logger.warning("Skip ovpn export for cn=%s: %s", client.common_name, exc)
+                errors.append(f"{client.common_name}: {exc}")
+                continue
+            info = ZipInfo(f"{client.common_name}.ovpn", date_time=timestamp)
+            info.compress_type = ZIP_DEFLATED
+            info.external_attr = 0o600 << 16
+            archive.writestr(info, content)
+            yield sink.drain()
+        if errors:
+            archive.writestr(ZipInfo(ERRORS_ENTRY, date_time=timestamp), "\n".join(errors) + "\n")
+    # 关闭时写出中央目录
+    yield sink.drain()
@@ -0,0 +1,113 @@
+"""
+.ovpn 渲染缓存（按内容寻址）。
+
+ETag 由 CA、客户端证书/私钥、TLS 密钥的内容摘要以及远端地址/端口、TLS 模式计算：
+任一输入变化（CA 轮换、TLS 密钥更换、公网地址修改、证书重签）都会得到新的 ETag，
+缓存自然失效，无需显式清理。文件摘要按 (mtime, size, inode) 缓存，未变化时不重新读取。
+
+渲染结果保存在进程内 LRU 中，同时落盘为 <cn>.ovpn 并写入 <cn>.ovpn.etag 旁路文件，
+其他 worker 或重启后可直接复用已导出的文件。
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable
+
+# 模板内容变化时递增，使旧缓存失效
+TEMPLATE_VERSION = "1"
+
+_MAX_ENTRIES = 1024
+
+_lock = threading.Lock()
+_digests: dict[str, tuple[tuple[int, int, int], str]] = {}
+_rendered: "OrderedDict[str, tuple[str, str]]" = OrderedDict()
+
+
+def file_digest(path: Path) -> str:
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    key = str(path)
+    with _lock:
+        cached = _digests.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+    digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    with _lock:
+        _digests[key] = (signature, digest)
+    return digest
+
+
+def profile_etag(paths: Iterable[Path], *params: object) -> str:
+    h = hashlib.sha256(TEMPLATE_VERSION.encode())
+    for path in paths:
+        h.update(file_digest(path).encode())
+    for value in params:
+        h.update(b"\0" + str(value).encode())
+    return h.hexdigest()[:32]
+
+
+def get(common_name: str, etag: str) -> str | None:
+    with _lock:
+        cached = _rendered.get(common_name)
+        if cached and cached[0] == etag:
+            _rendered.move_to_end(common_name)
+            return cached[1]
+    return None
+
+
+def put(common_name: str, etag: str, text: str) -> None:
+    with _lock:
+        _rendered[common_name] = (etag, text)
+        _rendered.move_to_end(common_name)
+        while len(_rendered) > _MAX_ENTRIES:
+            _rendered.popitem(last=False)
+
+
+def _etag_path(path: Path) -> Path:
+    return path.with_name(path.name + ".etag")
+
+
+def exported_etag(path: Path) -> str | None:
+    """已导出文件记录的 ETag；未导出或没有旁路文件时返回 None。"""
+    try:
+        return _etag_path(path).read_text().strip() if path.exists() else None
+    except OSError:
+        return None
+
+
+def read_exported(path: Path, etag: str) -> str | None:
+    """已导出文件的 ETag 与当前一致时返回其内容。"""
+    try:
+        if _etag_path(path).read_text().strip() != etag:
+            return None
+        return path.read_text()
+    except OSError:
+        return None
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(text)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def write_exported(path: Path, etag: str, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _atomic_write(path, text)
+    _atomic_write(_etag_path(path), etag)
+
+
+def discard(common_name: str, path: Path | None = None) -> None:
+    with _lock:
+        _rendered.pop(common_name, None)
+    if path is not None:
+        _etag_path(path).unlink(missing_ok=True)
@@ -0,0 +1,304 @@
+"""
+基于 Easy-RSA pki/index.txt 的增量证书同步。
+
+index.txt 每行：状态(V/R/E)、过期时间、吊销时间[,原因]、序列号、文件名、DN（制表符分隔）。
+签发只在末尾追加行；吊销会重写整个文件。因此记录上次处理到的偏移量、大小、mtime
+以及已处理前缀的摘要：
+- 文件未变化：直接返回；
+- 前缀未变：只流式读取新增部分；
+- 前缀变化（吊销、续期等重写）：流式读取整个文件，只写入与库中不同的行。
+同步状态保存在 runtime_state 中，所有 worker 共享。
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.api.deps import get_db_context
+from app.core.config import get_settings
+from app.services import x509
+from app.utils.time import now_shanghai_naive
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "easyrsa.index"
+
+_STATUS = {"V": "valid", "R": "revoked", "E": "expired"}
+_SERVER_CNS = ("server", "Server")
+# 行数不超过该值时按序列号/CN 查询相关记录（也保证 IN 列表不超出 SQLite 参数上限）
+_TARGETED_MAX = 500
+
+
+@dataclass
+class IndexEntry:
+    status: str
+    not_after: datetime
+    revoked_at: datetime | None
+    serial: str
+    common_name: str
+
+
+def _parse_time(value: str) -> datetime:
+    value = value.split(",", 1)[0]
+    fmt = "%y%m%d%H%M%SZ" if len(value) == 13 else "%Y%m%d%H%M%SZ"
+    return datetime.strptime(value, fmt)
+
+
+def _common_name(dn: str) -> str | None:
+    # openssl oneline 格式：/C=CN/O=.../CN=client1
+    for part in reversed(dn.split("/")):
+        if part.startswith("CN="):
+            return part[3:]
+    return None
+
+
+def parse_index_line(line: str) -> IndexEntry | None:
+    fields = line.rstrip("\r\n").split("\t")
+    if len(fields) < 6 or fields[0] not in _STATUS:
+        return None
+    cn = _common_name(fields[5])
+    if not cn:
+        return None
+    return IndexEntry(
+        status=_STATUS[fields[0]],
+        not_after=_parse_time(fields[1]),
+        revoked_at=_parse_time(fields[2]) if fields[0] == "R" and fields[2] else None,
+        serial=fields[3].upper(),
+        common_name=cn,
+    )
+
+
+def _index_path() -> Path:
+    return Path(settings.easyrsa_path) / "pki" / "index.txt"
+
+
+def _load_state(db: Session) -> dict:
+    raw = crud.runtime_state.get_value(db, key=STATE_KEY)
+    try:
+        return json.loads(raw) if raw else {}
+    except ValueError:
+        return {}
+
+
+def _read_from(path: Path, state: dict) -> tuple[int, "hashlib._Hash", Iterator[bytes], bool]:
+    """
+    决定从哪里开始读取。返回 (起始偏移, 已处理前缀摘要, 行迭代器, 是否全量)。
+    前缀摘要在读取时顺带计算，不会额外读一遍文件。
+    """
+    offset = int(state.get("offset", 0))
+    digest = hashlib.sha256()
+    handle = path.open("rb")
+    incremental = False
+    if offset and path.stat().st_size >= offset:
+        prefix = handle.read(offset)
+        digest.update(prefix)
+        incremental = digest.hexdigest() == state.get("prefix_sha256")
+        if not incremental:
+            handle.seek(0)
+            digest = hashlib.sha256()
+
+    def lines() -> Iterator[bytes]:
+        with handle:
+            for raw in handle:
+                # 末尾未写完的行留到下次
+                if not raw.endswith(b"\n"):
+                    break
+                digest.update(raw)
+                yield raw
+
+    return (offset if incremental else 0), digest, lines(), not incremental
+
+
+def _cert_file_info(entry: IndexEntry) -> x509.CertInfo | None:
+    pki = Path(settings.easyrsa_path) / "pki"
+    for path in (pki / "issued" / f"{entry.common_name}.crt", pki / "certs_by_serial" / f"{entry.serial}.pem"):
+        if not path.exists():
+            continue
+        try:
+            info = x509.parse_certificate_file(path)
+        except Exception:
+            continue
+        if info.serial == entry.serial:
+            return info
+    return None
+
+
+def sync_from_index(db: Session, *, full: bool = False) -> dict:
+    """
+    按 index.txt 增量同步 certificates 表（含 Web 之外完成的签发与吊销）。
+
+    full=True 时忽略已保存的偏移量，重新比对整个文件。
+    """
+    started = time.perf_counter()
+    path = _index_path()
+    if not path.exists():
+        return {"error": f"Easy-RSA index.txt 不存在: {path}"}
+
+    stat = path.stat()
+    state = {} if full else _load_state(db)
+    if state.get("size") == stat.st_size and state.get("mtime_ns") == stat.st_mtime_ns:
+        return {"mode": "unchanged", "lines": 0, "created": 0, "updated": 0, "elapsed": 0}
+
+    start, digest, lines, is_full = _read_from(path, state)
+    # 同一 CN 可能有多行（旧证书吊销 + 新证书），按出现顺序后者覆盖前者
+    entries: dict[str, IndexEntry] = {}
+    by_cn: dict[str, IndexEntry] = {}
+    consumed = start
+    count = 0
+    for raw in lines:
+        consumed += len(raw)
+        count += 1
+        entry = parse_index_line(raw.decode("utf-8", errors="replace"))
+        if entry is None or entry.common_name in _SERVER_CNS:
+            continue
+        entries[entry.serial] = entry
+        if entry.status == "valid" or entry.common_name not in by_cn:
+            by_cn[entry.common_name] = entry
+
+    result = _apply(db, entries, by_cn)
+    crud.runtime_state.set_value(
+        db,
+        key=STATE_KEY,
+        value=json.dumps(
+            {
+                "offset": consumed,
+                "prefix_sha256": digest.hexdigest(),
+                # 末尾有未写完的行时不记录 size/mtime，下次仍会读取剩余部分
+                "size": stat.st_size if consumed == stat.st_size else None,
+                "mtime_ns": stat.st_mtime_ns,
+                "inode": stat.st_ino,
+            }
+        ),
+        commit=False,
+    )
+    db.commit()
+    result.update(
+        {
+            "mode": "full" if is_full else "incremental",
+            "lines": count,
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
+    )
+    return result
+
+
+def _apply(db: Session, entries: dict[str, IndexEntry], by_cn: dict[str, IndexEntry]) -> dict:
+    """把解析出的行与库中记录比对，只写入有差异的部分（不提交）。"""
+    cert_model = crud.certificate.model
+    client_model = crud.client.model
+    if not entries:
+        return {"created": 0, "updated": 0, "revoked": 0, "errors": []}
+
+    columns = (
+        cert_model.id,
+        cert_model.serial_number,
+        cert_model.common_name,
+        cert_model.status,
+        cert_model.not_after,
+        cert_model.revoked_at,
+    )
+    if len(entries) > _TARGETED_MAX:
+        # 整个文件重读时行数与表相当，整表读取比分批 IN 查询更快
+        rows = db.execute(select(*columns)).all()
+    else:
+        # 追加少量行时只读取涉及的序列号与 CN，不加载整张表
+        found = {}
+        for column, keys in ((cert_model.serial_number, list(entries)), (cert_model.common_name, list(by_cn))):
+            for row in db.execute(select(*columns).where(column.in_(keys))):
+                found[row.id] = row
+        rows = sorted(found.values(), key=lambda row: row.id)
+    by_serial = {row.serial_number: row for row in rows}
+    cn_rows = {row.common_name: row for row in rows}
+
+    by_id = {row.id: row for row in rows}
+    updates: dict[int, dict] = {}
+    new_certs: list[dict] = []
+    errors: list[str] = []
+    for serial, entry in entries.items():
+        row = by_serial.get(serial)
+        if row is None:
+            row = cn_rows.get(entry.common_name)
+            # 未入库的序列号只处理该 CN 的最新有效证书（新签发或续期），历史吊销记录忽略
+            if by_cn.get(entry.common_name) is not entry or entry.status != "valid":
+                continue
+            info = _cert_file_info(entry)
+            if info is None:
+                errors.append(f"{entry.common_name}: 找不到序列号 {serial} 对应的证书文件")
+                continue
+            values = {
+                "serial_number": serial,
+                "status": entry.status,
+                "not_before": info.not_before,
+                "not_after": entry.not_after,
+                "revoked_at": None,
+            }
+            if row is None:
+                new_certs.append({"common_name": entry.common_name, **values})
+            else:
+                # 续期：沿用该 CN 的记录，换成新序列号
+                updates.setdefault(row.id, {"id": row.id}).update(values)
+            continue
+
+        if (row.status, row.not_after, row.revoked_at) == (entry.status, entry.not_after, entry.revoked_at):
+            continue
+        if row.id in updates and "serial_number" in updates[row.id]:
+            continue
+        updates.setdefault(row.id, {"id": row.id}).update(
+            {"status": entry.status, "not_after": entry.not_after, "revoked_at": entry.revoked_at}
+        )
+
+    revoked_cns = [
+        by_id[cert_id].common_name
+        for cert_id, values in updates.items()
+        if values.get("status") == "revoked" and by_id[cert_id].status != "revoked"
+    ]
+    # bulk update 按主键批量执行，同一批次的字段必须一致
+    for keys in {tuple(sorted(u)) for u in updates.values()}:
+        db.execute(update(cert_model), [u for u in updates.values() if tuple(sorted(u)) == keys])
+
+    if new_certs:
+        created = db.execute(insert(cert_model).returning(cert_model.id, cert_model.common_name), new_certs)
+        cert_ids = {cn: cert_id for cert_id, cn in created}
+        existing = set(db.scalars(select(client_model.common_name).where(client_model.common_name.in_(cert_ids))))
+        names = set(db.scalars(select(client_model.name).where(client_model.name.in_(cert_ids))))
+        client_rows = [
+            {
+                "name": cn,
+                "common_name": cn,
+                "status": "offline",
+                "disabled": False,
+                "certificate_id": cert_id,
+                "created_at": now_shanghai_naive(),
+            }
+            for cn, cert_id in cert_ids.items()
+            if cn not in existing and cn not in names
+        ]
+        if client_rows:
+            db.execute(insert(client_model), client_rows)
+
+    # 与 revoke_client_cert 一致：吊销后客户端标记为 disabled
+    if revoked_cns:
+        db.execute(
+            update(client_model).where(client_model.common_name.in_(revoked_cns)).values(status="disabled"),
+            execution_options={"synchronize_session": False},
+        )
+
+    return {"created": len(new_certs), "updated": len(updates), "revoked": len(revoked_cns), "errors": errors}
+
+
+def sync_once() -> None:
+    """后台任务入口：执行一次增量同步。"""
+    with get_db_context() as db:
+        result = sync_from_index(db)
+    if result.get("mode") != "unchanged":
+        logger.info("PKI index sync: %s", result)
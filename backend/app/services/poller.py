@@ -0,0 +1,72 @@
+"""
+management 后台轮询：定期拉取在线列表，写入 online_sessions 表并同步 clients.status。
+
+请求处理只读取共享表，不再同步访问 OpenVPN。
+"""
+
+import logging
+import time
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.api.deps import get_db_context
+from app.core.config import get_settings
+from app.schemas.client import ClientOnline
+from app.services import client_status, management
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+REFRESHED_AT_KEY = "online_sessions.refreshed_at"
+
+
+def publish_online(online: list[management.OnlineClient]) -> None:
+    """把完整在线列表发布到共享表，并同步 clients.status。"""
+    with get_db_context() as db:
+        crud.online_session.replace_all(db, (ClientOnline(**c.__dict__) for c in online), commit=False)
+        crud.runtime_state.set_value(db, key=REFRESHED_AT_KEY, value=str(time.time()), commit=False)
+        db.commit()
+        client_status.sync_client_status_and_audit(db, online_common_names=[c.common_name for c in online])
+
+
+def touch() -> None:
+    """仅刷新发布时间（事件监听在线时用作心跳）。"""
+    with get_db_context() as db:
+        crud.runtime_state.set_value(db, key=REFRESHED_AT_KEY, value=str(time.time()))
+
+
+def poll_once() -> None:
+    """拉取一次在线列表并发布到共享表。"""
+    publish_online(management.list_online())
+
+
+def _max_age() -> float:
+    intervals = []
+    if settings.management_poller_enabled:
+        intervals.append(settings.management_poll_interval)
+    if settings.management_events_enabled:
+        intervals.append(settings.management_bytecount_interval)
+    return max(intervals) * 3 if intervals else 0
+
+
+def is_fresh(db: Session) -> bool:
+    """轮询或事件监听已启用，且最近一次发布未过期（3 个周期内）。"""
+    max_age = _max_age()
+    if not max_age:
+        return False
+    raw = crud.runtime_state.get_value(db, key=REFRESHED_AT_KEY)
+    if not raw:
+        return False
+    try:
+        refreshed_at = float(raw)
+    except ValueError:
+        return False
+    return time.time() - refreshed_at <= max_age
+
+
+def read_online(db: Session) -> list[ClientOnline] | None:
+    """读取轮询发布的在线列表；未启用或数据过期时返回 None，由调用方回退到实时查询。"""
+    if not is_fresh(db):
+        return None
+    return [ClientOnline.model_validate(row, from_attributes=True) for row in crud.online_session.get_all(db)]
@@ -0,0 +1,264 @@
+"""
+tls-verify 准入判定服务。
+
+OpenVPN 每次握手/重协商都会执行 tls-verify 脚本；原脚本每次都要启动解释器并打开 SQLite 查询。
+这里由 leader worker 常驻一份 clients 表快照（common_name -> 禁用状态、固定 IP、路由），通过本机 Unix socket 应答，
+app/scripts/tls_verify.py 只需连上 socket 问一句；服务不可用时脚本仍回退到直接查库。
+同一份快照也用于 management-client-auth 模式下应答 >CLIENT:CONNECT（见 events.py）。
+
+快照只随 clients 的准入信息变化：事务改变了 clients 的行集合或 common_name/disabled/fixed_ip/routes 时，
+在同一事务内递增 runtime_state 中的 clients.version（钩子随 Client 模型注册，见 models/client.py）。
+后台线程每隔 _REFRESH_INTERVAL 秒检查一次：SQLite 先比较 PRAGMA data_version（微秒级），有新提交时再读版本号；
+其他数据库直接读版本号。版本号变化时才重新加载整张表，审计、在线状态等其他写入不会触发重载。
+判定只查内存字典，不在事件循环或 management 读线程上访问数据库；数据库不可用时沿用现有快照。
+
+协议（按行）：请求 `<common_name>\\n`，应答 `ALLOW\\n` 或 `DENY <原因>\\n`，同一连接可连续发送多行；
+快照尚未加载或其中没有该 CN 时应答 `UNAVAILABLE\\n`，脚本回退到直接查库。
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import get_settings
+from app.db.session import engine
+from app.models.client import CLIENTS_VERSION_KEY
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 库被写事务锁住时最多等待的时间，超时则使用已有快照
+_BUSY_TIMEOUT = 0.05
+# 后台检查版本号的间隔（秒），即禁用等修改生效的最长延迟
+_REFRESH_INTERVAL = 0.25
+# 首次判定时等待初次加载的最长时间（秒）
+_READY_TIMEOUT = 2.0
+
+_CLIENTS_QUERY = "SELECT common_name, disabled, fixed_ip, routes FROM clients"
+_VERSION_QUERY = "SELECT value FROM runtime_state WHERE key = :key"
+
+@dataclass(frozen=True)
+class ClientPolicy:
+    disabled: bool
+    fixed_ip: str | None
+    routes: str | None
+
+
+class AdmissionCache:
+    """clients 表准入信息的内存快照，由后台线程按 clients.version 刷新。"""
+
+    def __init__(self, db_path: Path | None) -> None:
+        # db_path 为 None 时经 engine 读取（非 SQLite 数据库）
+        self.db_path = Path(db_path) if db_path is not None else None
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._data_version: int | None = None
+        self._clients_version: str | None = None
+        self._entries: dict[str, ClientPolicy] = {}
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro", uri=True, timeout=_BUSY_TIMEOUT, check_same_thread=False
+            )
+        return self._conn
+
+    def refresh(self) -> bool:
+        """clients.version 变化时重新加载快照，返回是否重新加载。"""
+        with self._lock:
+            try:
+                reloaded = self._refresh_sqlite() if self.db_path is not None else self._refresh_engine()
+            except (sqlite3.Error, SQLAlchemyError) as exc:
+                if not self._ready.is_set():
+                    raise
+                logger.warning("tls-verify snapshot refresh failed, using cached entries: %s", exc)
+                return False
+            self._ready.set()
+            return reloaded
+
+    def _refresh_sqlite(self) -> bool:
+        conn = self._connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return False
+        # 先读版本号再读表：读到的快照不会比记录的版本号旧
+        row = conn.execute(_VERSION_QUERY, {"key": CLIENTS_VERSION_KEY}).fetchone()
+        version = row[0] if row else None
+        rows = conn.execute(_CLIENTS_QUERY).fetchall() if self._changed(version) else None
+        self._data_version = data_version
+        if rows is None:
+            return False
+        self._load(rows, version)
+        return True
+
+    def _refresh_engine(self) -> bool:
+        with engine.connect() as conn:
+            version = conn.execute(text(_VERSION_QUERY), {"key": CLIENTS_VERSION_KEY}).scalar()
+            if not self._changed(version):
+                return False
+            rows = conn.execute(text(_CLIENTS_QUERY)).all()
+        self._load(rows, version)
+        return True
+
+    def _changed(self, version: str | None) -> bool:
+        return not self._ready.is_set() or version != self._clients_version
+
+    def _load(self, rows, version: str | None) -> None:
+        self._entries = {
+            cn: ClientPolicy(disabled=bool(disabled), fixed_ip=fixed_ip, routes=routes)
+            for cn, disabled, fixed_ip, routes in rows
+        }
+        self._clients_version = version
+
+    def _run(self) -> None:
+        failing = False
+        while True:
+            try:
+                self.refresh()
+                failing = False
+            except Exception:
+                # 持续失败时只记录第一次，避免每个间隔都刷日志
+                if not failing:
+                    logger.exception("tls-verify snapshot load failed")
+                failing = True
+            if self._stop.wait(_REFRESH_INTERVAL):
+                return
+
+    def start(self) -> None:
+        """启动后台刷新线程（已启动时不重复启动）。"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="tls-verify-refresh", daemon=True)
+            self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float = _READY_TIMEOUT) -> bool:
+        self.start()
+        return self._ready.wait(timeout)
+
+    def get(self, common_name: str) -> ClientPolicy | None:
+        """查询快照；只有初次加载完成前会等待（最多 _READY_TIMEOUT 秒），之后只查内存。"""
+        if not self._ready.is_set() and not self.wait_ready():
+            raise RuntimeError("client snapshot not loaded")
+        return self._entries.get(common_name)
+
+    def check(self, common_name: str) -> tuple[bool, str]:
+        """返回 (是否允许, 拒绝原因)，规则与 tls_verify.py 直接查库时一致。"""
+        policy = self.get(common_name)
+        if policy is None:
+            return False, "unknown client"
+        if policy.disabled:
+            return False, "client is disabled"
+        return True, ""
+
+    def close(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+        with self._lock:
+            self._thread = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._data_version = None
+            self._clients_version = None
+            self._ready.clear()
+
+
+admission = AdmissionCache(engine.url.database if engine.dialect.name == "sqlite" else None)
+
+
+class TlsVerifyServer:
+    """后台任务：在 TLS_VERIFY_SOCKET_PATH 上应答 tls-verify 查询。"""
+
+    name = "tls-verify"
+
+    def __init__(self, path: Path, cache: AdmissionCache = admission) -> None:
+        self.path = Path(path)
+        self.cache = cache
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stopped: asyncio.Event | None = None
+        self._thread: threading.Thread | None = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                cn = line.decode("utf-8", errors="replace").strip()
+                if not cn:
+                    continue
+                if not self.cache.ready or self.cache.get(cn) is None:
+                    # 快照未加载时不在事件循环上等待；快照中没有的 CN 可能刚由其他进程写入、尚未刷新，
+                    # 都让脚本回退到直接查库，由数据库给出最终结论
+                    writer.write(b"UNAVAILABLE\n")
+                    await writer.drain()
+                    continue
+                try:
+                    allowed, reason = self.cache.check(cn)
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("tls-verify check failed for cn=%s", cn)
+                    allowed, reason = False, f"verifier error: {exc}"
+                writer.write(b"ALLOW\n" if allowed else f"DENY {reason}\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # 服务停止时取消仍保持的连接，正常结束即可
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self) -> None:
+        self._stopped = asyncio.Event()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self._handle, path=str(self.path), backlog=1024)
+        # OpenVPN 降权（user nobody）后执行脚本，socket 需对其可写；只暴露 CN 是否被禁用
+        os.chmod(self.path, 0o666)
+        # 初次加载在后台刷新线程中完成，这里只等待，不阻塞事件循环
+        if not await asyncio.to_thread(self.cache.wait_ready):
+            logger.warning("tls-verify snapshot not loaded yet, answering UNAVAILABLE until it is")
+        async with server:
+            await self._stopped.wait()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except Exception:
+            logger.exception("tls-verify server stopped")
+        finally:
+            # 关闭仍保持的客户端连接后再关闭事件循环
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._loop is not None and self._stopped is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.path.unlink(missing_ok=True)
+        self.cache.close()
@@ -0,0 +1,240 @@
+"""
+进程内解析 X.509 证书（PEM/DER），读取序列号、有效期、subject 和 SHA-256 指纹。
+
+只按 DER 走到 TBSCertificate 里需要的几个字段，不校验签名；
+遇到无法解析的证书时退回 openssl x509（每张证书一次调用）。
+输出格式与 openssl 保持一致（序列号为大写十六进制，subject 为 RFC 2253），
+以便与库中已有的记录直接比对。
+"""
+
+import base64
+import hashlib
+import re
+import subprocess
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+_PEM_RE = re.compile(rb"-----BEGIN CERTIFICATE-----(.+?)-----END CERTIFICATE-----", re.S)
+
+_TAG_INTEGER = 0x02
+_TAG_SEQUENCE = 0x30
+_TAG_SET = 0x31
+_TAG_UTC_TIME = 0x17
+_TAG_GENERALIZED_TIME = 0x18
+_TAG_VERSION = 0xA0
+
+_ATTR_NAMES = {
+    "2.5.4.3": "CN",
+    "2.5.4.5": "serialNumber",
+    "2.5.4.6": "C",
+    "2.5.4.7": "L",
+    "2.5.4.8": "ST",
+    "2.5.4.10": "O",
+    "2.5.4.11": "OU",
+    "2.5.4.41": "name",
+    "1.2.840.113549.1.9.1": "emailAddress",
+    "0.9.2342.19200300.100.1.25": "DC",
+}
+
+_STRING_CODECS = {
+    0x0C: "utf-8",  # UTF8String
+    0x13: "ascii",  # PrintableString
+    0x14: "latin-1",  # T61String
+    0x16: "ascii",  # IA5String
+    0x1C: "utf-32-be",  # UniversalString
+    0x1E: "utf-16-be",  # BMPString
+}
+
+
+@dataclass(frozen=True)
+class CertInfo:
+    serial: str
+    not_before: datetime
+    not_after: datetime
+    subject: str
+    fingerprint_sha256: str
+
+    @property
+    def common_name(self) -> str | None:
+        for rdn in re.split(r"(?<!\\)[,+]", self.subject):
+            if rdn.startswith("CN="):
+                return re.sub(r"\\(.)", r"\1", rdn[3:])
+        return None
+
+
+def _read_tlv(data: bytes, offset: int) -> tuple[int, int, int]:
+    """读取一个 DER TLV，返回 (tag, value_start, value_end)。"""
+    if offset + 2 > len(data):
+        raise ValueError("Truncated DER")
+    tag = data[offset]
+    length = data[offset + 1]
+    pos = offset + 2
+    if length & 0x80:
+        num = length & 0x7F
+        if num == 0 or num > 4 or pos + num > len(data):
+            raise ValueError("Unsupported DER length")
+        length = int.from_bytes(data[pos : pos + num], "big")
+        pos += num
+    end = pos + length
+    if end > len(data):
+        raise ValueError("Truncated DER")
+    return tag, pos, end
+
+
+def _expect(data: bytes, offset: int, tag: int) -> tuple[int, int]:
+    got, start, end = _read_tlv(data, offset)
+    if got != tag:
+        raise ValueError(f"Unexpected DER tag 0x{got:02x}, expected 0x{tag:02x}")
+    return start, end
+
+
+def _children(data: bytes, start: int, end: int):
+    while start < end:
+        tag, value_start, value_end = _read_tlv(data, start)
+        yield tag, value_start, value_end
+        start = value_end
+
+
+def _decode_oid(raw: bytes) -> str:
+    if not raw:
+        raise ValueError("Empty OID")
+    first = raw[0]
+    parts = [min(first // 40, 2), first - 40 * min(first // 40, 2)]
+    value = 0
+    for byte in raw[1:]:
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            parts.append(value)
+            value = 0
+    return ".".join(str(p) for p in parts)
+
+
+def _decode_time(tag: int, raw: bytes) -> datetime:
+    text = raw.decode("ascii")
+    if not text.endswith("Z"):
+        raise ValueError(f"Unsupported time format: {text}")
+    if tag == _TAG_UTC_TIME:
+        parsed = datetime.strptime(text[:-1], "%y%m%d%H%M%S")
+        # RFC 5280：UTCTime 年份 >= 50 表示 19xx
+        if parsed.year >= 2050:
+            parsed = parsed.replace(year=parsed.year - 100)
+        return parsed
+    if tag == _TAG_GENERALIZED_TIME:
+        return datetime.strptime(text[:-1], "%Y%m%d%H%M%S")
+    raise ValueError(f"Unexpected time tag 0x{tag:02x}")
+
+
+def _escape_rfc2253(value: str) -> str:
+    escaped = re.sub(r'([,+"\\<>;])', r"\\\1", value)
+    if escaped.startswith((" ", "#")):
+        escaped = "\\" + escaped
+    if escaped.endswith(" ") and not escaped.endswith("\\ "):
+        escaped = escaped[:-1] + "\\ "
+    return escaped
+
+
+def _decode_name(data: bytes, start: int, end: int) -> str:
+    rdns = []
+    for set_tag, set_start, set_end in _children(data, start, end):
+        if set_tag != _TAG_SET:
+            raise ValueError("Malformed RDN")
+        attrs = []
+        for _, atv_start, atv_end in _children(data, set_start, set_end):
+            items = list(_children(data, atv_start, atv_end))
+            if len(items) != 2:
+                raise ValueError("Malformed AttributeTypeAndValue")
+            (_, oid_start, oid_end), (value_tag, value_start, value_end) = items
+            oid = _decode_oid(data[oid_start:oid_end])
+            raw = data[value_start:value_end]
+            codec = _STRING_CODECS.get(value_tag)
+            if codec:
+                value = _escape_rfc2253(raw.decode(codec))
+            else:
+                value = "#" + data[oid_end:value_end].hex()
+            attrs.append(f"{_ATTR_NAMES.get(oid, oid)}={value}")
+        rdns.append("+".join(attrs))
+    # RFC 2253 从最后一个 RDN 开始书写，与 openssl -nameopt RFC2253 一致
+    return ",".join(reversed(rdns))
+
+
+def _format_serial(raw: bytes) -> str:
+    # 去掉 DER 正数前补的 0x00 符号位，与 openssl x509 -serial 一致
+    if len(raw) > 1 and raw[0] == 0:
+        raw = raw[1:]
+    return raw.hex().upper()
+
+
+def load_der(data: bytes) -> bytes:
+    """PEM 取第一张证书并解码为 DER；已是 DER 时原样返回。"""
+    match = _PEM_RE.search(data)
+    if match:
+        return base64.b64decode(b"".join(match.group(1).split()))
+    if data[:1] == bytes([_TAG_SEQUENCE]):
+        return data
+    raise ValueError("No certificate found")
+
+
+def parse_certificate(data: bytes) -> CertInfo:
+    """解析 PEM 或 DER 证书内容。"""
+    der = load_der(data)
+    cert_start, cert_end = _expect(der, 0, _TAG_SEQUENCE)
+    tbs_start, tbs_end = _expect(der, cert_start, _TAG_SEQUENCE)
+    fields = list(_children(der, tbs_start, tbs_end))
+    if fields and fields[0][0] == _TAG_VERSION:
+        fields = fields[1:]
+    if len(fields) < 5:
+        raise ValueError("Truncated TBSCertificate")
+    (serial_tag, serial_start, serial_end), _, _, validity, subject = fields[:5]
+    if serial_tag != _TAG_INTEGER or validity[0] != _TAG_SEQUENCE or subject[0] != _TAG_SEQUENCE:
+        raise ValueError("Malformed TBSCertificate")
+
+    times = list(_children(der, validity[1], validity[2]))
+    if len(times) != 2:
+        raise ValueError("Malformed validity")
+    not_before, not_after = (_decode_time(tag, der[start:end]) for tag, start, end in times)
+
+    digest = hashlib.sha256(der[:cert_end]).hexdigest().upper()
+    return CertInfo(
+        serial=_format_serial(der[serial_start:serial_end]),
+        not_before=not_before,
+        not_after=not_after,
+        subject=_decode_name(der, subject[1], subject[2]),
+        fingerprint_sha256=":".join(digest[i : i + 2] for i in range(0, len(digest), 2)),
+    )
+
+
+def _parse_with_openssl(cert_path: Path) -> CertInfo:
+    result = subprocess.run(
+        [
+            "openssl", "x509", "-in", str(cert_path), "-noout",
+            "-serial", "-startdate", "-enddate", "-subject", "-nameopt", "RFC2253", "-fingerprint", "-sha256",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "openssl x509 failed")
+    values: dict[str, str] = {}
+    for line in result.stdout.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            values[key.strip().lower()] = value.strip()
+    try:
+        return CertInfo(
+            serial=values["serial"],
+            not_before=datetime.strptime(values["notbefore"], "%b %d %H:%M:%S %Y %Z"),
+            not_after=datetime.strptime(values["notafter"], "%b %d %H:%M:%S %Y %Z"),
+            subject=values.get("subject", ""),
+            fingerprint_sha256=values.get("sha256 fingerprint", ""),
+        )
+    except (KeyError, ValueError) as exc:
+        raise RuntimeError("Failed to parse certificate dates/serial") from exc
+
+
+def parse_certificate_file(cert_path: Path) -> CertInfo:
+    """读取证书文件；进程内解析失败时退回 openssl。"""
+    try:
+        return parse_certificate(Path(cert_path).read_bytes())
+    except ValueError:
+        return _parse_with_openssl(Path(cert_path))
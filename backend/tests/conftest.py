@@ -0,0 +1,35 @@
+"""测试公共夹具：每个用例使用独立的内存 SQLite 库。"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# 导入 app 之前设置：锁文件等写到临时目录，不使用仓库 data/ 与 .env 中的数据库
+os.environ["SQLITE_PATH"] = str(Path(tempfile.mkdtemp(prefix="ovpnm-tests-")) / "app.db")
+os.environ["DATABASE_URL"] = ""
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
@@ -0,0 +1,114 @@
+"""clients.version 递增规则：只随行集合与准入相关列的变化递增。"""
+
+from datetime import datetime
+
+from sqlalchemy import delete, insert, update
+
+from app import crud
+from app.models.certificate import Certificate
+from app.models.client import CLIENTS_VERSION_KEY, Client
+from app.services import cert_stats
+
+
+def _version(db) -> int:
+    return int(crud.runtime_state.get_value(db, key=CLIENTS_VERSION_KEY) or 0)
+
+
+def _add_client(db, cn: str = "alice") -> Client:
+    client = Client(name=cn, common_name=cn, status="offline", disabled=False)
+    db.add(client)
+    db.commit()
+    return client
+
+
+def test_orm_insert_bumps_version(db):
+    _add_client(db)
+    assert _version(db) == 1
+
+
+def test_orm_update_only_counts_watched_columns(db):
+    client = _add_client(db)
+    client.status = "online"
+    db.commit()
+    assert _version(db) == 1
+
+    client.disabled = True
+    db.commit()
+    assert _version(db) == 2
+
+    client.routes = "10.0.0.0/24"
+    db.commit()
+    assert _version(db) == 3
+
+
+def test_orm_delete_bumps_version(db):
+    client = _add_client(db)
+    db.delete(client)
+    db.commit()
+    assert _version(db) == 2
+
+
+def test_bulk_insert_bumps_version(db):
+    db.execute(
+        insert(Client),
+        [{"name": cn, "common_name": cn, "status": "offline", "disabled": False} for cn in ("a", "b", "c")],
+    )
+    db.commit()
+    assert _version(db) == 1
+
+
+def test_bulk_update_unwatched_column_keeps_version(db):
+    _add_client(db)
+    db.execute(update(Client).values(status="online"))
+    db.commit()
+    db.execute(update(Client), [{"id": 1, "status": "offline"}])
+    db.commit()
+    assert _version(db) == 1
+
+
+def test_bulk_update_watched_column_bumps_version(db):
+    _add_client(db)
+    db.execute(update(Client).where(Client.common_name == "alice").values(disabled=True))
+    db.commit()
+    assert _version(db) == 2
+
+    db.execute(update(Client), [{"id": 1, "fixed_ip": "10.8.0.9"}])
+    db.commit()
+    assert _version(db) == 3
+
+
+def test_bulk_delete_bumps_version(db):
+    _add_client(db)
+    db.execute(delete(Client))
+    db.commit()
+    assert _version(db) == 2
+
+
+def test_rollback_keeps_version(db):
+    client = _add_client(db)
+    client.disabled = True
+    db.flush()
+    db.rollback()
+    db.commit()
+    assert _version(db) == 1
+
+
+def test_certificate_writes_invalidate_stats_cache(db):
+    generation = cert_stats._generation
+    db.execute(
+        insert(Certificate),
+        [
+            {
+                "common_name": "alice",
+                "serial_number": "01",
+                "status": "valid",
+                "not_before": datetime(2024, 1, 1),
+                "not_after": datetime(2030, 1, 1),
+            }
+        ],
+    )
+    db.commit()
+    assert cert_stats._generation == generation + 1
+    # 没有证书写入的提交不会使缓存失效
+    _add_client(db)
+    assert cert_stats._generation == generation + 1
@@ -0,0 +1,76 @@
+"""作业回收：所属进程已退出的未完成作业标记为 failed。"""
+
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from app.models.job import Job, JobItem
+from app.services import jobs
+
+
+@pytest.fixture
+def reaper_db(monkeypatch, session_factory):
+    @contextlib.contextmanager
+    def _context():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setattr(jobs, "get_db_context", _context)
+    return session_factory
+
+
+def _exited_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def _add_job(db, owner: str | None, status: str = "running", pending: int = 2) -> int:
+    job = Job(kind="test", actor="tester", status=status, total=pending + 1, done=1, owner=owner)
+    db.add(job)
+    db.flush()
+    db.add(JobItem(job_id=job.id, target="done", status="succeeded"))
+    db.add_all(JobItem(job_id=job.id, target=f"item{i}") for i in range(pending))
+    db.commit()
+    return job.id
+
+
+def test_fail_orphaned(reaper_db):
+    db = reaper_db()
+    host = socket.gethostname()
+    dead = _add_job(db, f"{host}:{_exited_pid()}:1")
+    legacy = _add_job(db, None, status="queued")
+    alive = _add_job(db, jobs.process_owner())
+    # pid 被复用：进程仍在，但启动时间不同
+    reused = _add_job(db, f"{host}:{os.getpid()}:0")
+    remote = _add_job(db, "other-host:1:1")
+    finished = _add_job(db, f"{host}:{_exited_pid()}:1", status="succeeded", pending=0)
+
+    jobs.fail_orphaned()
+    db.expire_all()
+
+    for job_id in (dead, legacy, reused):
+        job = db.get(Job, job_id)
+        assert job.status == "failed"
+        assert job.failed == 2
+        assert job.finished_at is not None
+        items = db.query(JobItem).filter(JobItem.job_id == job_id).all()
+        assert sorted(item.status for item in items) == ["failed", "failed", "succeeded"]
+    for job_id in (alive, remote):
+        job = db.get(Job, job_id)
+        assert job.status == "running"
+        assert all(item.status != "failed" for item in db.query(JobItem).filter(JobItem.job_id == job_id))
+    assert db.get(Job, finished).status == "succeeded"
+    db.close()
+
+
+def test_process_owner_is_alive():
+    assert not jobs._owner_gone(jobs.process_owner())
+    assert jobs._owner_gone(f"{socket.gethostname()}:{_exited_pid()}:1")
@@ -0,0 +1,93 @@
+"""按 index.txt 同步证书：追加时增量读取，改写已处理部分时全量比对。"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from app.models.certificate import Certificate
+from app.models.client import Client
+from app.services import pki_sync, x509
+
+NOT_AFTER = "301231235959Z"
+
+
+def _line(status: str, serial: str, cn: str, revoked: str = "") -> str:
+    return f"{status}\t{NOT_AFTER}\t{revoked}\t{serial}\tunknown\t/CN={cn}\n"
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    monkeypatch.setattr(pki_sync.settings, "easyrsa_path", tmp_path)
+    monkeypatch.setattr(
+        pki_sync,
+        "_cert_file_info",
+        lambda entry: x509.CertInfo(
+            serial=entry.serial,
+            not_before=datetime(2024, 1, 1),
+            not_after=entry.not_after,
+            subject=f"CN={entry.common_name}",
+            fingerprint_sha256="",
+        ),
+    )
+    path = tmp_path / "pki" / "index.txt"
+    path.parent.mkdir()
+    mtime = [1_700_000_000 * 10**9]
+
+    def write(text: str, mode: str = "w") -> None:
+        with path.open(mode) as handle:
+            handle.write(text)
+        # 保证每次写入后 mtime 不同，不依赖文件系统时间精度
+        mtime[0] += 10**9
+        os.utime(path, ns=(mtime[0], mtime[0]))
+
+    return write
+
+
+def test_append_is_incremental(db, index):
+    index(_line("V", "01", "c1") + _line("V", "02", "c2"))
+    result = pki_sync.sync_from_index(db)
+    assert (result["mode"], result["lines"], result["created"]) == ("full", 2, 2)
+
+    index(_line("V", "03", "c3"), mode="a")
+    result = pki_sync.sync_from_index(db)
+    assert (result["mode"], result["lines"], result["created"]) == ("incremental", 1, 1)
+    assert sorted(db.query(Client.common_name)) == [("c1",), ("c2",), ("c3",)]
+
+    assert pki_sync.sync_from_index(db)["mode"] == "unchanged"
+
+
+def test_rewrite_falls_back_to_full(db, index):
+    index(_line("V", "01", "c1") + _line("V", "02", "c2"))
+    pki_sync.sync_from_index(db)
+
+    # easyrsa revoke 原地改写已处理的行，前缀摘要不再匹配
+    index(_line("R", "01", "c1", revoked="240601000000Z") + _line("V", "02", "c2"))
+    result = pki_sync.sync_from_index(db)
+    assert (result["mode"], result["lines"], result["revoked"]) == ("full", 2, 1)
+    cert = db.query(Certificate).filter_by(serial_number="01").one()
+    assert (cert.status, cert.revoked_at) == ("revoked", datetime(2024, 6, 1))
+    assert db.query(Client).filter_by(common_name="c1").one().status == "disabled"
+    assert db.query(Client).filter_by(common_name="c2").one().status == "offline"
+
+
+def test_partial_line_waits_for_newline(db, index):
+    index(_line("V", "01", "c1"))
+    pki_sync.sync_from_index(db)
+
+    line = _line("V", "02", "c2")
+    index(line[:10], mode="a")
+    result = pki_sync.sync_from_index(db)
+    assert (result["mode"], result["lines"]) == ("incremental", 0)
+
+    index(line[10:], mode="a")
+    result = pki_sync.sync_from_index(db)
+    assert (result["mode"], result["lines"], result["created"]) == ("incremental", 1, 1)
+    assert db.query(Certificate).filter_by(serial_number="02").one().common_name == "c2"
+
+
+def test_full_ignores_saved_offset(db, index):
+    index(_line("V", "01", "c1"))
+    pki_sync.sync_from_index(db)
+    result = pki_sync.sync_from_index(db, full=True)
+    assert (result["mode"], result["lines"], result["created"], result["updated"]) == ("full", 1, 0, 0)